@@ -1,42 +1,256 @@
+import argparse
 import logging
-from main import _create_manim_video
+from main import _create_manim_video, narration_voices
 from src.Youtube.youtube_video_idea import generate_video_idea
 from src.Youtube.video_metadata import generate_youtube_metadata
 from src.GoogleSheet.google_sheet import GoogleSheet
+from src.services.api_service import JobApi
+from src.services.manim_service import OUTPUT_KINDS
+from src.services.scheduler_service import job_context, parse_deadline
+from src.services.worker_service import WorkerDaemon
+from src.utils.job_journal import Job, JobJournal
+from src.utils import profiling
+from src.utils.log_config import setup_logging
+from src.utils.metrics import WORKERS_BUSY, dump_to_file, start_metrics
+from src.utils.process_runner import job_resources
+from src.utils.profiling import profile_stage
+from src.utils.tracing import trace_job
 
 
-def _create_video():
+def _create_video(job: Job | None = None):
+    job = job or JobJournal().create_job({"voices": narration_voices()})
+    WORKERS_BUSY.inc()
     try:
-        # Get All ideas title to avoid
-        gsheet = GoogleSheet()
-        avoid_ideas = gsheet.get_all_title()
-        # Using Gemini create video idea / script
-        youtube_video_idea = generate_video_idea(avoid_this_ideas=avoid_ideas)
-        logging.info("YOUTUBE video idea is created")
+        with trace_job(job.id), job_context(job.params), job_resources():
+            _run_job(job)
+    finally:
+        WORKERS_BUSY.dec()
+
+
+def _run_job(job: Job):
+    gsheet = None
+    try:
+        voices = job.params.get("voices")
+
+        idea = job.stage("idea")
+        if idea:
+            youtube_video_idea = idea["idea"]
+        elif job.params.get("idea"):
+            # Submitted with a fixed idea
+            youtube_video_idea = job.params["idea"]
+            job.record("idea", {"idea": youtube_video_idea})
+        else:
+            # Get All ideas title to avoid
+            with profile_stage("idea"):
+                gsheet = GoogleSheet()
+                avoid_ideas = gsheet.get_all_title()
+                # Using Gemini create video idea / script
+                youtube_video_idea = generate_video_idea(avoid_this_ideas=avoid_ideas)
+            if not youtube_video_idea:
+                job.fail("Failed to generate video idea.")
+                return
+            job.record("idea", {"idea": youtube_video_idea})
+            logging.info("YOUTUBE video idea is created")
 
         # Using manim code and Gemini we will create manim video
-        video_file_url = _create_manim_video(video_idea=youtube_video_idea)
+        video_file_url = _create_manim_video(
+            video_idea=youtube_video_idea, voices=voices, job=job
+        )
 
         logging.info("YOUTUBE video file url is created")
 
-        if video_file_url is not None:
-            # Using Gemini create metadata for youtube (title, description, tags)
-            video_metadata = generate_youtube_metadata(idea=youtube_video_idea)
+        if video_file_url is None:
+            job.fail("Video creation or upload failed.")
+            return
+
+        # Using Gemini create metadata for youtube (title, description, tags)
+        metadata = job.stage("metadata")
+        if metadata:
+            video_metadata = metadata["metadata"]
+        else:
+            with profile_stage("metadata"):
+                video_metadata = generate_youtube_metadata(idea=youtube_video_idea)
+            if not video_metadata:
+                job.fail("Failed to generate YouTube metadata.")
+                return
+            job.record("metadata", {"metadata": video_metadata})
             logging.info("YOUTUBE video metadata is created")
 
-            # After downloading file we want to push the google sheet
-            gsheet.append_data(
-                video_url=video_file_url,
-                video_title=video_metadata.get("title"),
-                video_description=video_metadata.get("description"),
-                video_tags=video_metadata.get("tags"),
+        if not job.stage("sheet"):
+            # One sheet row per localized video when several voices are used
+            video_urls = (
+                video_file_url
+                if isinstance(video_file_url, dict)
+                else {None: video_file_url}
             )
+            gsheet = gsheet or GoogleSheet()
+            rows = []
+            with profile_stage("sheet"):
+                for voice, video_url in video_urls.items():
+                    if video_url is None:
+                        continue
+                    title = video_metadata.get("title")
+                    if voice is not None:
+                        title = f"{title} [{voice}]"
+
+                    # After downloading file we want to push the google sheet
+                    if not gsheet.append_data(
+                        video_url=video_url,
+                        video_title=title,
+                        video_description=video_metadata.get("description"),
+                        video_tags=video_metadata.get("tags"),
+                    ):
+                        job.fail("Failed to append data to Google Sheet.")
+                        return
+                    rows.append(video_url)
+            job.record("sheet", {"rows": rows})
             logging.info("Google Sheet data is upload.")
             logging.info(f"Video Title: {video_metadata.get('title')}")
 
+        job.complete()
+
     except Exception as e:
         logging.error(f"ERROR when running _create_video: {type(e).__name__}: {e}")
+        job.fail(f"{type(e).__name__}: {e}")
+
+
+def resume_jobs(job_ids=None, failed_only=False):
+    """Resume the given jobs, or sweep interrupted (or failed) ones"""
+    journal = JobJournal()
+    if not job_ids:
+        if failed_only:
+            jobs = journal.list_jobs(["failed"])
+        else:
+            jobs = journal.unfinished_jobs(include_failed=False)
+        job_ids = [job["id"] for job in jobs]
+
+    logging.info(f"Resuming jobs: {job_ids}")
+    for job_id in job_ids:
+        _create_video(job=journal.open_job(job_id))
+
+
+def submit_jobs(idea=None, voices=None, count=1, deadline=None, outputs=None):
+    """Queue jobs for the worker daemon; an idea skips the idea stage"""
+    journal = JobJournal()
+    params = {"voices": voices or narration_voices()}
+    if idea:
+        params["idea"] = idea
+    if deadline:
+        params["deadline"] = deadline
+    if outputs:
+        params["outputs"] = outputs
+    return [journal.enqueue(params).id for _ in range(count)]
+
+
+def print_import_time(module="app", limit=20):
+    total, rows = profiling.import_time_report(module, limit)
+    print(f"{'cumulative s':>12} {'self s':>8}  module")
+    for cumulative, own, name in rows:
+        print(f"{cumulative:>12.3f} {own:>8.3f}  {name}")
+    print(f"\nimport {module}: {total:.3f}s")
+
+
+def list_jobs():
+    for job in JobJournal().list_jobs():
+        print(
+            f"{job['id']}  {job['status']:<9}  {job['updated_at']}  {job['error'] or ''}"
+        )
 
 
 if __name__ == "__main__":
-    _create_video()
+    parser = argparse.ArgumentParser(description="Generate Manim videos")
+    parser.add_argument("--metrics-port", type=int, help="serve /metrics on this port")
+    parser.add_argument("--metrics-file", help="periodically dump metrics to this file")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="all",
+        metavar="STAGES",
+        help="cProfile stages (comma separated, default all) into PROFILE_DIR",
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="Create a new video (default)")
+    resume = commands.add_parser(
+        "resume", help="Resume jobs by id, or every interrupted job"
+    )
+    resume.add_argument("job_ids", nargs="*")
+    commands.add_parser("retry-failed", help="Retry every failed job")
+    commands.add_parser("jobs", help="List journaled jobs")
+    import_time = commands.add_parser(
+        "import-time", help="Report the slowest imports at startup"
+    )
+    import_time.add_argument("--module", default="app")
+    import_time.add_argument("--limit", type=int, default=20)
+    submit = commands.add_parser("submit", help="Queue jobs for the worker daemon")
+    submit.add_argument("--idea", help="use this idea instead of generating one")
+    submit.add_argument("--voices", nargs="*", help="narration voices")
+    submit.add_argument("--count", type=int, default=1)
+    submit.add_argument(
+        "--deadline",
+        type=parse_deadline,
+        help="ISO timestamp or epoch seconds, used by SCHEDULER_POLICY=deadline",
+    )
+    submit.add_argument(
+        "--outputs",
+        nargs="*",
+        choices=OUTPUT_KINDS,
+        help="final videos to compose, the first is uploaded (VIDEO_OUTPUTS)",
+    )
+    daemon = commands.add_parser(
+        "daemon", help="Warm up once and process queued jobs until stopped"
+    )
+    daemon.add_argument("--workers", type=int, help="concurrent jobs (DAEMON_WORKERS)")
+    daemon.add_argument("--no-warm-up", action="store_true")
+    daemon.add_argument(
+        "--exit-when-idle", action="store_true", help="stop once the queue is empty"
+    )
+    serve = commands.add_parser(
+        "serve", help="HTTP job API in front of a warm worker daemon"
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, help="default API_PORT or 8080")
+    serve.add_argument("--workers", type=int, help="concurrent jobs (DAEMON_WORKERS)")
+    serve.add_argument(
+        "--max-queue", type=int, help="queued jobs before 429 (API_MAX_QUEUE)"
+    )
+    serve.add_argument("--no-warm-up", action="store_true")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.profile:
+        profiling.enable(args.profile)
+
+    metrics_file = None
+    if args.command not in ("jobs", "import-time", "submit"):
+        metrics_file = start_metrics(args.metrics_port, args.metrics_file)
+
+    try:
+        if args.command == "resume":
+            resume_jobs(args.job_ids)
+        elif args.command == "retry-failed":
+            resume_jobs(failed_only=True)
+        elif args.command == "jobs":
+            list_jobs()
+        elif args.command == "import-time":
+            print_import_time(args.module, args.limit)
+        elif args.command == "submit":
+            job_ids = submit_jobs(
+                args.idea, args.voices, args.count, args.deadline, args.outputs
+            )
+            print("\n".join(job_ids))
+        elif args.command == "daemon":
+            WorkerDaemon(
+                _create_video, workers=args.workers, exit_when_idle=args.exit_when_idle
+            ).serve(voices=None if args.no_warm_up else narration_voices())
+        elif args.command == "serve":
+            JobApi(
+                _create_video,
+                workers=args.workers,
+                max_queue=args.max_queue,
+                default_voices=narration_voices(),
+            ).serve(args.host, args.port, warm_up=not args.no_warm_up)
+        else:
+            _create_video()
+    finally:
+        if metrics_file:
+            dump_to_file(metrics_file)
@@ -0,0 +1,93 @@
+"""Compare encode speed and output size of the ffmpeg encoding profiles.
+
+Run from the backend directory (needs manim and ffmpeg):
+
+    python -m benchmarks.encoding_profile_benchmark --profiles draft fast delivery
+
+Every fixture scene is rendered once with manim, then put through the real
+crop_to_portrait pass with each profile. fps is output frames divided by the
+encode wall time.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stubs import FIXTURE_DIR, load_scene_corpus
+from src.services.manim_service import ManimVideoProcessor
+from src.utils import media_info
+from src.utils.encoding_profiles import PROFILES
+
+
+def render_scene(name, code, workdir):
+    """Render a fixture scene at -qh into its own media dir, return the mp4"""
+    processor = ManimVideoProcessor()
+    scene_name = processor.get_scene_name(code)
+    media_dir = os.path.join(workdir, "media", name)
+    script = str(FIXTURE_DIR / f"{name}.py")
+    subprocess.run(
+        ["manim", "-qh", "--media_dir", media_dir, script, scene_name],
+        check=True,
+        capture_output=True,
+    )
+    return str(next(Path(media_dir).rglob(f"{scene_name}.mp4")))
+
+
+def encode(video_file, profile, workdir):
+    with ManimVideoProcessor(
+        base_output_dir=os.path.join(workdir, profile), encoding_profile=profile
+    ) as processor:
+        processor.ensure_directories()
+        start = time.perf_counter()
+        output = processor.crop_to_portrait(video_file, variant=profile)
+        elapsed = time.perf_counter() - start
+    info = media_info.probe(output)
+    frames = info.frames or info.duration * (info.fps or 0)
+    return {
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "bytes": os.path.getsize(output),
+        "kbps": os.path.getsize(output) * 8 / 1000 / info.duration,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenes", nargs="*", help="fixture scene names (default all)")
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES))
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    corpus = load_scene_corpus(args.scenes)
+    if not corpus:
+        raise SystemExit("No fixture scenes matched.")
+
+    report = {}
+    with tempfile.TemporaryDirectory(prefix="encoding_bench_") as workdir:
+        print(
+            f"{'scene':<18} {'profile':<9} {'seconds':>8} {'fps':>8} "
+            f"{'MB':>8} {'kbps':>8}"
+        )
+        for name, scene in corpus.items():
+            video_file = render_scene(name, scene["code"], workdir)
+            report[name] = {}
+            for profile in args.profiles:
+                result = encode(video_file, profile, workdir)
+                report[name][profile] = result
+                print(
+                    f"{name:<18} {profile:<9} {result['seconds']:>8.2f} "
+                    f"{result['fps']:>8.1f} {result['bytes'] / 1e6:>8.2f} "
+                    f"{result['kbps']:>8.0f}"
+                )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
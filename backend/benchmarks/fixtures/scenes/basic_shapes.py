@@ -0,0 +1,16 @@
+from manim import *
+import numpy as np
+
+
+class BasicShapes(Scene):
+    def construct(self):
+        circle = Circle(color=BLUE, fill_opacity=0.5)
+        square = Square(color=YELLOW).shift(RIGHT * 2)
+        title = Text("Shapes in motion").to_edge(UP)
+        self.play(Write(title), run_time=2)
+        self.play(Create(circle), Create(square), run_time=3)
+        self.wait(2)
+        self.play(circle.animate.shift(LEFT * 2), square.animate.rotate(PI / 4), run_time=3)
+        self.wait(2)
+        self.play(FadeOut(circle), FadeOut(square), FadeOut(title), run_time=2)
+        self.wait(1)
@@ -0,0 +1,16 @@
+from manim import *
+import numpy as np
+
+
+class LongHolds(Scene):
+    def construct(self):
+        formula = MathTex(r"A = \pi r^2").scale(2)
+        self.play(Write(formula), run_time=2)
+        self.wait(8)
+        circle = Circle(radius=2, color=TEAL, fill_opacity=0.3)
+        self.play(ReplacementTransform(formula, circle), run_time=3)
+        self.wait(10)
+        rings = VGroup(*[Circle(radius=r, color=BLUE) for r in np.linspace(0.2, 2, 10)])
+        self.play(Create(rings), run_time=4)
+        self.wait(10)
+        self.play(FadeOut(circle, rings), run_time=2)
@@ -0,0 +1,33 @@
+from manim import *
+import numpy as np
+
+
+class MatrixTransform(Scene):
+    def construct(self):
+        axes = Axes(x_range=[-4, 4, 1], y_range=[-4, 4, 1], x_length=6, y_length=6)
+        matrix = np.array([[0, -1], [1, 0]])
+        vector = np.array([2, 1, 0])
+        arrow = Arrow(ORIGIN, axes.c2p(*vector[:2]), buff=0, color=YELLOW)
+        matrix_tex = MathTex(
+            r"M = \begin{bmatrix} 0 & -1 \\ 1 & 0 \end{bmatrix}", color=RED
+        ).to_corner(UL)
+        label = MathTex(r"\vec{v}", color=YELLOW).next_to(arrow.get_end(), UR, buff=0.1)
+
+        self.play(Create(axes), run_time=2)
+        self.play(Create(arrow), Write(label), run_time=3)
+        self.play(Write(matrix_tex), run_time=3)
+        self.wait(2)
+
+        result = np.append(np.dot(matrix, vector[:2]), 0)
+        new_arrow = Arrow(ORIGIN, axes.c2p(*result[:2]), buff=0, color=GREEN)
+        new_label = MathTex(r"M\vec{v}", color=GREEN).next_to(new_arrow.get_end(), UL, buff=0.1)
+        self.play(Transform(arrow, new_arrow), Transform(label, new_label), run_time=4)
+        self.wait(3)
+
+        equation = MathTex(
+            r"\begin{bmatrix} 0 & -1 \\ 1 & 0 \end{bmatrix}"
+            r"\begin{bmatrix} 2 \\ 1 \end{bmatrix} = \begin{bmatrix} -1 \\ 2 \end{bmatrix}"
+        ).to_edge(DOWN)
+        self.play(Write(equation), run_time=4)
+        self.wait(4)
+        self.play(FadeOut(axes, arrow, label, matrix_tex, equation), run_time=2)
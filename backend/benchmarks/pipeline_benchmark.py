@@ -0,0 +1,162 @@
+"""Offline end-to-end throughput benchmark of the video pipeline.
+
+Run from the backend directory:
+
+    python -m benchmarks.pipeline_benchmark --runs 2 --output bench.json
+    python -m benchmarks.pipeline_benchmark --baseline bench.json --tolerance 0.2
+
+Gemini, Cloudinary and Google Sheets are replaced by the stand-ins in
+benchmarks/stubs.py; TTS, the Manim render and every ffmpeg step run for
+real over the fixture scenes. The report has per-stage latency percentiles,
+videos/hour and peak RSS, and can be compared against a previous report.
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    index = (len(values) - 1) * q
+    lower = int(index)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+
+def peak_rss_mb():
+    """Peak RSS of this process and of its largest finished child (Linux: KiB)"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return {"self": round(own, 1), "children": round(children, 1)}
+
+
+def run_benchmark(scene_names, runs):
+    workdir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    os.environ.setdefault("JOB_DB_PATH", os.path.join(workdir, "jobs.sqlite3"))
+    os.environ.setdefault("TRACE_DIR", os.path.join(workdir, "traces"))
+
+    import app
+    from src.utils.log_config import setup_logging
+    from benchmarks.stubs import StubLLMConfig, install_stubs, load_scene_corpus
+    from src.utils.job_journal import JobJournal
+    from src.utils.tracing import add_listener
+
+    corpus = load_scene_corpus(scene_names)
+    if not corpus:
+        raise SystemExit("No fixture scenes matched.")
+    install_stubs(corpus)
+    setup_logging()
+
+    durations = defaultdict(list)
+    add_listener(lambda span: durations[span.name].append(span.duration))
+
+    journal = JobJournal()
+    jobs = []
+    start = time.perf_counter()
+    for run in range(runs):
+        for scene in corpus:
+            StubLLMConfig.current_scene = scene
+            job = journal.create_job(
+                {"voices": ["en-us"], "benchmark_scene": scene, "run": run}
+            )
+            app._create_video(job=job)
+            jobs.append((scene, journal.get_job(job.id)["status"]))
+    wall = time.perf_counter() - start
+
+    completed = sum(1 for _, status in jobs if status == "completed")
+    stages = {
+        name: {
+            "count": len(values),
+            "p50": percentile(values, 0.5),
+            "p90": percentile(values, 0.9),
+            "p99": percentile(values, 0.99),
+            "mean": statistics.mean(values),
+        }
+        for name, values in sorted(durations.items())
+    }
+    return {
+        "scenes": list(corpus),
+        "runs": runs,
+        "jobs": len(jobs),
+        "completed": completed,
+        "failed": [scene for scene, status in jobs if status != "completed"],
+        "wall_seconds": wall,
+        "videos_per_hour": completed / wall * 3600 if wall else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+    }
+
+
+def print_report(report):
+    print(f"{'stage':<28} {'n':>4} {'p50 s':>8} {'p90 s':>8} {'p99 s':>8}")
+    for name, stats in report["stages"].items():
+        print(
+            f"{name:<28} {stats['count']:>4} {stats['p50']:>8.2f} "
+            f"{stats['p90']:>8.2f} {stats['p99']:>8.2f}"
+        )
+    print(
+        f"\n{report['completed']}/{report['jobs']} videos in "
+        f"{report['wall_seconds']:.1f}s -> {report['videos_per_hour']:.1f} videos/hour"
+    )
+    print(f"Peak RSS (MB): {report['peak_rss_mb']}")
+    if report["failed"]:
+        print(f"Failed scenes: {report['failed']}")
+
+
+def compare(report, baseline, tolerance):
+    """Stages whose p50 regressed by more than `tolerance` against the baseline"""
+    regressions = []
+    for name, stats in report["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous or not previous["p50"]:
+            continue
+        change = stats["p50"] / previous["p50"] - 1
+        if change > tolerance:
+            regressions.append(f"{name}: p50 {previous['p50']:.2f}s -> {stats['p50']:.2f}s")
+    if baseline.get("videos_per_hour"):
+        change = report["videos_per_hour"] / baseline["videos_per_hour"] - 1
+        if change < -tolerance:
+            regressions.append(
+                f"videos/hour {baseline['videos_per_hour']:.1f} -> "
+                f"{report['videos_per_hour']:.1f}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenes", nargs="*", help="fixture scene names (default all)")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="previous JSON report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = run_benchmark(args.scenes, args.runs)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
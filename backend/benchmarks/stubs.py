@@ -0,0 +1,104 @@
+"""Local stand-ins for the external services used by the pipeline.
+
+They let benchmarks drive the real TTS -> Manim -> ffmpeg path without
+Gemini, Cloudinary or Google Sheets credentials.
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures" / "scenes"
+
+
+def load_scene_corpus(names=None):
+    """{name: {"code": ..., "narration": ...}} for every fixture scene"""
+    corpus = {}
+    for code_file in sorted(FIXTURE_DIR.glob("*.py")):
+        if names and code_file.stem not in names:
+            continue
+        corpus[code_file.stem] = {
+            "code": code_file.read_text(encoding="utf-8"),
+            "narration": code_file.with_suffix(".txt").read_text(encoding="utf-8"),
+        }
+    return corpus
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+        self.prompt_feedback = None
+        self.usage_metadata = None
+
+
+class StubLLMConfig:
+    """Answers every prompt from the fixture corpus instead of Gemini"""
+
+    corpus = {}
+    current_scene = None
+
+    def generate_video(self, idea=None):
+        scene = self.corpus[self.current_scene]
+        return StubResponse(
+            f"### MANIM CODE:\n```python\n{scene['code']}\n```\n"
+            f"### NARRATION:\n{scene['narration']}"
+        )
+
+    def general_content(self, idea):
+        if "YouTube title" in idea or "THE response must" in idea:
+            return StubResponse(
+                json.dumps(
+                    {
+                        "title": f"Benchmark {self.current_scene}",
+                        "description": "Offline benchmark run",
+                        "tags": "#benchmark",
+                    }
+                )
+            )
+        if idea.startswith("Translate"):
+            return StubResponse(idea.split("\n\n", 1)[-1])
+        # Video idea prompt: the scene name is the idea
+        return StubResponse(self.current_scene)
+
+
+class StubCloudinaryStorage:
+    """Copies "uploads" to a local directory and returns file:// URLs"""
+
+    upload_dir = "output/benchmark_uploads"
+
+    def upload_to_cloudinary(self, file_path, project_name: str):
+        os.makedirs(self.upload_dir, exist_ok=True)
+        target = os.path.join(
+            self.upload_dir, f"{project_name.replace(' ', '_')}{Path(file_path).suffix}"
+        )
+        shutil.copyfile(file_path, target)
+        return Path(target).resolve().as_uri()
+
+
+class StubGoogleSheet:
+    rows = []
+
+    def get_all_title(self):
+        return [row["title"] for row in self.rows]
+
+    def append_data(self, video_url, video_title, video_description, video_tags):
+        self.rows.append({"url": video_url, "title": video_title})
+        return True
+
+
+def install_stubs(corpus):
+    """Patch the pipeline modules to use the local stand-ins"""
+    import app
+    import main
+    import src.services.generate_service as generate_service
+    import src.Youtube.video_metadata as video_metadata
+    import src.Youtube.youtube_video_idea as youtube_video_idea
+
+    StubLLMConfig.corpus = corpus
+    for module in (generate_service, video_metadata, youtube_video_idea):
+        module.LLMConfig = StubLLMConfig
+    main.CloudinaryStorage = StubCloudinaryStorage
+    # Fixture scenes are valid; a failing render should count as a failure
+    main.fix_manim_code = lambda **kwargs: (None, None)
+    app.GoogleSheet = StubGoogleSheet
@@ -0,0 +1,85 @@
+"""Measure ffmpeg subtitle burn-in speed for each ASS color mode.
+
+Run from the backend directory (needs ffmpeg built with libass):
+
+    python -m benchmarks.subtitle_render_benchmark --duration 40
+
+A synthetic narration is turned into one ASS file per mode and burned into a
+blank 1080x1920 clip with the same `subtitles` filter crop_to_portrait uses.
+The "baseline" row decodes and filters the clip without subtitles.
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from src.services.ass_file_service import COLOR_MODES, ASSSubtitleWriter
+
+WORDS = (
+    "every matrix tells a story about how space bends stretches and turns "
+    "watch the basis vectors move and the whole grid follows them."
+).split()
+
+
+def synthetic_word_timestamps(duration, words_per_second=2.5):
+    timestamps = []
+    step = 1 / words_per_second
+    t = 0.0
+    i = 0
+    while t + step <= duration:
+        timestamps.append({"word": WORDS[i % len(WORDS)], "start": t, "end": t + step * 0.85})
+        t += step
+        i += 1
+    return timestamps
+
+
+def burn_in_fps(subtitle_file, duration, fps, size):
+    video_filter = "null" if subtitle_file is None else f"subtitles={subtitle_file}"
+    command = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"color=c=black:s={size}:r={fps}:d={duration}",
+        "-vf",
+        video_filter,
+        "-f",
+        "null",
+        "-",
+    ]
+    start = time.perf_counter()
+    subprocess.run(command, check=True, capture_output=True)
+    return duration * fps / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=40)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--size", default="1080x1920")
+    parser.add_argument("--karaoke", action="store_true")
+    args = parser.parse_args()
+
+    word_timestamps = synthetic_word_timestamps(args.duration)
+    with tempfile.TemporaryDirectory(prefix="subtitle_bench_") as tmp:
+        baseline = burn_in_fps(None, args.duration, args.fps, args.size)
+        print(f"{'mode':<10} {'ass bytes':>10} {'fps':>8} {'vs baseline':>12}")
+        print(f"{'baseline':<10} {'-':>10} {baseline:>8.1f} {'1.00x':>12}")
+        for mode in COLOR_MODES:
+            ass_file = os.path.join(tmp, f"{mode}.ass")
+            ASSSubtitleWriter(color_mode=mode, karaoke=args.karaoke).write(
+                word_timestamps, ass_file
+            )
+            fps = burn_in_fps(ass_file, args.duration, args.fps, args.size)
+            print(
+                f"{mode:<10} {os.path.getsize(ass_file):>10} {fps:>8.1f} "
+                f"{fps / baseline:>11.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
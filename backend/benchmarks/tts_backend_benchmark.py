@@ -0,0 +1,87 @@
+"""Compare real-time factor of the Kokoro TTS backends.
+
+Run from the backend directory:
+
+    python -m benchmarks.tts_backend_benchmark --backends torch onnx --runs 3
+
+RTF is synthesis wall time divided by produced audio duration (lower is
+better). Word timestamps of every backend are compared against the first one.
+"""
+
+import argparse
+import statistics
+import time
+
+from src.services.tts_backends import create_backend
+
+SAMPLE_TEXTS = [
+    "A matrix is a machine that takes in a vector and spits out a new one",
+    "Watch the grid stretch and rotate as the transformation is applied\n"
+    "Every line stays straight and the origin never moves",
+    "The area of a circle is pi r squared but why\n"
+    "Slice it into thin rings and unroll them into a triangle\n"
+    "The triangle has base two pi r and height r",
+]
+
+
+def run_backend(backend, voice, runs):
+    timings = []
+    audio_seconds = 0.0
+    timestamps = []
+    for _ in range(runs):
+        audio_seconds = 0.0
+        timestamps = []
+        start = time.perf_counter()
+        for text in SAMPLE_TEXTS:
+            for _, audio, tokens in backend.synthesize(text, voice=voice):
+                audio_seconds += len(audio) / backend.sample_rate
+                for t in tokens or []:
+                    if t.text.strip():
+                        timestamps.append((t.text, t.start_ts, t.end_ts))
+        timings.append(time.perf_counter() - start)
+    return timings, audio_seconds, timestamps
+
+
+def max_timestamp_drift(reference, other):
+    if len(reference) != len(other):
+        return float("inf")
+    drift = 0.0
+    for (_, ref_start, ref_end), (_, start, end) in zip(reference, other):
+        if None in (ref_start, ref_end, start, end):
+            continue
+        drift = max(drift, abs(ref_start - start), abs(ref_end - end))
+    return drift
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--voice", default="af_heart")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    reference = None
+    print(f"{'backend':<8} {'load s':>8} {'median s':>9} {'audio s':>8} {'RTF':>6} {'drift s':>8}")
+    for name in args.backends:
+        load_start = time.perf_counter()
+        backend = create_backend(name)
+        load_time = time.perf_counter() - load_start
+
+        # Warm-up run so one-time graph/kernel setup is not counted
+        list(backend.synthesize(SAMPLE_TEXTS[0], voice=args.voice))
+
+        timings, audio_seconds, timestamps = run_backend(backend, args.voice, args.runs)
+        median = statistics.median(timings)
+        if reference is None:
+            reference = timestamps
+        drift = max_timestamp_drift(reference, timestamps)
+        # A backend that produced no audio has no real-time factor
+        rtf = f"{median / audio_seconds:.3f}" if audio_seconds else "-"
+        print(
+            f"{name:<8} {load_time:>8.2f} {median:>9.2f} {audio_seconds:>8.2f} "
+            f"{rtf:>6} {drift:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,66 +2,199 @@ import logging
 import os
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 from src.CloudStorage.utils import CloudinaryStorage
 from src.llmConfig.fallback_fix_generation import fix_manim_code
-from src.services.generate_service import generate_video
-from src.services.manim_service import create_manim_video
-from src.services.tts_service import generate_audio
-
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+from src.services.generate_service import generate_video, translate_narration
+from src.services.manim_service import (
+    create_localized_videos,
+    create_manim_video,
+    output_paths,
+    requested_outputs,
+)
+from src.services.tts_service import (
+    VOICE_LANGUAGES,
+    generate_audio,
+    subtitles_path_for,
 )
+from src.utils.job_journal import Job, JobJournal
+from src.utils.metrics import FIX_ATTEMPTS, RENDER_ATTEMPTS
+from src.utils import scratch
+from src.utils.profiling import profile_stage
+from src.utils.tracing import set_attributes, span, traced, with_context
+
+
+def narration_voices() -> list:
+    """Voices to narrate every video in, from NARRATION_VOICES (comma separated)"""
+    voices = [v.strip() for v in os.getenv("NARRATION_VOICES", "en-us").split(",")]
+    return [v for v in voices if v]
+
+
+def subtitle_karaoke() -> bool:
+    """Highlight subtitle words in time with the narration (SUBTITLE_KARAOKE=1)"""
+    return os.getenv("SUBTITLE_KARAOKE", "0") == "1"
+
+
+@traced("narration")
+def generate_narrations(script: str, voices: list, karaoke: bool = False) -> dict:
+    """Translate and voice the narration for every voice in parallel"""
+
+    def _narrate(voice):
+        try:
+            language = VOICE_LANGUAGES[voice][1]
+            text = script
+            with profile_stage(f"narration.{voice}"):
+                if language != "English":
+                    text = translate_narration(script, language)
+                return voice, generate_audio(text=text, voice=voice, karaoke=karaoke)
+        except Exception as e:
+            logging.error(f"Failed to generate {voice} narration: {e}")
+            return voice, None
+
+    max_workers = min(len(voices), int(os.getenv("TTS_MAX_WORKERS", "3")))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(pool.map(with_context(_narrate), voices))
+
+
+def voiced(narrations: dict) -> dict:
+    """Narrations whose audio was generated; failed voices are not rendered
+
+    When there is no audio at all (the fix loop dropped the narration) one
+    voice is kept so a single silent video is rendered.
+    """
+    succeeded = {voice: audio for voice, audio in narrations.items() if audio}
+    if not succeeded:
+        return dict(list(narrations.items())[:1])
+    for voice in narrations.keys() - succeeded.keys():
+        logging.warning(f"Skipping {voice}: its narration failed")
+    return succeeded
+
+
+def render_narrated_videos(manim_code: str, narrations: dict, outputs=None):
+    """Render once; return one video path, or {voice: path} for several voices
+
+    The path is the first of `outputs`; the others are written beside it.
+    """
+    if len(narrations) == 1:
+        voice, audio_file = next(iter(narrations.items()))
+        return create_manim_video(
+            {"manim_code": manim_code, "output_file": "output.mp4"},
+            manim_code,
+            audio_file=audio_file,
+            subtitle_file=subtitles_path_for(voice),
+            outputs=outputs,
+        )
+    return create_localized_videos(
+        manim_code,
+        {
+            voice: {
+                "audio_file": audio_file,
+                "subtitle_file": subtitles_path_for(voice),
+            }
+            for voice, audio_file in narrations.items()
+        },
+        outputs=outputs,
+    )
+
 
+def narration_artifacts(narrations: dict) -> list:
+    """Audio and subtitle files a narration stage leaves on disk"""
+    artifacts = [audio_file for audio_file in narrations.values() if audio_file]
+    for voice in narrations:
+        if os.path.exists(subtitles_path_for(voice)):
+            artifacts.append(subtitles_path_for(voice))
+    return artifacts
 
-def main(idea: str) -> str:
+
+def video_artifacts(final_video, outputs=None) -> list:
+    videos = final_video.values() if isinstance(final_video, dict) else [final_video]
+    return [
+        path for video in videos for path in output_paths(video, outputs).values()
+    ]
+
+
+def main(
+    idea: str,
+    voices: list | None = None,
+    job: Job | None = None,
+    karaoke: bool | None = None,
+):
     video_data = None
     script = None
     max_retries = 2
     final_video = None
+    voices = voices or narration_voices()
+    karaoke = subtitle_karaoke() if karaoke is None else karaoke
+    job = job or JobJournal().create_job({"idea": idea, "voices": voices})
+    outputs = requested_outputs(job.params.get("outputs"))
+
+    rendered = job.stage("render")
+    if rendered:
+        return rendered["video"]
 
     # Generate video using the idea
-    video_data, script = generate_video(idea)
+    code = job.stage("code")
+    if code:
+        video_data, script = code["video_data"], code["script"]
+    else:
+        with profile_stage("generate_video"):
+            video_data, script = generate_video(idea)
+
+        if not video_data:
+            logging.error("Failed to generate video data.")
+            return
 
-    if not video_data:
-        logging.error("Failed to generate video data.")
-        return
+        if not script:
+            logging.error("Failed to generate script.")
+            return
+        job.record("code", {"video_data": video_data, "script": script})
 
-    if not script:
-        logging.error("Failed to generate script.")
-        return
-    # Generate the audio script
-    audio_file = generate_audio(text=script)
-    print("Current audio file:", audio_file)
+    # Generate the audio script for every voice
+    narration = job.stage("narration")
+    if narration:
+        narrations = narration["audio"]
+    else:
+        narrations = generate_narrations(script, voices, karaoke)
+        logging.info(f"Current audio files: {narrations}")
 
-    if not audio_file:
-        logging.error("Failed to generate audio file.")
-        return
+        if not any(narrations.values()):
+            logging.error("Failed to generate audio file.")
+            return
+        job.record(
+            "narration", {"audio": narrations}, narration_artifacts(narrations)
+        )
 
     current_manim_code = video_data["manim_code"]
     current_script = script
-    current_audio_file = audio_file
+    current_narrations = voiced(narrations)
 
     for attempt in range(max_retries + 1):
         try:
             logging.info(f"Attempt {attempt + 1} to create Manim video.")
-            final_video = create_manim_video(
-                {"manim_code": current_manim_code, "output_file": "output.mp4"},
-                current_manim_code,
-                audio_file=current_audio_file,
-            )
+            set_attributes(render_attempts=attempt + 1)
+            with span("render.attempt", attempt=attempt + 1), profile_stage("render"):
+                final_video = render_narrated_videos(
+                    current_manim_code, current_narrations, outputs
+                )
             logging.info("Manim video creation successful.")
+            RENDER_ATTEMPTS.inc(outcome="success")
+            render = {"video": final_video, "manim_code": current_manim_code}
+            if len(outputs) > 1:
+                render["outputs"] = output_paths(final_video, outputs)
+            job.record("render", render, video_artifacts(final_video, outputs))
             return final_video
             break
         except subprocess.CalledProcessError as e:
             logging.error(f"Manim execution failed on attempt {attempt + 1}.")
+            RENDER_ATTEMPTS.inc(outcome="failure")
             if attempt < max_retries:
                 logging.info("Calling fallback Gemini to fix code.")
-                error_message = (
-                    e.stderr.decode()
-                    if e.stderr
-                    else "Manim execution failed without specific error output."
+                error_message = e.stderr or (
+                    "Manim execution failed without specific error output."
                 )
+                if isinstance(error_message, bytes):
+                    error_message = error_message.decode(errors="replace")
 
                 fixed_video_data, fixed_script = fix_manim_code(
                     faulty_code=current_manim_code,
@@ -71,22 +204,39 @@ def main(idea: str) -> str:
 
                 if fixed_video_data and fixed_script is not None:
                     logging.info("Fallback successful. Received fixed code.")
+                    FIX_ATTEMPTS.inc(outcome="fixed")
                     current_manim_code = fixed_video_data["manim_code"]
                     if fixed_script != current_script and fixed_script:
                         logging.info("Regenerating audio for updated script.")
                         current_script = fixed_script
-                        try:
-                            current_audio_file = generate_audio(current_script)
-                        except ValueError as e:
-                            current_audio_file = None
+                        current_narrations = voiced(
+                            generate_narrations(current_script, voices, karaoke)
+                        )
                     elif not fixed_script:
                         logging.warning("Fallback provided empty narration.")
                         current_script = ""
-                        current_audio_file = None
+                        current_narrations = {voice: None for voice in voices}
                     else:
                         logging.info("Fallback kept the original narration.")
+
+                    job.record(
+                        "code",
+                        {
+                            "video_data": {
+                                "manim_code": current_manim_code,
+                                "output_file": "output.mp4",
+                            },
+                            "script": current_script,
+                        },
+                    )
+                    job.record(
+                        "narration",
+                        {"audio": current_narrations},
+                        narration_artifacts(current_narrations),
+                    )
                 else:
                     logging.error("Fallback failed to return valid code/script.")
+                    FIX_ATTEMPTS.inc(outcome="failed")
                     final_video = None
                     break
             else:
@@ -94,43 +244,96 @@ def main(idea: str) -> str:
                 final_video = None
         except Exception:
             logging.exception("Unexpected error during create_manim_video call.")
+            RENDER_ATTEMPTS.inc(outcome="error")
             final_video = None
             break
 
 
-def _create_manim_video(video_idea: str):
+def _create_manim_video(
+    video_idea: str,
+    voices: list | None = None,
+    job: Job | None = None,
+    karaoke: bool | None = None,
+):
+    """Create and upload the video; returns a URL, or {voice: URL} for several voices
+
+    Intermediates (output/video and manim's media cache) are only removed once
+    the upload succeeded, so a failed job can be resumed without re-rendering
+    from a cold cache. `karaoke` defaults to SUBTITLE_KARAOKE.
+    """
+    uploaded = False
     try:
         logging.info(f"Video idea: {video_idea}")
+        voices = voices or narration_voices()
+        job = job or JobJournal().create_job({"idea": video_idea, "voices": voices})
+
+        upload = job.stage("upload")
+        if upload:
+            uploaded = True
+            return upload["url"]
+
         cloudinary_storage = CloudinaryStorage()
-        video_file = main(idea=video_idea)
+        video_file = main(idea=video_idea, voices=voices, job=job, karaoke=karaoke)
         logging.info("Script executed successfully.")
-        if os.path.isfile(video_file):
-            resposne = cloudinary_storage.upload_to_cloudinary(
-                file_path=video_file, project_name=video_idea.strip()[:21]
-            )
-            logging.info(f"Video uploaded to Cloudinary: {resposne}")
-        else:
-            logging.warning(f"Could not find the file to upload: {video_file}")
+        with profile_stage("upload"):
+            if isinstance(video_file, dict):
+                resposne = {}
+                for voice, localized_file in video_file.items():
+                    resposne[voice] = cloudinary_storage.upload_to_cloudinary(
+                        file_path=localized_file,
+                        project_name=f"{video_idea.strip()[:21]}_{voice}",
+                    )
+                logging.info(f"Videos uploaded to Cloudinary: {resposne}")
+            elif os.path.isfile(video_file):
+                resposne = cloudinary_storage.upload_to_cloudinary(
+                    file_path=video_file, project_name=video_idea.strip()[:21]
+                )
+                logging.info(f"Video uploaded to Cloudinary: {resposne}")
+            else:
+                logging.warning(f"Could not find the file to upload: {video_file}")
 
         logging.info("Script execution completed.")
 
+        urls = resposne.values() if isinstance(resposne, dict) else [resposne]
+        if not all(urls):
+            logging.error(f"Upload incomplete: {resposne}")
+            return None
+        job.record("upload", {"url": resposne})
+        uploaded = True
+
         return resposne
     except Exception as e:
         logging.error(f"An error occurred: {e}")
         return None
     finally:
-        logging.info("Removing temporary files.")
-        if os.path.exists("output/video"):
-            for filename in os.listdir("output/video"):
-                file_path = os.path.join("output/video", filename)
-                try:
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except Exception as e:
-                    logging.error(f"Failed to delete {file_path}. Reason: {e}")
-        #     shutil.rmtree("output/video")
-        if os.path.exists("media"):
-            shutil.rmtree("media")
-        logging.info("Temporary files removed.")
+        narration = job.stage("narration") if job else None
+        narrations = narration["audio"] if narration else None
+        if uploaded:
+            remove_intermediate_files(narrations)
+        else:
+            # Narration on tmpfs would hold memory until a resume that may
+            # never come; a resumed job sees it missing and synthesizes again
+            if narrations:
+                scratch.release(narration_artifacts(narrations))
+            logging.info("Keeping intermediate files so the job can be resumed.")
+
+
+def remove_intermediate_files(narrations: dict | None = None):
+    logging.info("Removing temporary files.")
+    if narrations:
+        # Narration audio and subtitles on scratch tmpfs hold memory until freed
+        scratch.release(narration_artifacts(narrations))
+    if os.path.exists("output/video"):
+        for filename in os.listdir("output/video"):
+            file_path = os.path.join("output/video", filename)
+            try:
+                if os.path.isfile(file_path):
+                    os.remove(file_path)
+                elif os.path.isdir(file_path):
+                    shutil.rmtree(file_path)
+            except Exception as e:
+                logging.error(f"Failed to delete {file_path}. Reason: {e}")
+    #     shutil.rmtree("output/video")
+    if os.path.exists("media"):
+        shutil.rmtree("media")
+    logging.info("Temporary files removed.")
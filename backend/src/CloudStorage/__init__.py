@@ -1,11 +1,12 @@
 import os
-import cloudinary
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
 def cloudinary_config():
+    import cloudinary
+
     config = cloudinary.config(
         cloud_name=os.getenv("CLOUDINARY_NAME"),
         api_key=os.getenv("CLOUDINARY_API_KEY"),
@@ -1,8 +1,6 @@
 import os
-import cloudinary
-import cloudinary.api
-from cloudinary.uploader import upload as cloud_uploader
 from . import cloudinary_config
+from src.utils.tracing import span
 
 
 class CloudinaryStorage:
@@ -12,6 +10,8 @@ class CloudinaryStorage:
 
     def get_files_from_cloudinary(self):
         try:
+            import cloudinary.api
+
             result = cloudinary.api.resources_by_asset_folder(asset_folder=self.folder)
             return result["secure_url"], result["display_name"]
         except Exception as e:
@@ -20,14 +20,17 @@ class CloudinaryStorage:
 
     def upload_to_cloudinary(self, file_path, project_name: str):
         try:
+            from cloudinary.uploader import upload as cloud_uploader
+
             print(f"Uploading file: {file_path}")
-            upload_result = cloud_uploader(
-                file=file_path,
-                public_id=project_name,
-                folder=self.folder,
-                overwrite=False,
-                resource_type="raw",
-            )
+            with span("upload", bytes=os.path.getsize(file_path)):
+                upload_result = cloud_uploader(
+                    file=file_path,
+                    public_id=project_name,
+                    folder=self.folder,
+                    overwrite=False,
+                    resource_type="raw",
+                )
 
             return upload_result["secure_url"]
         except Exception as e:
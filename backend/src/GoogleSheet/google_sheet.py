@@ -1,28 +1,43 @@
 import os
 import logging
+import threading
 from datetime import datetime
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from dotenv import load_dotenv
+from src.utils.tracing import traced
 
 load_dotenv()
 
+_sheets = {}
+_sheets_lock = threading.Lock()
+
+
+def _open_sheet(sheet_id: str):
+    """Authorize once per process and reuse the opened worksheet"""
+    with _sheets_lock:
+        if sheet_id not in _sheets:
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+            # === Setup Credentials ===
+            scope = [
+                "https://spreadsheets.google.com/feeds",
+                "https://www.googleapis.com/auth/drive",
+            ]
+            creds = ServiceAccountCredentials.from_json_keyfile_name(
+                "src/GoogleSheet/google_cred.json", scope
+            )
+            client = gspread.authorize(creds)
+            _sheets[sheet_id] = (client, client.open_by_key(sheet_id).sheet1)
+        return _sheets[sheet_id]
+
 
 class GoogleSheet:
     def __init__(self):
-        # === Setup Credentials ===
-        scope = [
-            "https://spreadsheets.google.com/feeds",
-            "https://www.googleapis.com/auth/drive",
-        ]
-        creds = ServiceAccountCredentials.from_json_keyfile_name(
-            "src/GoogleSheet/google_cred.json", scope
-        )
-        self.client = gspread.authorize(creds)
         # === Open Google Sheet ===
         sheet_id = os.getenv("SHEET_ID")  # Replace with actual ID
-        self.sheet = self.client.open_by_key(sheet_id).sheet1
+        self.client, self.sheet = _open_sheet(sheet_id)
 
+    @traced("sheet.append")
     def append_data(
         self,
         video_url: str,
@@ -62,10 +77,13 @@ class GoogleSheet:
             self.sheet.append_row(row)
 
             logging.info("Video pushed to Google Sheet.")
+            return True
 
         except Exception as e:
             logging.error(f"ERROR when running google sheet append data: {e}")
+            return False
 
+    @traced("sheet.get_all_title")
     def get_all_title(self):
         try:
             titles = self.sheet.col_values(2)  # 2 if "title" is in column B
@@ -1,19 +1,40 @@
 import os
-from google import genai
-from google.genai import types as genai_types
 from dotenv import load_dotenv
 import re
 import logging
+import threading
 # from CloudStorage.utils import CloudinaryStorage
 
 load_dotenv()
 from src.llmConfig import SAFE_SETTINGS, SYSTEM_PROMPT
+from src.utils.tracing import set_attributes, span
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("logs/config.log"), logging.StreamHandler()],
-)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def gemini_client(api_key: str):
+    """Shared Gemini client per API key, so long-running workers reuse connections"""
+    with _clients_lock:
+        if api_key not in _clients:
+            from google import genai
+
+            _clients[api_key] = genai.Client(api_key=api_key)
+            logging.info("Gemini client initialized.")
+        return _clients[api_key]
+
+
+def record_token_usage(response):
+    """Attach Gemini token counts to the active trace span"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    set_attributes(
+        prompt_tokens=getattr(usage, "prompt_token_count", None),
+        output_tokens=getattr(usage, "candidates_token_count", None),
+        total_tokens=getattr(usage, "total_token_count", None),
+    )
 
 
 class LLMConfig:
@@ -25,8 +46,7 @@ class LLMConfig:
                 "Gemini API key not found. Please set "
                 "the GENAI_API_KEY environment variable."
             )
-        self.client = genai.Client(api_key=self.gemini_api_key)
-        logging.info("Gemini client initialized.")
+        self.client = gemini_client(self.gemini_api_key)
 
     def generate_video(self, idea: str | None = None):
         generate_config = ""
@@ -34,6 +54,8 @@ class LLMConfig:
         Generate a video using the provided idea and the Manim guide.
         """
         try:
+            from google.genai import types as genai_types
+
             generate_config = genai_types.GenerateContentConfig(
                 safety_settings=SAFE_SETTINGS, system_instruction=SYSTEM_PROMPT
             )
@@ -43,9 +65,11 @@ class LLMConfig:
             return None
 
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash-001", contents=idea, config=generate_config
-            )
+            with span("llm.generate_video", model="gemini-2.0-flash-001"):
+                response = self.client.models.generate_content(
+                    model="gemini-2.0-flash-001", contents=idea, config=generate_config
+                )
+                record_token_usage(response)
             logging.info("Content generated successfully.")
         except Exception as e:
             logging.error(f"Failed to generate content: {e}")
@@ -55,9 +79,11 @@ class LLMConfig:
 
     def general_content(self, idea: str):
         try:
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash-001", contents=idea
-            )
+            with span("llm.general_content", model="gemini-2.0-flash-001"):
+                response = self.client.models.generate_content(
+                    model="gemini-2.0-flash-001", contents=idea
+                )
+                record_token_usage(response)
             logging.info("Content generated successfully.")
         except Exception as e:
             logging.error(f"Failed to generate content: {e}")
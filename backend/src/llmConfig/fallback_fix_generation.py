@@ -1,14 +1,10 @@
 import os
 import logging
 import re
-from google import genai
-from google.genai import types as genai_types
 from src.utils.load_manim import load_manim_examples
 from src.llmConfig import SYSTEM_PROMPT, BASE_PROMPT_INSTRUCTIONS
-
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+from src.llmConfig.config import gemini_client, record_token_usage
+from src.utils.tracing import span
 
 
 def fix_manim_code(faulty_code: str, error_message: str, original_context: str):
@@ -17,7 +13,9 @@ def fix_manim_code(faulty_code: str, error_message: str, original_context: str):
         logging.error("GENAI_API_KEY not found in environment variables for fallback.")
         return None, None
 
-    client = genai.Client(api_key=api_key)
+    from google.genai import types as genai_types
+
+    client = gemini_client(api_key)
 
     manim_examples = load_manim_examples()
     examples_prompt = ""
@@ -58,11 +56,13 @@ def fix_manim_code(faulty_code: str, error_message: str, original_context: str):
             system_instruction=SYSTEM_PROMPT
         )
 
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-001",
-            contents=contents + examples_prompt,
-            config=generation_config,
-        )
+        with span("llm.fix_manim_code", model="gemini-2.0-flash-001"):
+            response = client.models.generate_content(
+                model="gemini-2.0-flash-001",
+                contents=contents + examples_prompt,
+                config=generation_config,
+            )
+            record_token_usage(response)
         if response:
             try:
                 content = response.text
@@ -0,0 +1,352 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+from src.services.manim_service import requested_outputs
+from src.services.scheduler_service import parse_deadline
+from src.services.tts_service import VOICE_LANGUAGES
+from src.services.worker_service import WorkerDaemon
+from src.utils.job_journal import STAGES, Job, JobJournal
+
+FINISHED_STATUSES = ("completed", "failed")
+CHUNK_SIZE = 64 * 1024
+
+
+def job_summary(job: dict) -> dict:
+    """Public view of a journaled job"""
+    stages = job.get("stages", {})
+    summary = {
+        "id": job["id"],
+        "status": job["status"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "stages": [stage for stage in STAGES if stage in stages],
+    }
+    if "idea" in stages:
+        summary["idea"] = stages["idea"]["idea"]
+    if "upload" in stages:
+        summary["url"] = stages["upload"]["url"]
+    if "render" in stages:
+        video = stages["render"]["video"]
+        summary["videos"] = list(video) if isinstance(video, dict) else [None]
+        if "outputs" in stages["render"]:
+            outputs = stages["render"]["outputs"]
+            if isinstance(video, dict):
+                outputs = next(iter(outputs.values()), {})
+            summary["outputs"] = list(outputs)
+    return summary
+
+
+def parse_range(header: Optional[str], size: int):
+    """(start, end) of a single 'bytes=' range, None for the whole file.
+
+    Raises ValueError for ranges that cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        raise ValueError(header)
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end) if end else size - 1, size - 1)
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    server_version = "ManimGenerator"
+
+    @property
+    def api(self) -> "JobApi":
+        return self.server.api
+
+    def log_message(self, format, *args):
+        logging.debug(f"API {self.address_string()} {format % args}")
+
+    def _send_json(self, status: int, body, headers: Optional[dict] = None):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _route(self, method: str):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+        # Event streams last as long as their job, so they have their own limit
+        events = method == "GET" and len(parts) == 3 and parts[2] == "events"
+        slots = self.api.streams if events else self.api.requests
+        if not slots.acquire(blocking=False):
+            self._send_json(
+                503, {"error": "Too many concurrent requests"}, {"Retry-After": "1"}
+            )
+            return
+        try:
+            if method == "POST" and parts == ["jobs"]:
+                self._submit()
+            elif method == "GET" and parts == ["jobs"]:
+                self._send_json(200, self.api.journal.list_jobs())
+            elif method == "GET" and len(parts) == 2 and parts[0] == "jobs":
+                self._status(parts[1])
+            elif events:
+                self._events(parts[1])
+            elif method == "GET" and len(parts) == 3 and parts[2] == "video":
+                self._video(
+                    parts[1],
+                    query.get("voice", [None])[0],
+                    query.get("output", [None])[0],
+                )
+            else:
+                self._send_json(404, {"error": "Not found"})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            slots.release()
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_HEAD(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def _submit(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Body must be JSON"})
+            return
+        if not isinstance(body, dict):
+            self._send_json(400, {"error": "Body must be a JSON object"})
+            return
+        idea = body.get("idea")
+        if idea is not None and not isinstance(idea, str):
+            self._send_json(400, {"error": "idea must be a string"})
+            return
+        voices = body.get("voices")
+        if voices is not None and not isinstance(voices, list):
+            self._send_json(400, {"error": "voices must be a list"})
+            return
+        unknown = [v for v in voices or [] if v not in VOICE_LANGUAGES]
+        if unknown:
+            self._send_json(
+                400,
+                {
+                    "error": f"Unknown voices: {unknown}",
+                    "voices": sorted(VOICE_LANGUAGES),
+                },
+            )
+            return
+        try:
+            parse_deadline(body.get("deadline"))
+        except (TypeError, ValueError):
+            self._send_json(
+                400, {"error": "deadline must be epoch seconds or ISO 8601"}
+            )
+            return
+        outputs = body.get("outputs")
+        if isinstance(outputs, str):
+            outputs = [outputs]
+        try:
+            if outputs is not None:
+                outputs = requested_outputs(outputs)
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            job = self.api.submit(idea, voices, body.get("deadline"), outputs)
+        except OverflowError as e:
+            self._send_json(429, {"error": str(e)}, {"Retry-After": "30"})
+            return
+        except RuntimeError as e:
+            self._send_json(503, {"error": str(e)})
+            return
+        self._send_json(
+            202, {"id": job.id, "status": "queued"}, {"Location": f"/jobs/{job.id}"}
+        )
+
+    def _status(self, job_id: str):
+        job = self.api.journal.get_job(job_id)
+        if not job:
+            self._send_json(404, {"error": f"Unknown job: {job_id}"})
+            return
+        self._send_json(200, job_summary(job))
+
+    def _events(self, job_id: str):
+        """Server-sent events for every stage and status change until the job ends"""
+        if not self.api.journal.get_job(job_id):
+            self._send_json(404, {"error": f"Unknown job: {job_id}"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        seen_stages, last_status = set(), None
+        last_write = time.monotonic()
+        while True:
+            summary = job_summary(self.api.journal.get_job(job_id))
+            for stage in summary["stages"]:
+                if stage not in seen_stages:
+                    seen_stages.add(stage)
+                    self._send_event("stage", {"id": job_id, "stage": stage})
+                    last_write = time.monotonic()
+            if summary["status"] != last_status:
+                last_status = summary["status"]
+                self._send_event("status", summary)
+                last_write = time.monotonic()
+            if last_status in FINISHED_STATUSES:
+                return
+            if time.monotonic() - last_write > 15:
+                # Comment line keeps proxies from closing an idle stream
+                self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+                last_write = time.monotonic()
+            time.sleep(self.api.poll_interval)
+
+    def _send_event(self, event: str, data):
+        payload = json.dumps(data, default=str)
+        self.wfile.write(f"event: {event}\ndata: {payload}\n\n".encode())
+        self.wfile.flush()
+
+    def _video(
+        self, job_id: str, voice: Optional[str], output: Optional[str] = None
+    ):
+        job = self.api.journal.get_job(job_id)
+        render = (job or {}).get("stages", {}).get("render")
+        if not render:
+            self._send_json(404, {"error": f"No video for job: {job_id}"})
+            return
+        video = render["video"]
+        if output and "outputs" in render:
+            # Every composed output (portrait, landscape, preview) by name
+            outputs = render["outputs"]
+            if isinstance(video, dict):
+                video = {v: paths.get(output) for v, paths in outputs.items()}
+            else:
+                video = outputs.get(output)
+        if isinstance(video, dict):
+            video = video.get(voice) if voice else next(iter(video.values()))
+        if not video or not os.path.isfile(video):
+            self._send_json(404, {"error": "Video file is no longer available"})
+            return
+
+        size = os.path.getsize(video)
+        try:
+            byte_range = parse_range(self.headers.get("Range"), size)
+        except ValueError:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.end_headers()
+            return
+
+        start, end = byte_range or (0, size - 1)
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        with open(video, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+class JobApi:
+    """HTTP front end over the job queue, served next to a warm WorkerDaemon.
+
+    Submissions beyond `max_queue` queued jobs are refused with 429, and at
+    most `max_requests` requests are handled at once (503 beyond that).
+    Event streams are counted separately, up to `max_streams`.
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[Job], None],
+        journal: Optional[JobJournal] = None,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_requests: Optional[int] = None,
+        max_streams: Optional[int] = None,
+        default_voices: Optional[list] = None,
+    ):
+        self.journal = journal or JobJournal()
+        self.daemon = WorkerDaemon(run_job, journal=self.journal, workers=workers)
+        self.max_queue = max_queue or int(os.getenv("API_MAX_QUEUE", "20"))
+        self.requests = threading.BoundedSemaphore(
+            max_requests or int(os.getenv("API_MAX_REQUESTS", "16"))
+        )
+        self.streams = threading.BoundedSemaphore(
+            max_streams or int(os.getenv("API_MAX_STREAMS", "64"))
+        )
+        self.default_voices = default_voices or ["en-us"]
+        self.poll_interval = 1.0
+        self.submit_lock = threading.Lock()
+
+    def submit(
+        self,
+        idea: Optional[str] = None,
+        voices: Optional[list] = None,
+        deadline=None,
+        outputs: Optional[list] = None,
+    ) -> Job:
+        if self.daemon.stopping.is_set():
+            raise RuntimeError("Server is shutting down")
+        with self.submit_lock:
+            depth = self.journal.queue_depth()
+            if depth >= self.max_queue:
+                raise OverflowError(f"Queue is full ({depth} jobs waiting)")
+            params = {"voices": voices or self.default_voices}
+            if idea:
+                params["idea"] = idea
+            if deadline:
+                params["deadline"] = deadline
+            if outputs:
+                params["outputs"] = outputs
+            return self.journal.enqueue(params)
+
+    def serve(self, host: str = "127.0.0.1", port: Optional[int] = None, warm_up=True):
+        port = port or int(os.getenv("API_PORT", "8080"))
+        server = ThreadingHTTPServer((host, port), _ApiHandler)
+        server.daemon_threads = True
+        server.api = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"Job API listening on http://{host}:{port}")
+        try:
+            self.daemon.serve(voices=self.default_voices if warm_up else None)
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -1,110 +1,157 @@
-import pysrt
 import re
+import os
 import colorsys
-from datetime import timedelta
+import logging
+from typing import Dict, List, Optional
 
 
-class SRTTOASSConverter:
-    def __init__(self, input_file, output_file, wave_speed=2.0):
-        self.input_file = input_file
-        self.output_file = output_file
-        self.wave_speed = wave_speed
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 1080
+PlayResY: 1920
+ScaledBorderAndShadow: yes
 
-    def srt_to_ass_timestamp(self, srt_time):
-        """Convert SRT timestamp to ASS timestamp format."""
-        total_seconds = srt_time.hours * 3600 + srt_time.minutes * 60 + srt_time.seconds
-        centiseconds = srt_time.milliseconds // 10
-        return f"{srt_time.hours}:{srt_time.minutes:02d}:{srt_time.seconds:02d}.{centiseconds:02d}"
-
-    def generate_color_wave(self, duration_seconds, speed=1.0, color_count=10):
-        """Generate a list of colors for a wave-like gradient effect."""
-        colors = []
-        for i in range(color_count):
-            # Generate HSV color with constant saturation and value, but varying hue
-            hue = (i / color_count * 360 + speed * duration_seconds) % 360 / 360
-            r, g, b = colorsys.hsv_to_rgb(hue, 1.0, 1.0)
-            # Convert to BGRhex format for ASS (ASS uses BGR color format)
-            hex_color = f"{int(b * 255):02x}{int(g * 255):02x}{int(r * 255):02x}"
-            colors.append(hex_color)
-        return colors
-
-    def create_ass_header(
-        self,
-    ):
-        """ASS header with Gibson font for 9:16 vertical videos."""
-        header = """[Script Info]
-    ScriptType: v4.00+
-    PlayResX: 1080
-    PlayResY: 1920
-    ScaledBorderAndShadow: yes
-
-    [V4+ Styles]
-    Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-    Style: Default,Gibson,60,&H00FFFFFF,&H00FFFFFF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,2,3,2,50,50,100,1  # Gibson font, bottom-aligned
-    Style: TopTitle,Gibson,72,&H00FFFFFF,&H00FFFFFF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,3,3,8,50,50,100,1  # Gibson for titles (top)
-
-    [Events]
-    Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-    """
-        return header
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Gibson,60,&H00FFFFFF,&H00FFFFFF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,2,3,2,50,50,100,1
+Style: Karaoke,Gibson,60,&H00FFFFFF,&H00808080,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,2,3,2,50,50,100,1
+Style: TopTitle,Gibson,72,&H00FFFFFF,&H00FFFFFF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,3,3,8,50,50,100,1
 
-    def create_color_tags(self, text, colors):
-        """Create ASS color tags for the text."""
-        if not colors:
-            return text
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
 
-        chars = list(text)
-        result = []
-        color_index = 0
 
-        for char in chars:
-            if char.strip():  # Only add color to non-whitespace characters
-                color = colors[color_index % len(colors)]
-                result.append(f"\\c&H{color}&{char}")
-                color_index += 1
-            else:
-                result.append(char)
+def _build_hue_palette(steps=360):
+    """Precompute one BGR hex color per hue degree (ASS uses BGR order)"""
+    palette = []
+    for degree in range(steps):
+        r, g, b = colorsys.hsv_to_rgb(degree / steps, 1.0, 1.0)
+        palette.append(f"{int(b * 255):02x}{int(g * 255):02x}{int(r * 255):02x}")
+    return palette
 
-        return "".join(result)
 
-    def srt_to_ass_with_colors(self):
-        """Convert SRT file to ASS with color-changing effects."""
-        # Load the SRT file
-        subs = pysrt.open(self.input_file)
+HUE_PALETTE = _build_hue_palette()
 
-        # Create ASS file
-        with open(self.output_file, "w", encoding="utf-8") as f:
-            f.write(self.create_ass_header())
 
-            for i, sub in enumerate(subs):
-                # Calculate duration in seconds
-                duration = sub.duration.seconds + sub.duration.milliseconds / 1000
+def build_cues(word_timestamps: List[Dict], max_words: int = 8) -> List[Dict]:
+    """Group word timestamps into subtitle cues.
+
+    A cue ends after `max_words` words or after a word that closes a sentence.
+    Each cue is a dict with `start`, `end` and the `words` it contains.
+    """
+    cues = []
+    words = []
+    for entry in word_timestamps:
+        words.append(entry)
+        if len(words) >= max_words or entry["word"].endswith((".", "!", "?")):
+            cues.append({"start": words[0]["start"], "end": words[-1]["end"], "words": words})
+            words = []
+    if words:
+        cues.append({"start": words[0]["start"], "end": words[-1]["end"], "words": words})
+    return cues
 
-                # Generate colors for this subtitle
-                colors = self.generate_color_wave(duration, self.wave_speed)
 
-                # Format text with color tags
-                text = sub.text.replace("\n", "\\N")  # ASS newline format
-                text = re.sub(r"<[^>]*>", "", text)  # Remove existing HTML tags
+def ass_timestamp(seconds: float) -> str:
+    """Convert seconds to ASS timestamp format H:MM:SS.cc"""
+    centiseconds = int(round(max(seconds, 0.0) * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    secs, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
 
-                # Important: Add braces for ASS formatting - this was missing and might be part of the issue
-                colored_text = self.create_color_tags(text, colors)
 
-                # Format the ASS line
-                start_time = self.srt_to_ass_timestamp(sub.start)
-                end_time = self.srt_to_ass_timestamp(sub.end)
+COLOR_MODES = ("glyph", "word", "line", "none")
 
-                # Make sure we have proper opening and closing braces for ASS formatting
-                ass_line = f"Dialogue: 0,{start_time},{end_time},Default,,0,0,0,,{{{colored_text}}}, {text}\n"
-                f.write(ass_line)
 
-    def generate_ass_file(self):
-        self.srt_to_ass_with_colors()
+class ASSSubtitleWriter:
+    """Write ASS subtitles straight from in-memory word timestamps.
 
+    Cues are built once from the TTS word timings, colors
+    come from the precomputed HUE_PALETTE and, with `karaoke=True`, every word
+    gets a `\\k` tag so it highlights in time with the narration.
 
-# if __name__ == "__main__":
-#     response = SRTTOASSConverter(
-#         input_file="output/subtitles/subtitles.srt",
-#         output_file="output/subtitles/subtitles.ass",
-#     )
-#     response.generate_ass_file()
+    `color_mode` trades look for libass render cost, which is paid on every
+    frame of the burn-in: "glyph" emits one override per character, "word"
+    one per word, "line" a single color per cue and "none" plain text.
+    """
+
+    def __init__(
+        self,
+        max_words: int = 8,
+        wave_speed: float = 2.0,
+        color_count: int = 10,
+        karaoke: bool = False,
+        color_mode: Optional[str] = None,
+    ):
+        self.max_words = max_words
+        self.wave_speed = wave_speed
+        self.color_count = color_count
+        self.karaoke = karaoke
+        self.color_mode = color_mode or os.getenv("SUBTITLE_COLOR_MODE", "word")
+        if self.color_mode not in COLOR_MODES:
+            raise ValueError(
+                f"Unsupported subtitle color mode: {self.color_mode}. "
+                f"Available modes: {list(COLOR_MODES)}"
+            )
+
+    def wave_colors(self, duration_seconds: float) -> List[str]:
+        """Hue wave shifted by the cue duration, taken from the palette"""
+        offset = self.wave_speed * duration_seconds
+        step = len(HUE_PALETTE) / self.color_count
+        return [
+            HUE_PALETTE[int(i * step + offset) % len(HUE_PALETTE)]
+            for i in range(self.color_count)
+        ]
+
+    def _color_word(self, word: str, colors: List[str], color_index: int):
+        if self.color_mode == "glyph":
+            parts = []
+            for char in word:
+                parts.append(f"{{\\c&H{colors[color_index % len(colors)]}&}}{char}")
+                color_index += 1
+            return "".join(parts), color_index
+        if self.color_mode == "word":
+            color = colors[color_index % len(colors)]
+            return f"{{\\c&H{color}&}}{word}", color_index + 1
+        return word, color_index
+
+    def format_cue(self, cue: Dict) -> str:
+        """Build the Dialogue text for one cue"""
+        colors = self.wave_colors(cue["end"] - cue["start"])
+        parts = []
+        color_index = 0
+        previous_end = cue["start"]
+        for entry in cue["words"]:
+            word = re.sub(r"<[^>]*>", "", entry["word"])
+            colored, color_index = self._color_word(word, colors, color_index)
+            if self.karaoke:
+                # Gaps between words are folded into the next word's duration
+                duration = int(round((entry["end"] - previous_end) * 100))
+                colored = f"{{\\k{max(duration, 0)}}}" + colored
+                previous_end = entry["end"]
+            parts.append(colored)
+
+        text = " ".join(parts)
+        if self.color_mode == "line":
+            text = f"{{\\c&H{colors[0]}&}}" + text
+        return text
+
+    def write(self, word_timestamps: List[Dict], output_file: str) -> str:
+        """Write the ASS file in one pass"""
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        cues = build_cues(word_timestamps, self.max_words)
+        style = "Karaoke" if self.karaoke else "Default"
+
+        events = [ASS_HEADER]
+        for cue in cues:
+            events.append(
+                f"Dialogue: 0,{ass_timestamp(cue['start'])},{ass_timestamp(cue['end'])},"
+                f"{style},,0,0,0,,{self.format_cue(cue)}\n"
+            )
+
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write("".join(events))
+        logging.info(f"Wrote {len(cues)} ASS subtitle events to {output_file}")
+
+        return output_file
@@ -0,0 +1,132 @@
+import contextlib
+import logging
+import os
+import subprocess
+from typing import Optional
+
+import numpy as np
+
+from src.utils import process_runner
+
+# Codec settings for narration encoded straight to the delivery format
+AUDIO_FORMATS = {
+    "aac": {"extension": ".m4a", "codec": ["-c:a", "aac", "-b:a", "192k"]},
+    "opus": {"extension": ".opus", "codec": ["-c:a", "libopus", "-b:a", "96k"]},
+}
+
+# Audio files that can be stream-copied into the final mp4
+STREAM_COPY_AUDIO_EXTENSIONS = {".m4a", ".aac", ".opus"}
+
+
+class StreamingAudioEncoder:
+    """Encode float PCM to AAC/Opus with ffmpeg while it is being synthesized.
+
+    Samples are piped to ffmpeg's stdin segment by segment, so no intermediate
+    WAV is written and the encode overlaps with TTS inference. A single-pass
+    loudnorm brings the narration to the delivery loudness target.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        audio_format: str = "aac",
+        input_sample_rate: int = 24000,
+        output_sample_rate: Optional[int] = None,
+        loudness: Optional[float] = None,
+    ):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(
+                f"Unsupported audio format: {audio_format}. "
+                f"Available formats: {list(AUDIO_FORMATS.keys())}"
+            )
+        self.output_path = output_path
+        self.audio_format = audio_format
+        self.input_sample_rate = input_sample_rate
+        self.output_sample_rate = output_sample_rate or int(
+            os.getenv("AUDIO_SAMPLE_RATE", "48000")
+        )
+        self.loudness = (
+            loudness
+            if loudness is not None
+            else float(os.getenv("AUDIO_LOUDNESS_LUFS", "-14"))
+        )
+        self.process = None
+
+    def build_command(self):
+        audio_filter = (
+            f"loudnorm=I={self.loudness}:TP=-1.5:LRA=11,"
+            f"aresample={self.output_sample_rate}"
+        )
+        return [
+            "ffmpeg",
+            "-y",
+            "-v",
+            "error",
+            "-f",
+            "f32le",
+            "-ar",
+            str(self.input_sample_rate),
+            "-ac",
+            "1",
+            "-i",
+            "pipe:0",
+            "-af",
+            audio_filter,
+            *AUDIO_FORMATS[self.audio_format]["codec"],
+            "-ar",
+            str(self.output_sample_rate),
+            self.output_path,
+        ]
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        command = self.build_command()
+        logging.info(f"Running command: {' '.join(command)}")
+        self.process = process_runner.popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        return self
+
+    def write(self, samples: np.ndarray):
+        """Feed one synthesized segment to the encoder"""
+        try:
+            self.process.stdin.write(np.asarray(samples, dtype=np.float32).tobytes())
+        except BrokenPipeError:
+            # ffmpeg exited early; its stderr says why
+            self._close_stdin()
+            self._finish()
+            raise
+
+    def _close_stdin(self):
+        # Flushing buffered samples fails once ffmpeg is gone
+        with contextlib.suppress(BrokenPipeError, OSError):
+            self.process.stdin.close()
+
+    def _finish(self):
+        stderr = self.process.stderr.read()
+        returncode = self.process.wait()
+        if returncode != 0:
+            raise Exception(
+                f"Audio encode failed with exit code {returncode}\n"
+                f"Error: {stderr.decode(errors='replace')}"
+            )
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.process.kill()
+            self._close_stdin()
+            self.process.stderr.close()
+            self.process.wait()
+            return
+        self._close_stdin()
+        self._finish()
+
+
+def output_path_for(audio_format: str, base_path: str) -> str:
+    """Swap the extension of `base_path` to the one used for `audio_format`"""
+    if audio_format == "wav":
+        return os.path.splitext(base_path)[0] + ".wav"
+    return os.path.splitext(base_path)[0] + AUDIO_FORMATS[audio_format]["extension"]
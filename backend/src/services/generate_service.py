@@ -4,8 +4,29 @@ import logging
 from src.llmConfig.config import LLMConfig
 from src.llmConfig import BASE_PROMPT_INSTRUCTIONS, SYSTEM_PROMPT
 from src.utils.load_manim import load_manim_examples
+from src.utils.tracing import traced
 
+TRANSLATE_PROMPT = (
+    "Translate this narration for a short math video into {language}. "
+    "Keep the meaning, pacing and line breaks. "
+    """DONT USE ANY PUNCTUATION like symbols = [",", ".", "/", "?", "'", '"'] """
+    "Return only the translated narration.\n\n{script}"
+)
 
+
+@traced("translate_narration")
+def translate_narration(script: str, language: str) -> str:
+    """Translate the narration for a localized voice"""
+    logging.info(f"Translating narration to {language}")
+    response = LLMConfig().general_content(
+        idea=TRANSLATE_PROMPT.format(language=language, script=script)
+    )
+    if not response or not response.text:
+        raise Exception(f"Failed to translate narration to {language}.")
+    return response.text.strip()
+
+
+@traced("generate_video")
 def generate_video(idea: str | None = None):
     contents = []
 
@@ -0,0 +1,282 @@
+"""Persistent cache of compiled Tex and Text SVGs shared by every render.
+
+manim names the SVGs of MathTex/Tex (latex + dvisvgm) and Text/MarkupText
+(Pango) after a hash of their full source, so the files are content
+addressed. Renders keep them in media/Tex and media/texts, which are deleted
+after each job; this cache keeps them in GLYPH_CACHE_DIR across jobs.
+
+manim runs as `python -m src.services.glyph_cache_service manim <args>`
+(see wrap_command): before compiling a glyph the runner links the cached SVG
+into the render's media dir, and publishes what it compiled afterwards.
+"""
+
+import atexit
+import contextlib
+import fcntl
+import inspect
+import json
+import logging
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+RUNNER_MODULE = "src.services.glyph_cache_service"
+KINDS = ("Tex", "texts")
+# Signatures of the manim (0.18/0.19) functions install() wraps; anything
+# else is left unpatched
+TEX_PARAMS = ["expression", "environment", "tex_template"]
+TEXT_PARAMS = ["self", "color"]
+
+
+def enabled() -> bool:
+    return os.getenv("GLYPH_CACHE", "1") == "1"
+
+
+def cache_root() -> Path:
+    return Path(os.getenv("GLYPH_CACHE_DIR", "output/glyph_cache")).resolve()
+
+
+def wrap_command(command):
+    """Run a manim command through the cache runner when GLYPH_CACHE is on
+
+    Handles plain `manim ...` and the profiler forms (`-m manim`, py-spy's
+    `-- manim`). The word "manim" stays in the command so its progress is
+    still parsed.
+    """
+    if not enabled():
+        return command
+    command = [str(part) for part in command]
+    for i, part in enumerate(command):
+        if part == "manim" and i and command[i - 1] == "-m":
+            return command[:i] + [RUNNER_MODULE, "manim"] + command[i + 1 :]
+        if os.path.basename(part) == "manim" and (i == 0 or command[i - 1] == "--"):
+            runner = [sys.executable, "-m", RUNNER_MODULE, "manim"]
+            return command[:i] + runner + command[i + 1 :]
+    return command
+
+
+class GlyphCache:
+    """Content-addressed SVG store, safe for concurrent processes.
+
+    Entries are published with an atomic rename, so readers never see a
+    partial file. Lookups and publishes hold a shared flock on the cache;
+    eviction and the stats file take it exclusively. A hit touches the
+    entry's mtime, which orders the LRU eviction.
+    """
+
+    def __init__(self, root=None, max_mb=None):
+        self.root = Path(root) if root else cache_root()
+        self.max_mb = float(
+            max_mb if max_mb is not None else os.getenv("GLYPH_CACHE_MAX_MB", "512")
+        )
+        self.hits = {kind: 0 for kind in KINDS}
+        self.misses = {kind: 0 for kind in KINDS}
+        for kind in KINDS:
+            (self.root / kind).mkdir(parents=True, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive=False):
+        with open(self.root / ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def fetch(self, kind, target: Path) -> bool:
+        """Put the cached SVG named like `target` there; False on a miss"""
+        entry = self.root / kind / target.name
+        with self._locked():
+            if not entry.exists():
+                self.misses[kind] += 1
+                return False
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(entry, target)
+            except FileExistsError:
+                pass
+            except OSError:
+                shutil.copy2(entry, target)
+            os.utime(entry)
+        self.hits[kind] += 1
+        return True
+
+    def publish(self, kind, svg_file):
+        svg_file = Path(svg_file)
+        entry = self.root / kind / svg_file.name
+        if not svg_file.exists() or entry.exists():
+            return
+        staging = entry.with_name(f".{entry.name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with self._locked():
+                shutil.copyfile(svg_file, staging)
+                os.replace(staging, entry)
+        except OSError as e:
+            logging.warning(f"Failed to cache {svg_file.name}: {e}")
+            with contextlib.suppress(OSError):
+                staging.unlink()
+
+    def _stats_path(self) -> Path:
+        return self.root / "stats.json"
+
+    def _read_stats(self) -> dict:
+        try:
+            return json.loads(self._stats_path().read_text())
+        except (OSError, ValueError):
+            return {kind: {"hits": 0, "misses": 0} for kind in KINDS}
+
+    def record(self):
+        """Add this process's lookups to the cache-wide counters"""
+        if not any(self.hits.values()) and not any(self.misses.values()):
+            return
+        with self._locked(exclusive=True):
+            stats = self._read_stats()
+            for kind in KINDS:
+                counts = stats.setdefault(kind, {"hits": 0, "misses": 0})
+                counts["hits"] += self.hits[kind]
+                counts["misses"] += self.misses[kind]
+            self._stats_path().write_text(json.dumps(stats))
+        by_kind = ", ".join(
+            f"{kind} {self.hits[kind]}/{self.hits[kind] + self.misses[kind]}"
+            for kind in KINDS
+        )
+        logging.info(f"Glyph cache hits: {by_kind}")
+
+    def _entries(self):
+        for kind in KINDS:
+            for entry in (self.root / kind).iterdir():
+                try:
+                    yield entry, entry.stat()
+                except OSError:
+                    pass
+
+    def evict(self) -> dict:
+        """Drop least recently used entries until the cache fits GLYPH_CACHE_MAX_MB
+
+        Returns the cache-wide stats with the size after eviction.
+        """
+        limit = self.max_mb * 1024 * 1024
+        with self._locked(exclusive=True):
+            entries = sorted(self._entries(), key=lambda item: item[1].st_mtime)
+            size = sum(stat.st_size for _, stat in entries)
+            evicted = 0
+            for entry, stat in entries:
+                if size <= limit and not entry.name.endswith(".tmp"):
+                    continue
+                # Staging files only outlive a publish when its process died
+                with contextlib.suppress(OSError):
+                    entry.unlink()
+                    size -= stat.st_size
+                    evicted += 1
+            stats = self._read_stats()
+        if evicted:
+            logging.info(f"Evicted {evicted} glyphs from the cache")
+        hits = sum(stats.get(kind, {}).get("hits", 0) for kind in KINDS)
+        misses = sum(stats.get(kind, {}).get("misses", 0) for kind in KINDS)
+        stats["entries"] = len(entries) - evicted
+        stats["bytes"] = size
+        stats["hit_rate"] = hits / (hits + misses) if hits + misses else 0.0
+        return stats
+
+
+def _params(func):
+    try:
+        return list(inspect.signature(func).parameters)
+    except (TypeError, ValueError):
+        return None
+
+
+def install(cache: GlyphCache) -> list:
+    """Route manim's Tex and Text SVG creation through `cache`
+
+    Each target is only patched when its signature and the helpers the
+    wrapper calls match the manim versions this was written for; a
+    mismatch leaves that target alone (uncached). Returns what was patched.
+    """
+    from manim import config
+    from manim.mobject.text import tex_mobject, text_mobject
+    from manim.utils import tex_file_writing
+
+    tex_to_svg_file = getattr(tex_file_writing, "tex_to_svg_file", None)
+    generate_tex_file = getattr(tex_file_writing, "generate_tex_file", None)
+
+    def cached_tex_to_svg_file(expression, environment=None, tex_template=None):
+        tex_file = tex_file_writing.generate_tex_file(
+            expression, environment, tex_template
+        )
+        svg_file = tex_file.with_suffix(".svg")
+        if svg_file.exists() or cache.fetch("Tex", svg_file):
+            return svg_file
+        svg_file = tex_to_svg_file(expression, environment, tex_template)
+        cache.publish("Tex", svg_file)
+        return svg_file
+
+    def cached_text2svg(text2svg):
+        def _text2svg(self, color):
+            text_dir = Path(config.get_dir("text_dir"))
+            svg_file = text_dir / f"{self._text2hash(color)}.svg"
+            if not svg_file.exists() and not cache.fetch("texts", svg_file):
+                svg = text2svg(self, color)
+                cache.publish("texts", svg)
+                return svg
+            return text2svg(self, color)
+
+        return _text2svg
+
+    patched = []
+    if (
+        _params(tex_to_svg_file) == TEX_PARAMS
+        and (_params(generate_tex_file) or [])[:3] == TEX_PARAMS
+        and getattr(tex_mobject, "tex_to_svg_file", None) is tex_to_svg_file
+    ):
+        tex_file_writing.tex_to_svg_file = cached_tex_to_svg_file
+        tex_mobject.tex_to_svg_file = cached_tex_to_svg_file
+        patched.append("tex_to_svg_file")
+    else:
+        logging.warning("Unexpected manim tex_to_svg_file, Tex glyphs not cached")
+    for name in ("Text", "MarkupText"):
+        cls = getattr(text_mobject, name, None)
+        if (
+            cls is not None
+            and _params(getattr(cls, "_text2svg", None)) == TEXT_PARAMS
+            and hasattr(cls, "_text2hash")
+            and hasattr(config, "get_dir")
+        ):
+            cls._text2svg = cached_text2svg(cls._text2svg)
+            patched.append(f"{name}._text2svg")
+        else:
+            logging.warning(f"Unexpected manim {name}, its glyphs are not cached")
+    return patched
+
+
+def maintain() -> dict:
+    """Evict down to the size limit after a render; returns the cache stats"""
+    from src.utils.metrics import GLYPH_CACHE_BYTES, GLYPH_CACHE_HIT_RATE
+
+    stats = GlyphCache().evict()
+    GLYPH_CACHE_BYTES.set(stats["bytes"])
+    GLYPH_CACHE_HIT_RATE.set(stats["hit_rate"])
+    return stats
+
+
+if __name__ == "__main__":
+    from src.utils.log_config import setup_logging
+
+    setup_logging()
+    args = sys.argv[1:]
+    if args and args[0] == "manim":
+        args = args[1:]
+    try:
+        glyph_cache = GlyphCache()
+        install(glyph_cache)
+        atexit.register(glyph_cache.record)
+    except Exception as e:
+        # A broken cache must not fail the render
+        logging.warning(f"Glyph cache disabled: {e}")
+
+    from manim.__main__ import main
+
+    sys.argv = ["manim", *args]
+    main()
@@ -2,18 +2,164 @@ import re
 import subprocess
 import os
 import glob
+import importlib
 import logging
 import tempfile
 import shutil
 import uuid
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import time
 
+from src.services import glyph_cache_service
+from src.services.audio_encoder_service import STREAM_COPY_AUDIO_EXTENSIONS
+from src.services.scheduler_service import scheduled_render
+from src.services.section_render_service import (
+    count_from_output,
+    plan_scene,
+    section_count,
+    split_animations,
+)
+from src.utils import media_info, process_runner, scratch
+from src.utils.encoding_profiles import get_profile
+from src.utils.profiling import profiled_command, write_summary
+from src.utils.tracing import set_attributes, span, traced, with_context
+
+# Final outputs composable from one render; the first requested one is the
+# job's primary video
+OUTPUT_KINDS = ("portrait", "landscape", "preview")
+
+
+# manim's output folder for each quality flag
+QUALITY_DIRS = {"-ql": "480p15", "-qm": "720p30", "-qh": "1080p60"}
+BLACK_INTERVAL = re.compile(r"black_start:([\d.]+) black_end:([\d.]+)")
+
+
+class PreviewReport:
+    """Automatic QA of a low-quality preview render"""
+
+    def __init__(self, video, duration, narration_duration, black):
+        self.video = video
+        self.duration = duration
+        self.narration_duration = narration_duration
+        self.black = black
+        self.black_seconds = sum(end - start for start, end in black)
+        self.thumbnail = None
+        self.issues = []
+
+        min_ratio = float(os.getenv("PREVIEW_MIN_DURATION_RATIO", "0.5"))
+        if narration_duration and duration < narration_duration * min_ratio:
+            self.issues.append(
+                f"the animation lasts {duration:.1f}s but the narration lasts "
+                f"{narration_duration:.1f}s; make the animation at least "
+                f"{narration_duration * min_ratio:.1f}s long with more or longer "
+                f"animations and waits"
+            )
+        max_blank = float(os.getenv("PREVIEW_MAX_BLANK_RATIO", "0.5"))
+        if duration and self.black_seconds > duration * max_blank:
+            self.issues.append(
+                f"{self.black_seconds:.1f}s of the {duration:.1f}s animation is a "
+                f"blank frame; make sure objects are added and stay on screen"
+            )
+
+    @property
+    def passed(self) -> bool:
+        return not self.issues
+
+    def thumbnail_time(self) -> float:
+        """Middle of the longest stretch that is not blank"""
+        spans, cursor = [], 0.0
+        for start, end in sorted(self.black):
+            spans.append((cursor, start))
+            cursor = max(cursor, end)
+        spans.append((cursor, self.duration))
+        start, end = max(spans, key=lambda span: span[1] - span[0])
+        return max(start + (end - start) / 2, 0.0)
+
+    def as_dict(self):
+        return {
+            "video": self.video,
+            "duration": round(self.duration, 2),
+            "narration_duration": self.narration_duration,
+            "black_seconds": round(self.black_seconds, 2),
+            "thumbnail": self.thumbnail,
+            "issues": self.issues,
+        }
+
+
+class PreviewRejected(subprocess.CalledProcessError):
+    """A preview render that failed QA; stderr explains why, for the fix loop"""
+
+    def __init__(self, command, report: PreviewReport):
+        message = "The rendered scene failed preview QA: " + "; ".join(
+            report.issues or ["it was not approved"]
+        )
+        super().__init__(1, command, output="", stderr=message)
+        self.report = report
+
+    def __str__(self):
+        return self.stderr
+
+
+def requested_outputs(outputs=None):
+    """Validated output list, VIDEO_OUTPUTS (comma separated) when not given"""
+    if not outputs:
+        outputs = [o.strip() for o in os.getenv("VIDEO_OUTPUTS", "portrait").split(",")]
+    outputs = list(dict.fromkeys(o for o in outputs if o))
+    unknown = [o for o in outputs if o not in OUTPUT_KINDS]
+    if unknown or not outputs:
+        raise ValueError(f"Unknown video outputs {unknown}, expected {OUTPUT_KINDS}")
+    return outputs
+
+
+def output_paths(final_video, outputs):
+    """{name: path} of the outputs composed beside a primary video path
+
+    Accepts the {voice: path} mapping of localized renders as well.
+    """
+    if isinstance(final_video, dict):
+        return {
+            voice: output_paths(path, outputs) for voice, path in final_video.items()
+        }
+    outputs = requested_outputs(outputs)
+    directory, name = os.path.split(final_video)
+    suffix = name[len(f"{outputs[0]}_output") :]
+    return {
+        output: os.path.join(directory, f"{output}_output{suffix}")
+        for output in outputs
+    }
+
+
+def load_preview_approver(spec=None):
+    """The PREVIEW_APPROVER callable ("package.module:function"), or None"""
+    spec = spec or os.getenv("PREVIEW_APPROVER")
+    if not spec:
+        return None
+    module_name, _, function = spec.partition(":")
+    if not function:
+        raise ValueError(f"PREVIEW_APPROVER must be module:function, got {spec!r}")
+    return getattr(importlib.import_module(module_name), function)
+
 
 class ManimVideoProcessor:
-    def __init__(self, base_output_dir="output"):
+    def __init__(
+        self, base_output_dir="output", encoding_profile=None, preview_approver=None
+    ):
         self.base_output_dir = Path(base_output_dir)
+        # draft / fast / delivery, ENCODING_PROFILE when not given
+        self.profile = get_profile(encoding_profile)
+        # "hold" freezes the last frame when narration outlasts the render,
+        # "loop" replays the clip as before
+        self.extend_mode = os.getenv("EXTEND_MODE", "hold")
+        # Drop repeated frames (wait() holds) and write variable frame rate
+        self.drop_static_frames = os.getenv("DROP_STATIC_FRAMES", "1") == "1"
+        # Render -ql first and only render -qh for previews that pass QA;
+        # `preview_approver(report) -> bool` adds a human or custom check,
+        # PREVIEW_APPROVER when not given
+        self.render_preview_first = os.getenv("RENDER_PREVIEW", "0") == "1"
+        self.preview_approver = preview_approver or load_preview_approver()
+        self.preview_report = None
         self.session_id = str(uuid.uuid4())[:8]
         self.temp_dir = None
         self.lock = threading.Lock()
@@ -22,7 +168,13 @@ class ManimVideoProcessor:
     def __enter__(self):
         # Create temporary directory for this session
         # self.temp_dir = Path(tempfile.mkdtemp(prefix=f"manim_video_{self.session_id}_"))
-        self.temp_dir = Path("output_final") / f"manim_video_{self.session_id}"
+        # On tmpfs when SCRATCH_BACKEND allows and there is room, else on disk
+        self.temp_dir = Path(
+            scratch.place(
+                Path("output_final") / f"manim_video_{self.session_id}",
+                expected_mb=float(os.getenv("SCRATCH_SESSION_MB", "256")),
+            )
+        )
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         return self
 
@@ -46,6 +198,8 @@ class ManimVideoProcessor:
                 if self.temp_dir and self.temp_dir.exists():
                     shutil.rmtree(self.temp_dir, ignore_errors=True)
                     logging.info(f"Removed temporary directory: {self.temp_dir}")
+                if self.temp_dir:
+                    scratch.release([str(self.temp_dir)])
 
         except Exception as e:
             logging.error(f"Error during cleanup: {e}")
@@ -57,6 +211,11 @@ class ManimVideoProcessor:
             return match.group(1)
         raise ValueError("No Scene class found in generated code")
 
+    def _variant_name(self, prefix, variant=None):
+        """File name for an intermediate, unique per session and output variant"""
+        suffix = f"_{variant}" if variant else ""
+        return f"{prefix}_{self.session_id}{suffix}.mp4"
+
     def ensure_directories(self):
         """Create all necessary output directories"""
         directories = [
@@ -70,13 +229,59 @@ class ManimVideoProcessor:
             directory.mkdir(parents=True, exist_ok=True)
             logging.info(f"Ensured directory exists: {directory}")
 
-    def run_subprocess_safely(self, command, timeout=300):
-        """Run subprocess with proper error handling and timeout"""
+    def _progress_logger(self, command, interval=5.0):
+        """Log streamed progress events at most every `interval` seconds"""
+        label = os.path.basename(command[0])
+        last_logged = [0.0]
+
+        def _on_progress(event):
+            if event.get("fps"):
+                set_attributes(fps=event["fps"])
+            if event.get("percent") is not None:
+                set_attributes(progress=round(event["percent"], 1))
+            now = time.monotonic()
+            if now - last_logged[0] >= interval or event.get("done"):
+                last_logged[0] = now
+                details = ", ".join(
+                    f"{key}={value}" for key, value in event.items() if key != "tool"
+                )
+                logging.info(f"{label} progress: {details}")
+
+        return _on_progress
+
+    def run_subprocess_safely(
+        self, command, timeout=300, fail_fast=False, limits=None
+    ):
+        """Run subprocess with proper error handling and timeout
+
+        The process runs in its own process group under the job's CPU set,
+        thread and memory limits (see process_runner, `limits` overrides
+        them for this command), and the whole group is
+        killed on timeout. manim and ffmpeg output is streamed: progress is
+        logged as it happens, only a bounded tail is kept for errors and,
+        with `fail_fast`, a Python traceback stops the process right away.
+        """
         try:
             logging.info(f"Running command: {' '.join(command)}")
-            result = subprocess.run(
-                command, check=True, capture_output=True, text=True, timeout=timeout
-            )
+            with span(
+                f"subprocess.{os.path.basename(command[0])}",
+                command=" ".join(map(str, command))[:500],
+                timeout=timeout,
+            ):
+                # manim renders share compiled Tex/Text glyphs across jobs
+                run_command = glyph_cache_service.wrap_command(command)
+                if process_runner.progress_parser_for(run_command):
+                    result = process_runner.stream(
+                        run_command,
+                        timeout=timeout,
+                        limits=limits,
+                        on_progress=self._progress_logger(command),
+                        fail_fast=process_runner.TRACEBACK_PATTERNS if fail_fast else (),
+                    )
+                else:
+                    result = process_runner.run(
+                        run_command, timeout=timeout, limits=limits
+                    )
             logging.info("Command completed successfully")
             return result
         except subprocess.TimeoutExpired:
@@ -86,32 +291,21 @@ class ManimVideoProcessor:
             logging.error(f"Command failed with exit code {e.returncode}")
             logging.error(f"STDOUT: {e.stdout}")
             logging.error(f"STDERR: {e.stderr}")
-            raise Exception(f"Command failed: {' '.join(command)}\nError: {e.stderr}")
+            # Re-raised as is: the render fix loop feeds e.stderr back to Gemini
+            raise
 
     def get_media_duration(self, file_path):
-        """Get duration of media file using ffprobe"""
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Media file not found: {file_path}")
-
-        command = [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            str(file_path),
-        ]
+        """Get duration of media file (cached probe, WAV header without ffprobe)"""
+        return media_info.duration(file_path)
 
-        result = self.run_subprocess_safely(command)
-        try:
-            return float(result.stdout.strip())
-        except ValueError:
-            raise Exception(f"Could not parse duration from: {result.stdout}")
+    @traced("manim.render")
+    def create_manim_scene(self, manim_code, narration_duration=None):
+        """Create and render Manim scene
 
-    def create_manim_scene(self, manim_code):
-        """Create and render Manim scene"""
+        With RENDER_PREVIEW=1 a -ql preview is rendered and checked first
+        (see render_preview); PreviewRejected is raised instead of rendering
+        a scene that fails.
+        """
         logging.info("Creating Manim scene")
 
         # Clean the code
@@ -128,36 +322,307 @@ class ManimVideoProcessor:
         scene_name = self.get_scene_name(manim_code_clean)
         logging.info(f"Identified scene name: {scene_name}")
 
-        # Render with Manim
-        command = ["manim", "-qh", str(script_file), scene_name]
-        self.run_subprocess_safely(command)
+        if self.render_preview_first:
+            report = self.render_preview(script_file, scene_name, narration_duration)
+            if not report.passed:
+                raise PreviewRejected(["manim", "-ql", str(script_file)], report)
+            logging.info("Preview passed QA, rendering full quality")
 
-        # Find the rendered video
-        output_pattern = self.base_output_dir / "video" / f"{scene_name}.mp4"
-        if not output_pattern.exists():
-            # Try alternative locations
-            media_dir = Path("media/videos")
-            if media_dir.exists():
-                for video_file in media_dir.rglob(f"{scene_name}.mp4"):
-                    shutil.copy2(video_file, output_pattern)
-                    break
+        # Per session: a failed job's render is kept for resuming and must not
+        # be taken for this one's (same scene class name, or a fix attempt)
+        output_pattern = (
+            self.base_output_dir / "video" / f"{scene_name}_{self.session_id}.mp4"
+        )
+        if output_pattern.exists():
+            output_pattern.unlink()
+        # Waits for room on the box; the timeout is sized to the predicted cost
+        with scheduled_render(manim_code_clean) as estimate:
+            ranges = self._plan_sections(
+                script_file, scene_name, manim_code_clean, estimate.timeout
+            )
+            if len(ranges) > 1:
+                self._render_sections(
+                    script_file, scene_name, ranges, estimate.timeout, output_pattern
+                )
             else:
-                raise Exception(f"No rendered video found for scene {scene_name}")
+                # Render with Manim
+                command, profile_path = profiled_command(
+                    "render.manim", ["manim", "-qh", str(script_file), scene_name]
+                )
+                self.run_subprocess_safely(
+                    command,
+                    timeout=estimate.timeout,
+                    fail_fast=os.getenv("RENDER_FAIL_FAST", "1") == "1",
+                )
+                if profile_path and profile_path.endswith(".prof"):
+                    write_summary(profile_path)
+        if glyph_cache_service.enabled():
+            stats = glyph_cache_service.maintain()
+            set_attributes(glyph_cache_hit_rate=round(stats["hit_rate"], 3))
+
+        # Find the rendered video
+        self._collect_render(scene_name, "-qh", output_pattern, script_file)
 
+        set_attributes(scene=scene_name, output_bytes=os.path.getsize(output_pattern))
         logging.info(f"Manim video created: {output_pattern}")
         return str(output_pattern)
 
-    def extend_video_to_audio_length(self, video_file, audio_duration):
+    def _split_limits(self, parts):
+        """The job's resource limits with its thread budget shared by `parts`"""
+        limits = process_runner.current_limits()
+        threads = limits.threads or (
+            len(limits.cpus) if limits.cpus else os.cpu_count() or 1
+        )
+        return process_runner.ResourceLimits(
+            cpus=limits.cpus,
+            threads=max(1, threads // parts),
+            memory_mb=limits.memory_mb,
+            nice=limits.nice,
+            cgroup=limits.cgroup,
+        )
+
+    def _plan_sections(self, script_file, scene_name, manim_code, timeout):
+        """Animation ranges to render in parallel, one range when not splitting
+
+        RENDER_SECTIONS sets how many processes (a number, or "auto" for one
+        per CPU of the job); the default 1 renders in one go. A dry run
+        (no frames written) counts the animations and fills the shared
+        media/Tex cache before the sections start; when the AST gives the
+        exact play order, cuts balance animated seconds and prefer
+        self.next_section() boundaries.
+        """
+        limits = process_runner.current_limits()
+        wanted = section_count(len(limits.cpus) if limits.cpus else None)
+        if wanted <= 1:
+            return [(0, None)]
+        plan = plan_scene(manim_code)
+        if plan is None or not plan.safe:
+            logging.info("Scene uses randomness or updaters, rendering in one go")
+            return [(0, None)]
+
+        with span("manim.dry_run"):
+            result = self.run_subprocess_safely(
+                ["manim", "--dry_run", str(script_file), scene_name], timeout=timeout
+            )
+        count = count_from_output(f"{result.stdout}\n{result.stderr}")
+        if not count:
+            logging.warning("Could not count the scene's animations, one render")
+            return [(0, None)]
+
+        exact = plan.exact and plan.count == count
+        ranges = split_animations(
+            count,
+            wanted,
+            plan.durations if exact else None,
+            plan.sections if exact else None,
+            int(os.getenv("RENDER_SECTION_MIN_ANIMATIONS", "2")),
+        )
+        set_attributes(animations=count, sections=len(ranges))
+        return ranges
+
+    def _render_sections(self, script_file, scene_name, ranges, timeout, output):
+        """Render animation ranges in parallel manim processes and join them
+
+        Each process runs `manim -n start,end`: construct() replays the
+        animations before `start` without writing frames and renders only its
+        range, into its own media dir that shares the Tex/Text caches. The
+        section movies have identical encoding and are concatenated by copy.
+        """
+        logging.info(f"Rendering {scene_name} in {len(ranges)} sections: {ranges}")
+        limits = self._split_limits(len(ranges))
+        section_videos = [None] * len(ranges)
+        # 1080p60 partial movies: on tmpfs only when they fit beside the rest
+        section_mb = float(os.getenv("SCRATCH_SECTION_MB", "512"))
+        sections_dir = Path(
+            scratch.place(
+                Path("output_final") / f"manim_sections_{self.session_id}",
+                expected_mb=len(ranges) * section_mb,
+            )
+        )
+
+        def _render(index):
+            start, end = ranges[index]
+            media_dir = sections_dir / str(index)
+            media_dir.mkdir(parents=True, exist_ok=True)
+            for cache in ("Tex", "texts"):
+                shared = (Path("media") / cache).resolve()
+                shared.mkdir(parents=True, exist_ok=True)
+                if not (media_dir / cache).exists():
+                    (media_dir / cache).symlink_to(shared, target_is_directory=True)
+            command = [
+                "manim",
+                "-qh",
+                "--media_dir",
+                str(media_dir),
+                "-n",
+                f"{start},{end}" if end is not None else str(start),
+                str(script_file),
+                scene_name,
+            ]
+            with span("manim.section", index=index, start=start, end=end):
+                self.run_subprocess_safely(
+                    command,
+                    timeout=timeout,
+                    fail_fast=os.getenv("RENDER_FAIL_FAST", "1") == "1",
+                    limits=limits,
+                )
+            pattern = f"{QUALITY_DIRS['-qh']}/{scene_name}.mp4"
+            videos = media_dir / "videos"
+            section_videos[index] = next(
+                videos.rglob(pattern) if videos.exists() else iter(()), None
+            )
+            if section_videos[index] is None:
+                raise Exception(
+                    f"manim wrote no video for section {index} "
+                    f"(animations {start}-{end}) of {scene_name}"
+                )
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+                for future in [
+                    pool.submit(with_context(_render), i) for i in range(len(ranges))
+                ]:
+                    future.result()
+
+            concat_list = self.temp_dir / f"sections_{self.session_id}.txt"
+            with open(concat_list, "w") as f:
+                for path in section_videos:
+                    f.write(f"file '{path.resolve()}'\n")
+            self.run_subprocess_safely(
+                [
+                    "ffmpeg",
+                    "-y",
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
+                    "-i",
+                    str(concat_list),
+                    "-c",
+                    "copy",
+                    str(output),
+                ]
+            )
+        finally:
+            shutil.rmtree(sections_dir, ignore_errors=True)
+            scratch.release([str(sections_dir)])
+
+    def _collect_render(self, scene_name, quality, target, script_file=None):
+        """Link manim's output for `quality` to `target` unless it is there
+
+        Only the media folder of `script_file` is searched when given, so a
+        render of another job's script with the same scene name is not used.
+        """
+        if target.exists():
+            return
+        # Try alternative locations
+        media_dir = Path("media/videos")
+        if script_file:
+            media_dir = media_dir / Path(script_file).stem
+        pattern = f"{QUALITY_DIRS[quality]}/{scene_name}.mp4"
+        for video_file in media_dir.rglob(pattern) if media_dir.exists() else []:
+            # A hard link avoids rewriting the whole render
+            try:
+                os.link(video_file, target)
+            except OSError:
+                shutil.copy2(video_file, target)
+            return
+        raise Exception(f"No rendered video found for scene {scene_name}")
+
+    @traced("manim.preview")
+    def render_preview(self, script_file, scene_name, narration_duration=None):
+        """Render the scene at -ql and run the automatic QA checks on it
+
+        Checks the animation length against the narration and the share of
+        blank (black) frames, then grabs a thumbnail from the middle of the
+        longest non-blank stretch. The preview video and thumbnail are kept
+        in output/preview for reuse. Returns the PreviewReport.
+        """
+        preview_dir = self.base_output_dir / "preview"
+        preview_dir.mkdir(parents=True, exist_ok=True)
+        preview_video = preview_dir / f"{scene_name}_{self.session_id}.mp4"
+
+        # Takes a render slot like the full render, but a -ql timing would
+        # skew the -qh cost model, so it is not recorded
+        with scheduled_render(Path(script_file).read_text(), record=False):
+            self.run_subprocess_safely(
+                ["manim", "-ql", str(script_file), scene_name],
+                timeout=int(os.getenv("RENDER_PREVIEW_TIMEOUT", "300")),
+                fail_fast=os.getenv("RENDER_FAIL_FAST", "1") == "1",
+            )
+        self._collect_render(scene_name, "-ql", preview_video, script_file)
+
+        result = self.run_subprocess_safely(
+            [
+                "ffmpeg",
+                "-i",
+                str(preview_video),
+                "-vf",
+                "blackdetect=d=0.5:pic_th=0.999:pix_th=0.05",
+                "-an",
+                "-f",
+                "null",
+                "-",
+            ]
+        )
+        black = [
+            (float(start), float(end))
+            for start, end in BLACK_INTERVAL.findall(result.stderr or "")
+        ]
+        report = PreviewReport(
+            str(preview_video),
+            self.get_media_duration(preview_video),
+            narration_duration,
+            black,
+        )
+
+        thumbnail = preview_dir / f"{scene_name}_{self.session_id}.jpg"
+        try:
+            self.run_subprocess_safely(
+                [
+                    "ffmpeg",
+                    "-y",
+                    "-ss",
+                    f"{report.thumbnail_time():.3f}",
+                    "-i",
+                    str(preview_video),
+                    "-frames:v",
+                    "1",
+                    str(thumbnail),
+                ]
+            )
+            report.thumbnail = str(thumbnail)
+        except Exception as e:
+            logging.warning(f"Could not extract a thumbnail from the preview: {e}")
+
+        if report.passed and self.preview_approver:
+            if not self.preview_approver(report):
+                report.issues.append("the preview was not approved")
+        self.preview_report = report
+        set_attributes(
+            preview_passed=report.passed,
+            preview_duration=round(report.duration, 2),
+            preview_black_seconds=round(report.black_seconds, 2),
+        )
+        logging.info(f"Preview QA: {report.as_dict()}")
+        return report
+
+    @traced("ffmpeg.extend")
+    def extend_video_to_audio_length(
+        self, video_file, audio_duration, variant=None, video_duration=None
+    ):
         """Extend video duration to match audio length"""
-        video_duration = self.get_media_duration(video_file)
+        if video_duration is None:
+            video_duration = self.get_media_duration(video_file)
 
         if audio_duration <= video_duration:
             return video_file
 
         logging.info(f"Extending video from {video_duration}s to {audio_duration}s")
 
-        extended_video = self.temp_dir / f"extended_video_{self.session_id}.mp4"
-        self.cleanup_files.append(str(extended_video))
+        extended_video = self.temp_dir / self._variant_name("extended_video", variant)
+        with self.lock:
+            self.cleanup_files.append(str(extended_video))
 
         # Calculate how many times to loop the video
         loop_count = int(audio_duration / video_duration) + 1
@@ -180,62 +645,120 @@ class ManimVideoProcessor:
         self.run_subprocess_safely(command)
         return str(extended_video)
 
-    def merge_video_audio(self, video_file, audio_file):
-        """Merge video with audio track"""
-        if not audio_file or not os.path.exists(audio_file):
-            logging.warning("No audio file provided or audio file doesn't exist")
-            return video_file
+    def _final_source(self, video_file, audio_file=None, variant=None):
+        """Inputs of the final encode, which also muxes in the narration
 
-        logging.info(f"Merging video with audio: {audio_file}")
+        The render and the narration are read directly by the encoding
+        ffmpeg instead of through a merged_video_* remux written to scratch.
+        """
+        if audio_file and not os.path.exists(audio_file):
+            logging.warning(f"Audio file doesn't exist: {audio_file}")
+            audio_file = None
+        info = media_info.probe(video_file)
+        source = {
+            "video": video_file,
+            "audio": video_file,
+            "audio_stream": "a:0?",
+            "audio_args": ["-c:a", "copy"],
+            "fps": info.fps,
+            "duration": info.duration,
+            "hold": self._hold_seconds(info),
+        }
+        if not audio_file:
+            return source
 
-        video_duration = self.get_media_duration(video_file)
+        video_duration = info.video_duration or info.duration
         audio_duration = self.get_media_duration(audio_file)
-
         logging.info(
             f"Video duration: {video_duration}s, Audio duration: {audio_duration}s"
         )
+        if audio_duration > video_duration and self.extend_mode != "hold":
+            source["video"] = self.extend_video_to_audio_length(
+                video_file, audio_duration, variant, video_duration
+            )
+            video_duration = audio_duration
+        hold = audio_duration - video_duration
+        hold = hold if hold > 1 / (info.fps or 30) else 0.0
+        # Narration already encoded to the delivery codec is stream-copied
+        audio_args = self.profile.audio_args()
+        if Path(audio_file).suffix.lower() in STREAM_COPY_AUDIO_EXTENSIONS:
+            audio_args = ["-c:a", "copy"]
+        if not hold:
+            # End when shortest stream ends. Not with a hold: mpdecimate may
+            # drop the held frames, and the narration must still play out.
+            audio_args = audio_args + ["-shortest"]
+        source.update(
+            audio=audio_file,
+            audio_stream="a:0",
+            audio_args=audio_args,
+            # Held or cut by -shortest, the result runs as long as the audio
+            duration=audio_duration,
+            hold=hold,
+        )
+        return source
+
+    def _input_args(self, source):
+        args = ["-i", source["video"]]
+        if source["audio"] != source["video"]:
+            args += ["-i", source["audio"]]
+            return args, f"1:{source['audio_stream']}"
+        return args, f"0:{source['audio_stream']}"
+
+    @traced("ffmpeg.portrait")
+    def crop_to_portrait(
+        self, video_file, subtitle_file=None, variant=None, audio_file=None
+    ):
+        """Crop video to 9:16 portrait aspect ratio (muxing in `audio_file`)"""
+        logging.info(
+            f"Cropping video to 9:16 portrait format ({self.profile.name} profile)"
+        )
 
-        # Extend video if needed
-        if audio_duration > video_duration:
-            video_file = self.extend_video_to_audio_length(video_file, audio_duration)
+        portrait_video = (
+            self.base_output_dir
+            / "final_video"
+            / self._variant_name("portrait_output", variant)
+        )
 
-        # Merge video and audio
-        merged_video = self.temp_dir / f"merged_video_{self.session_id}.mp4"
-        self.cleanup_files.append(str(merged_video))
+        video_filter = self._portrait_filter(subtitle_file)
+        source = self._final_source(video_file, audio_file, variant)
+        video_args = self.profile.video_args(source["fps"], self.drop_static_frames)
+        hold = source["hold"]
+        segments = self._portrait_segments(source["video"], source["duration"])
+        set_attributes(
+            segments=len(segments), profile=self.profile.name, hold=round(hold, 3)
+        )
+        if len(segments) > 1:
+            self._encode_segmented(
+                source, video_filter, video_args, segments, portrait_video, variant
+            )
+            set_attributes(output_bytes=os.path.getsize(portrait_video))
+            logging.info(f"Portrait video created: {portrait_video}")
+            return str(portrait_video)
 
+        inputs, audio_map = self._input_args(source)
         command = [
             "ffmpeg",
             "-y",
-            "-i",
-            video_file,
-            "-i",
-            audio_file,
-            "-c:v",
-            "copy",
-            "-c:a",
-            "aac",
+            *inputs,
+            "-vf",
+            self._portrait_chain(video_filter, hold, source["fps"]),
             "-map",
             "0:v:0",
             "-map",
-            "1:a:0",
-            "-shortest",  # End when shortest stream ends
-            str(merged_video),
+            audio_map,
+            *video_args,
+            *source["audio_args"],
+            *self.profile.container_args(),
+            str(portrait_video),
         ]
 
         self.run_subprocess_safely(command)
-        return str(merged_video)
-
-    def crop_to_portrait(self, video_file, subtitle_file=None):
-        """Crop video to 9:16 portrait aspect ratio"""
-        logging.info("Cropping video to 9:16 portrait format")
-        subtitle_file = "output/subtitles/subtitles.ass"
-
-        portrait_video = (
-            self.base_output_dir
-            / "final_video"
-            / f"portrait_output_{self.session_id}.mp4"
-        )
+        set_attributes(output_bytes=os.path.getsize(portrait_video))
+        logging.info(f"Portrait video created: {portrait_video}")
+        return str(portrait_video)
 
+    def _portrait_filter(self, subtitle_file=None):
+        """9:16 crop/pad filter, with the subtitles burned in when available"""
         # Build filter complex
         video_filter = "scale=w=min(iw\\,ih*9/16):h=min(ih\\,iw*16/9):force_original_aspect_ratio=decrease,pad=ceil(iw/2)*2:ceil(ih*16/9/2)*2:(ow-iw)/2:(oh-ih)/2:black"
 
@@ -245,25 +768,288 @@ class ManimVideoProcessor:
             logging.info(f"Adding subtitles from: {subtitle_file}")
         else:
             logging.info(f"No subtitle file provided or subtitle file doesn't exist: {subtitle_file}")
+        return video_filter
+
+    @traced("ffmpeg.outputs")
+    def compose_outputs(
+        self,
+        video_file,
+        subtitle_file=None,
+        variant=None,
+        outputs=None,
+        audio_file=None,
+    ):
+        """Encode several final outputs from a single decode of `video_file`
+
+        The decoded (and, if needed, last-frame held) stream is split into a
+        9:16 portrait with subtitles, a 16:9 landscape cut and a low-res
+        portrait preview, as requested. The preview is scaled from the
+        portrait branch so the subtitles are rendered once, and every output
+        gets the same audio track. Returns {output: path}.
+        """
+        outputs = requested_outputs(outputs)
+        logging.info(f"Composing outputs {outputs} in one pass")
+        source = self._final_source(video_file, audio_file, variant)
+        hold = source["hold"]
+        dedup = ""
+        if self.drop_static_frames:
+            dedup = f",{self._dedup_filter(source['fps'])}"
+
+        branches = [o for o in ("portrait", "landscape") if o in outputs]
+        if "preview" in outputs and "portrait" not in outputs:
+            branches.insert(0, "portrait")
+        head = f"tpad=stop_mode=clone:stop_duration={hold:.3f}," if hold else ""
+        graph = [
+            f"[0:v]{head}split={len(branches)}"
+            + "".join(f"[{branch}_in]" for branch in branches)
+        ]
+        if "portrait" in branches:
+            portrait = f"[portrait_in]{self._portrait_filter(subtitle_file)}"
+            height = int(os.getenv("PREVIEW_HEIGHT", "640"))
+            preview = f"scale=-2:{height}{dedup}[preview]"
+            if "preview" in outputs and "portrait" in outputs:
+                graph.append(f"{portrait},split=2[portrait_full][preview_in]")
+                graph.append(f"[preview_in]{preview}")
+                graph.append(f"[portrait_full]null{dedup}[portrait]")
+            elif "preview" in outputs:
+                graph.append(f"{portrait},{preview}")
+            else:
+                graph.append(f"{portrait}{dedup}[portrait]")
+        if "landscape" in branches:
+            graph.append(
+                "[landscape_in]pad=ceil(max(iw\\,ih*16/9)/2)*2:"
+                "ceil(max(ih\\,iw*9/16)/2)*2:(ow-iw)/2:(oh-ih)/2:black"
+                f"{dedup}[landscape]"
+            )
+
+        paths = {
+            output: self.base_output_dir
+            / "final_video"
+            / self._variant_name(f"{output}_output", variant)
+            for output in outputs
+        }
+        inputs, audio_map = self._input_args(source)
+        # The job's thread cap is an output option, so every output needs it;
+        # ResourceLimits.apply_to_command only reaches the last one
+        threads = process_runner.current_limits().threads
+        command = ["ffmpeg", "-y"]
+        if threads:
+            command += ["-filter_complex_threads", str(threads)]
+        command += [*inputs, "-filter_complex", ";".join(graph)]
+        for output in outputs:
+            profile = get_profile("draft") if output == "preview" else self.profile
+            command += ["-map", f"[{output}]", "-map", audio_map]
+            command += profile.video_args(source["fps"], self.drop_static_frames)
+            if threads and not profile.threads:
+                command += ["-threads", str(threads)]
+            command += source["audio_args"]
+            command += [*profile.container_args(), str(paths[output])]
+
+        self.run_subprocess_safely(command)
+        set_attributes(
+            outputs=",".join(outputs),
+            output_bytes=sum(os.path.getsize(path) for path in paths.values()),
+        )
+        logging.info(f"Final outputs created: {paths}")
+        return {output: str(path) for output, path in paths.items()}
+
+    def finish_video(
+        self,
+        video_file,
+        subtitle_file=None,
+        variant=None,
+        outputs=None,
+        audio_file=None,
+    ):
+        """Compose the requested final outputs and return the primary one
+
+        A portrait-only job keeps the crop_to_portrait path, which can also
+        encode in parallel segments; several outputs share one decode instead.
+        """
+        outputs = requested_outputs(outputs)
+        if outputs == ["portrait"]:
+            return self.crop_to_portrait(video_file, subtitle_file, variant, audio_file)
+        return self.compose_outputs(
+            video_file, subtitle_file, variant, outputs, audio_file
+        )[outputs[0]]
+
+    def _hold_seconds(self, info):
+        """How long the video track must be held to reach the end of the audio"""
+        if not info.video_duration or not info.audio_duration:
+            return 0.0
+        hold = info.audio_duration - info.video_duration
+        # Less than a frame is muxing slack, not a missing stretch of video
+        return hold if hold > 1 / (info.fps or 30) else 0.0
+
+    def _dedup_filter(self, fps=None):
+        """mpdecimate keeping at least one frame a second
+
+        Without the cap a held tail (identical tpad clones) would be dropped
+        entirely and never reach the file.
+        """
+        return f"mpdecimate=max={max(1, round(fps or 30))}"
+
+    def _portrait_chain(self, video_filter, hold=0.0, fps=None):
+        """Last-frame hold, crop/subtitles, then duplicate-frame dropping
+
+        mpdecimate runs after the subtitles so frames whose captions change
+        are kept; what it drops is only truly static picture, which the VFR
+        output shows for the held duration instead of encoding again.
+        """
+        filters = []
+        if hold:
+            filters.append(f"tpad=stop_mode=clone:stop_duration={hold:.3f}")
+        filters.append(video_filter)
+        if self.drop_static_frames:
+            filters.append(self._dedup_filter(fps))
+        return ",".join(filters)
+
+    def _portrait_segments(self, video_file, duration):
+        """(start, end) spans for a segment-parallel portrait encode
+
+        PORTRAIT_SEGMENTS sets how many (an integer, or "auto" for one per
+        CPU of the job); the default 1 keeps the single-pass encode. Spans are
+        at least PORTRAIT_SEGMENT_MIN_SECONDS long and every cut falls on a
+        keyframe of the input, so no segment starts mid-GOP.
+        """
+        setting = os.getenv("PORTRAIT_SEGMENTS", "1")
+        if setting == "auto":
+            limits = process_runner.current_limits()
+            wanted = len(limits.cpus) if limits.cpus else os.cpu_count() or 1
+        else:
+            wanted = int(setting)
+        min_seconds = float(os.getenv("PORTRAIT_SEGMENT_MIN_SECONDS", "10"))
+        count = min(wanted, int(duration // min_seconds))
+        if count <= 1:
+            return [(0.0, duration)]
+
+        try:
+            keyframes = [
+                t
+                for t in media_info.keyframe_times(video_file)
+                if min_seconds / 2 < t < duration - min_seconds / 2
+            ]
+        except Exception as e:
+            logging.warning(f"Keyframe probe failed, encoding in one pass: {e}")
+            return [(0.0, duration)]
+
+        cuts = [0.0]
+        for i in range(1, count):
+            target = duration * i / count
+            cut = min(keyframes, key=lambda t: abs(t - target), default=None)
+            if cut is not None and cut > cuts[-1]:
+                cuts.append(cut)
+        cuts.append(duration)
+        return list(zip(cuts, cuts[1:]))
+
+    def _encode_segmented(
+        self, source, video_filter, video_args, segments, output, variant
+    ):
+        """Encode the portrait pass per segment in parallel and join them
+
+        Each ffmpeg worker seeks to its keyframe and restores the original
+        timestamps before the filters, so the subtitles filter renders the
+        segment's own stretch of the ASS track; the timestamps are reset to
+        zero afterwards. `-t` limits the input, so the last segment's held
+        tail is kept. The video-only segments are joined losslessly with the
+        concat demuxer, which also muxes in the audio; each entry carries its
+        nominal duration, so static frames mpdecimate dropped at the end of a
+        segment do not pull the following segments ahead of the audio.
+        """
+        video_file, hold = source["video"], source["hold"]
+        logging.info(f"Encoding portrait video in {len(segments)} segments")
+        segment_limits = self._split_limits(len(segments))
+
+        segment_files = [
+            self.temp_dir / self._variant_name(f"portrait_segment_{i:03d}", variant)
+            for i in range(len(segments))
+        ]
+        with self.lock:
+            self.cleanup_files.extend(str(path) for path in segment_files)
+
+        def _encode(index):
+            start, end = segments[index]
+            # Only the last segment reaches the end of the video track
+            chain = self._portrait_chain(
+                video_filter,
+                hold if index == len(segments) - 1 else 0.0,
+                source["fps"],
+            )
+            command = [
+                "ffmpeg",
+                "-y",
+                "-ss",
+                f"{start:.6f}",
+                "-t",
+                f"{end - start:.6f}",
+                "-i",
+                video_file,
+                "-an",
+                "-vf",
+                f"setpts=PTS+{start:.6f}/TB,{chain},setpts=PTS-STARTPTS",
+                *video_args,
+                str(segment_files[index]),
+            ]
+            with span("ffmpeg.portrait.segment", index=index, start=start, end=end):
+                self.run_subprocess_safely(command, limits=segment_limits)
+
+        with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+            for future in [
+                pool.submit(with_context(_encode), i) for i in range(len(segments))
+            ]:
+                future.result()
+
+        concat_list = (
+            self.temp_dir / f"portrait_segments_{self.session_id}_{variant}.txt"
+        )
+        with self.lock:
+            self.cleanup_files.append(str(concat_list))
+        with open(concat_list, "w") as f:
+            for index, path in enumerate(segment_files):
+                start, end = segments[index]
+                duration = end - start
+                if index == len(segments) - 1:
+                    duration += hold
+                f.write(f"file '{path.resolve()}'\nduration {duration:.6f}\n")
 
         command = [
             "ffmpeg",
             "-y",
+            "-f",
+            "concat",
+            "-safe",
+            "0",
             "-i",
-            video_file,
-            "-vf",
-            video_filter,
-            "-c:a",
+            str(concat_list),
+            "-i",
+            source["audio"],
+            "-map",
+            "0:v:0",
+            "-map",
+            f"1:{source['audio_stream']}",
+            "-c:v",
             "copy",
-            str(portrait_video),
+            *source["audio_args"],
+            *self.profile.container_args(),
+            str(output),
         ]
-
         self.run_subprocess_safely(command)
-        logging.info(f"Portrait video created: {portrait_video}")
-        return str(portrait_video)
+
+        # The joined video must run as long as the narration; mpdecimate may
+        # leave the last frame up to a second (plus a frame) before the end
+        joined = media_info.probe(output).video_duration
+        tolerance = (1.0 if self.drop_static_frames else 0.0) + 2 / (
+            source["fps"] or 30
+        )
+        if joined and abs(joined - source["duration"]) > tolerance:
+            logging.warning(
+                f"Segmented portrait video runs {joined:.3f}s, "
+                f"expected {source['duration']:.3f}s"
+            )
+        set_attributes(joined_duration=joined)
 
     def create_manim_video(
-        self, video_data, manim_code, audio_file=None, subtitle_file=None
+        self, video_data, manim_code, audio_file=None, subtitle_file=None, outputs=None
     ):
         """Main function to create Manim video with all processing steps"""
         try:
@@ -273,13 +1059,13 @@ class ManimVideoProcessor:
             self.ensure_directories()
 
             # Step 1: Create Manim scene
-            video_file = self.create_manim_scene(manim_code)
-
-            # Step 2: Merge with audio if provided
-            if audio_file:
-                video_file = self.merge_video_audio(video_file, audio_file)
+            narration_duration = None
+            if audio_file and os.path.exists(audio_file):
+                narration_duration = self.get_media_duration(audio_file)
+            video_file = self.create_manim_scene(manim_code, narration_duration)
 
-            # Step 3: Crop to portrait and add subtitles
+            # Step 2: Crop to portrait (and other outputs), add subtitles and
+            # mux in the narration in the same encode
             subtitle_path = None
             if subtitle_file:
                 # Check if subtitle file exists, if not, check in default location
@@ -292,7 +1078,9 @@ class ManimVideoProcessor:
                     if default_subtitle_path.exists():
                         subtitle_path = str(default_subtitle_path)
 
-            final_video = self.crop_to_portrait(video_file, subtitle_path)
+            final_video = self.finish_video(
+                video_file, subtitle_path, outputs=outputs, audio_file=audio_file
+            )
 
             logging.info(f"Final video created successfully: {final_video}")
             return final_video
@@ -301,9 +1089,80 @@ class ManimVideoProcessor:
             logging.error(f"Error creating Manim video: {e}")
             raise e
 
+    def compose_video(
+        self,
+        video_file,
+        audio_file=None,
+        subtitle_file=None,
+        variant=None,
+        outputs=None,
+    ):
+        """Compose the final outputs of a rendered video with its narration"""
+        with span("compose", variant=variant):
+            return self.finish_video(
+                video_file, subtitle_file, variant, outputs, audio_file
+            )
+
+    def create_localized_videos(
+        self, manim_code, narrations, max_workers=None, outputs=None
+    ):
+        """Render the scene once and mux it with every narration in parallel
+
+        Args:
+            manim_code: Manim Python code as string
+            narrations: {voice: {"audio_file": ..., "subtitle_file": ...}}
+            outputs: final outputs to compose (see OUTPUT_KINDS)
+
+        Returns:
+            {voice: path to final video}
+        """
+        try:
+            logging.info(f"Starting localized video creation for {list(narrations)}")
+            self.ensure_directories()
+            audio_files = [
+                narration.get("audio_file") for narration in narrations.values()
+            ]
+            durations = [
+                self.get_media_duration(audio_file)
+                for audio_file in audio_files
+                if audio_file and os.path.exists(audio_file)
+            ]
+            video_file = self.create_manim_scene(
+                manim_code, max(durations) if durations else None
+            )
+
+            max_workers = max_workers or int(os.getenv("MUX_MAX_WORKERS", "3"))
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = {
+                    voice: pool.submit(
+                        with_context(self.compose_video),
+                        video_file,
+                        narration.get("audio_file"),
+                        narration.get("subtitle_file"),
+                        voice,
+                        outputs,
+                    )
+                    for voice, narration in narrations.items()
+                }
+                final_videos = {voice: f.result() for voice, f in futures.items()}
+
+            logging.info(f"Localized videos created successfully: {final_videos}")
+            return final_videos
+
+        except Exception as e:
+            logging.error(f"Error creating localized Manim videos: {e}")
+            raise e
+
 
 # Usage function for backward compatibility
-def create_manim_video(video_data, manim_code, audio_file=None, subtitle_file=None):
+def create_manim_video(
+    video_data,
+    manim_code,
+    audio_file=None,
+    subtitle_file=None,
+    outputs=None,
+    preview_approver=None,
+):
     """
     Create Manim video with proper error handling and cleanup
 
@@ -312,11 +1171,36 @@ def create_manim_video(video_data, manim_code, audio_file=None, subtitle_file=No
         manim_code: Manim Python code as string
         audio_file: Path to audio file (optional)
         subtitle_file: Path to subtitle file (optional)
+        outputs: Final outputs to compose, VIDEO_OUTPUTS by default (optional)
+        preview_approver: Check run on a passing preview, PREVIEW_APPROVER by
+            default (optional)
 
     Returns:
-        Path to final video file
+        Path to final video file (the first output; see output_paths)
     """
-    with ManimVideoProcessor() as processor:
+    with ManimVideoProcessor(preview_approver=preview_approver) as processor:
         return processor.create_manim_video(
-            video_data, manim_code, audio_file, subtitle_file
+            video_data, manim_code, audio_file, subtitle_file, outputs
+        )
+
+
+def create_localized_videos(
+    manim_code, narrations, outputs=None, preview_approver=None
+):
+    """
+    Render a Manim scene once and produce one final video per narration
+
+    Args:
+        manim_code: Manim Python code as string
+        narrations: {voice: {"audio_file": ..., "subtitle_file": ...}}
+        outputs: Final outputs to compose, VIDEO_OUTPUTS by default (optional)
+        preview_approver: Check run on a passing preview, PREVIEW_APPROVER by
+            default (optional)
+
+    Returns:
+        {voice: path to final video}
+    """
+    with ManimVideoProcessor(preview_approver=preview_approver) as processor:
+        return processor.create_localized_videos(
+            manim_code, narrations, outputs=outputs
         )
@@ -0,0 +1,354 @@
+import ast
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+from src.utils.job_journal import JobJournal
+from src.utils.tracing import set_attributes
+
+TEX_CLASSES = {
+    "MathTex",
+    "Tex",
+    "Matrix",
+    "IntegerMatrix",
+    "DecimalMatrix",
+    "BulletedList",
+}
+TEXT_CLASSES = {"Text", "MarkupText", "Paragraph", "Title", "Code"}
+# Prior per-feature costs in seconds at -qh, before history rescales them
+PRIOR_COSTS = {
+    "base": 8.0,
+    "animated_seconds": 1.2,
+    "plays": 0.5,
+    "tex": 2.0,
+    "text": 0.5,
+    "mobjects": 0.05,
+}
+MIN_HISTORY = 5
+
+_job_deadline = contextvars.ContextVar("job_deadline", default=None)
+
+
+def _number(node, default=None):
+    try:
+        value = ast.literal_eval(node)
+    except (ValueError, SyntaxError, TypeError):
+        return default
+    return float(value) if isinstance(value, (int, float)) else default
+
+
+def _call_name(node: ast.Call) -> str:
+    func = node.func
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    if isinstance(func, ast.Name):
+        return func.id
+    return ""
+
+
+def _loop_count(node: ast.For) -> int:
+    """Iterations of `for _ in range(<literal>)`, 1 when unknown"""
+    if isinstance(node.iter, ast.Call) and _call_name(node.iter) == "range":
+        args = [_number(arg) for arg in node.iter.args]
+        if args and all(arg is not None for arg in args):
+            start, stop = (0, args[0]) if len(args) == 1 else (args[0], args[1])
+            step = args[2] if len(args) > 2 else 1
+            return max(int((stop - start) / step), 1) if step else 1
+    if isinstance(node.iter, (ast.List, ast.Tuple)):
+        return max(len(node.iter.elts), 1)
+    return 1
+
+
+class _FeatureVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.features = dict.fromkeys(
+            ("plays", "waits", "run_time", "wait_time", "tex", "text", "mobjects"), 0.0
+        )
+        self.repeat = 1
+
+    def visit_For(self, node):
+        previous = self.repeat
+        self.repeat *= _loop_count(node)
+        self.generic_visit(node)
+        self.repeat = previous
+
+    def visit_Call(self, node):
+        name = _call_name(node)
+        features = self.features
+        if name == "play":
+            run_time = 1.0
+            for kw in node.keywords:
+                if kw.arg == "run_time":
+                    run_time = _number(kw.value, 1.0)
+            features["plays"] += self.repeat
+            features["run_time"] += run_time * self.repeat
+        elif name == "wait":
+            duration = _number(node.args[0], 1.0) if node.args else 1.0
+            for kw in node.keywords:
+                if kw.arg == "duration":
+                    duration = _number(kw.value, 1.0)
+            features["waits"] += self.repeat
+            features["wait_time"] += duration * self.repeat
+        elif name in TEX_CLASSES:
+            features["tex"] += self.repeat
+        elif name in TEXT_CLASSES:
+            features["text"] += self.repeat
+        elif name[:1].isupper():
+            # Mobjects and animations are the capitalized calls in a scene
+            features["mobjects"] += self.repeat
+        self.generic_visit(node)
+
+
+def scene_features(manim_code: str) -> Dict[str, float]:
+    """Static cost features of a generated scene from its AST"""
+    visitor = _FeatureVisitor()
+    try:
+        visitor.visit(ast.parse(manim_code))
+    except SyntaxError as e:
+        logging.warning(f"Cannot parse scene for cost features: {e}")
+    features = visitor.features
+    features["animated_seconds"] = features["run_time"] + features["wait_time"]
+    return features
+
+
+def prior_seconds(features: Dict[str, float]) -> float:
+    return PRIOR_COSTS["base"] + sum(
+        PRIOR_COSTS[name] * features.get(name, 0)
+        for name in PRIOR_COSTS
+        if name != "base"
+    )
+
+
+class RenderEstimate:
+    """Predicted render time, timeout and resource needs of one scene"""
+
+    def __init__(self, features: Dict[str, float], prior: float, scale: float):
+        self.features = features
+        self.prior = prior
+        self.seconds = prior * scale
+        timeout = self.seconds * float(os.getenv("RENDER_TIMEOUT_FACTOR", "3")) + 60
+        timeout = max(timeout, float(os.getenv("RENDER_MIN_TIMEOUT", "300")))
+        self.timeout = int(min(timeout, float(os.getenv("RENDER_MAX_TIMEOUT", "3600"))))
+        # manim renders in one process with an ffmpeg writer beside it;
+        # LaTeX-heavy scenes hold many SVG mobjects in memory
+        self.cores = int(os.getenv("RENDER_CORES", "2"))
+        self.memory_mb = int(
+            float(os.getenv("RENDER_BASE_MEMORY_MB", "700"))
+            + 25 * features.get("tex", 0)
+            + 2 * features.get("mobjects", 0)
+        )
+
+    def as_dict(self):
+        return {
+            "predicted_seconds": round(self.seconds, 1),
+            "timeout": self.timeout,
+            "cores": self.cores,
+            "memory_mb": self.memory_mb,
+        }
+
+
+class CostModel:
+    """Feature-based render cost prior, rescaled by recent actual timings"""
+
+    def __init__(self, journal: Optional[JobJournal] = None):
+        self.journal = journal or JobJournal()
+        self._scale = None
+        self._lock = threading.Lock()
+
+    def scale(self) -> float:
+        """Median ratio of actual to prior render time over recent renders"""
+        with self._lock:
+            if self._scale is None:
+                ratios = [
+                    timing["seconds"] / timing["predicted"]
+                    for timing in self.journal.render_timings()
+                    if timing["predicted"] > 0
+                ]
+                self._scale = (
+                    statistics.median(ratios) if len(ratios) >= MIN_HISTORY else 1.0
+                )
+            return self._scale
+
+    def estimate(self, manim_code: str) -> RenderEstimate:
+        features = scene_features(manim_code)
+        return RenderEstimate(features, prior_seconds(features), self.scale())
+
+    def record(self, estimate: RenderEstimate, seconds: float):
+        self.journal.add_render_timing(estimate.features, estimate.prior, seconds)
+        with self._lock:
+            self._scale = None
+
+
+def parse_deadline(value) -> Optional[float]:
+    """Epoch seconds from an epoch number or an ISO timestamp"""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+def job_deadline(params: Dict) -> Optional[float]:
+    """The job's deadline, None (no deadline) when it cannot be parsed"""
+    try:
+        return parse_deadline(params.get("deadline"))
+    except (TypeError, ValueError):
+        logging.warning(f"Ignoring invalid deadline {params.get('deadline')!r}")
+        return None
+
+
+@contextmanager
+def job_context(params: Dict):
+    """Make the job's deadline visible to render admission in this context"""
+    token = _job_deadline.set(job_deadline(params))
+    try:
+        yield
+    finally:
+        _job_deadline.reset(token)
+
+
+def queue_key(policy: Optional[str] = None, model: Optional[CostModel] = None):
+    """Ordering key for JobJournal.claim_next, None for plain FIFO"""
+    policy = policy or os.getenv("SCHEDULER_POLICY", "fifo")
+    if policy == "fifo":
+        return None
+    model = model or CostModel()
+
+    def predicted(job):
+        code = job["code"]
+        if code and code.get("video_data", {}).get("manim_code"):
+            return model.estimate(code["video_data"]["manim_code"]).seconds
+        # Code not generated yet: assume a typical render
+        timings = model.journal.render_timings()
+        return statistics.median([t["seconds"] for t in timings]) if timings else 0.0
+
+    if policy == "sjf":
+        return lambda job: (predicted(job), job["created_at"])
+    if policy == "deadline":
+        return lambda job: (
+            job_deadline(job["params"]) or float("inf"),
+            predicted(job),
+            job["created_at"],
+        )
+    raise ValueError(f"Unknown SCHEDULER_POLICY: {policy}")
+
+
+def _available_memory_mb() -> int:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return 8192
+
+
+class RenderSlots:
+    """Admission control that packs concurrent renders into cores and memory.
+
+    Waiting renders are granted shortest-predicted-first, or earliest
+    deadline first with SCHEDULER_POLICY=deadline. A render larger than the
+    whole box still runs, alone.
+    """
+
+    def __init__(self, cores: Optional[int] = None, memory_mb: Optional[int] = None):
+        self.cores = cores or int(
+            os.getenv("SCHEDULER_CORES", str(os.cpu_count() or 1))
+        )
+        self.memory_mb = memory_mb or int(
+            os.getenv("SCHEDULER_MEMORY_MB", str(_available_memory_mb()))
+        )
+        self.used_cores = 0
+        self.used_memory_mb = 0
+        self.running = 0
+        self.waiting = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+
+    def _fits(self, estimate: RenderEstimate) -> bool:
+        if self.running == 0:
+            return True
+        return (
+            self.used_cores + estimate.cores <= self.cores
+            and self.used_memory_mb + estimate.memory_mb <= self.memory_mb
+        )
+
+    @contextmanager
+    def acquire(self, estimate: RenderEstimate, deadline: Optional[float] = None):
+        policy = os.getenv("SCHEDULER_POLICY", "fifo")
+        if policy == "deadline":
+            priority = (deadline or float("inf"), estimate.seconds)
+        elif policy == "sjf":
+            priority = (estimate.seconds, 0)
+        else:
+            priority = (0, 0)
+        entry = (priority, next(self.counter))
+        waited = time.perf_counter()
+        with self.condition:
+            heapq.heappush(self.waiting, entry)
+            while self.waiting[0] != entry or not self._fits(estimate):
+                self.condition.wait()
+            heapq.heappop(self.waiting)
+            self.used_cores += estimate.cores
+            self.used_memory_mb += estimate.memory_mb
+            self.running += 1
+            # The next waiter may fit beside this render
+            self.condition.notify_all()
+        set_attributes(slot_wait=round(time.perf_counter() - waited, 3))
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.used_cores -= estimate.cores
+                self.used_memory_mb -= estimate.memory_mb
+                self.running -= 1
+                self.condition.notify_all()
+
+
+_model = None
+_slots = None
+_singletons_lock = threading.Lock()
+
+
+def cost_model() -> CostModel:
+    global _model
+    with _singletons_lock:
+        if _model is None:
+            _model = CostModel()
+        return _model
+
+
+def render_slots() -> RenderSlots:
+    global _slots
+    with _singletons_lock:
+        if _slots is None:
+            _slots = RenderSlots()
+        return _slots
+
+
+@contextmanager
+def scheduled_render(manim_code: str, record: bool = True):
+    """Estimate a render, wait for room on the box and record its real duration
+
+    Yields the RenderEstimate; its `timeout` sizes the render subprocess.
+    With `record=False` (renders at another quality, like the -ql preview)
+    the slot is still taken but the cost model does not learn from it.
+    """
+    model = cost_model()
+    estimate = model.estimate(manim_code)
+    set_attributes(**estimate.as_dict())
+    logging.info(f"Render estimate: {estimate.as_dict()}")
+    with render_slots().acquire(estimate, _job_deadline.get()):
+        start = time.perf_counter()
+        yield estimate
+        if record:
+            model.record(estimate, time.perf_counter() - start)
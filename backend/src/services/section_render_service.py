@@ -0,0 +1,193 @@
+import ast
+import logging
+import os
+import re
+from typing import List, Optional, Tuple
+
+from src.services.scheduler_service import _call_name, _number
+
+PLAYED_ANIMATIONS = re.compile(r"Played (\d+) animations")
+# Calls whose results differ between processes or depend on frame-by-frame
+# stepping, so a section replayed without frames could diverge
+UNSAFE_CALLS = {
+    "random",
+    "randint",
+    "uniform",
+    "choice",
+    "choices",
+    "shuffle",
+    "sample",
+    "gauss",
+    "rand",
+    "randn",
+    "normal",
+    "default_rng",
+    "add_updater",
+    "always_redraw",
+    "always",
+    "f_always",
+    "turn_animation_into_updater",
+}
+# Modules and names that make any use of randomness visible
+UNSAFE_NAMES = {"random", "rng", "dt"}
+
+
+def _is_unsafe(tree: ast.AST) -> bool:
+    """Whether the scene uses randomness or time-dependent updaters anywhere"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and _call_name(node) in UNSAFE_CALLS:
+            return True
+        if isinstance(node, ast.Import) and any(
+            alias.name.split(".")[-1] == "random" for alias in node.names
+        ):
+            return True
+        if isinstance(node, ast.ImportFrom) and (
+            (node.module or "").split(".")[-1] == "random"
+            or any(alias.name == "random" for alias in node.names)
+        ):
+            return True
+        # np.random.*, rng.*, and updaters taking a dt argument
+        if isinstance(node, ast.Attribute) and node.attr in UNSAFE_NAMES:
+            return True
+        if isinstance(node, ast.Name) and node.id in UNSAFE_NAMES:
+            return True
+        if isinstance(node, ast.arg) and node.arg == "dt":
+            return True
+    return False
+
+
+class ScenePlan:
+    """Animations of a scene's construct() in play order.
+
+    `durations` holds the animated seconds of each play/wait call and
+    `sections` the animation indexes where self.next_section() starts a new
+    section. Both are only known when every play/wait is a plain statement
+    of construct(); `exact` is False otherwise.
+    """
+
+    def __init__(self, durations, sections, exact, safe):
+        self.durations = durations
+        self.sections = sections
+        self.exact = exact
+        self.safe = safe
+
+    @property
+    def count(self) -> int:
+        return len(self.durations)
+
+
+def _animation_seconds(call: ast.Call) -> float:
+    name = _call_name(call)
+    if name == "play":
+        seconds = 1.0
+        for kw in call.keywords:
+            if kw.arg == "run_time":
+                seconds = _number(kw.value, 1.0)
+        return seconds
+    seconds = _number(call.args[0], 1.0) if call.args else 1.0
+    for kw in call.keywords:
+        if kw.arg == "duration":
+            seconds = _number(kw.value, 1.0)
+    return seconds
+
+
+def _self_call(node) -> Optional[ast.Call]:
+    """The call of a `self.<name>(...)` expression statement"""
+    if (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Call)
+        and isinstance(node.value.func, ast.Attribute)
+        and isinstance(node.value.func.value, ast.Name)
+        and node.value.func.value.id == "self"
+    ):
+        return node.value
+    return None
+
+
+def plan_scene(manim_code: str) -> Optional[ScenePlan]:
+    """Static animation plan of the first Scene's construct(), None if unparsable"""
+    try:
+        tree = ast.parse(manim_code)
+    except SyntaxError:
+        return None
+    construct = next(
+        (
+            node
+            for node in ast.walk(tree)
+            if isinstance(node, ast.FunctionDef) and node.name == "construct"
+        ),
+        None,
+    )
+    if construct is None:
+        return None
+
+    calls = [node for node in ast.walk(tree) if isinstance(node, ast.Call)]
+    safe = not _is_unsafe(tree)
+    animation_calls = sum(1 for call in calls if _call_name(call) in ("play", "wait"))
+
+    durations, sections = [], []
+    for statement in construct.body:
+        call = _self_call(statement)
+        if call is None:
+            continue
+        name = _call_name(call)
+        if name in ("play", "wait"):
+            durations.append(_animation_seconds(call))
+        elif name == "next_section" and durations:
+            sections.append(len(durations))
+    # Animations in loops, branches or helpers make the static order unknown
+    exact = animation_calls == len(durations)
+    return ScenePlan(durations, sections, exact, safe)
+
+
+def count_from_output(output: str) -> Optional[int]:
+    """Number of animations from manim's "Played N animations" log line"""
+    match = PLAYED_ANIMATIONS.search(output or "")
+    return int(match.group(1)) if match else None
+
+
+def split_animations(
+    count: int,
+    sections: int,
+    durations: Optional[List[float]] = None,
+    boundaries: Optional[List[int]] = None,
+    min_animations: int = 2,
+) -> List[Tuple[int, Optional[int]]]:
+    """Split animations 0..count-1 into at most `sections` ranges for `manim -n`
+
+    Cuts balance the animated seconds (animation count when unknown), prefer
+    next_section() boundaries when the scene has them, and keep at least
+    `min_animations` per range. Ranges are inclusive; the last one is open.
+    """
+    sections = min(sections, count // max(min_animations, 1))
+    if sections <= 1:
+        return [(0, None)]
+    weights = durations if durations and len(durations) == count else [1.0] * count
+    total = sum(weights) or float(count)
+    elapsed, positions = 0.0, []
+    for weight in weights:
+        positions.append(elapsed)
+        elapsed += weight
+    candidates = boundaries or list(range(1, count))
+
+    cuts = [0]
+    for i in range(1, sections):
+        target = total * i / sections
+        cut = min(candidates, key=lambda index: abs(positions[index] - target))
+        if cut - cuts[-1] >= min_animations and count - cut >= min_animations:
+            cuts.append(cut)
+    ranges = [(start, end - 1) for start, end in zip(cuts, cuts[1:])]
+    ranges.append((cuts[-1], None))
+    return ranges
+
+
+def section_count(limit_cpus: Optional[int] = None) -> int:
+    """RENDER_SECTIONS as a number, "auto" meaning one per CPU of the job"""
+    setting = os.getenv("RENDER_SECTIONS", "1")
+    if setting == "auto":
+        return limit_cpus or os.cpu_count() or 1
+    try:
+        return int(setting)
+    except ValueError:
+        logging.warning(f"Invalid RENDER_SECTIONS={setting!r}, rendering in one go")
+        return 1
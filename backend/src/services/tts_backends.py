@@ -0,0 +1,214 @@
+import argparse
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 24000
+
+
+class KokoroBackend(ABC):
+    """Base interface for Kokoro inference backends used by TTSService"""
+
+    name = "base"
+    sample_rate = SAMPLE_RATE
+
+    @abstractmethod
+    def synthesize(
+        self, text: str, voice: str, speed: float = 1, split_pattern: str = r"\n+"
+    ) -> Iterator[Tuple[str, np.ndarray, Optional[List]]]:
+        """Yield (graphemes, audio, tokens) for every synthesized text segment.
+
+        Tokens carry `text`, `start_ts` and `end_ts` exactly like the ones
+        returned by `KPipeline`, or are None for languages without timestamps.
+        """
+
+
+class TorchKokoroBackend(KokoroBackend):
+    """Run Kokoro through the PyTorch KPipeline"""
+
+    name = "torch"
+
+    def __init__(self, lang_code: str = "a", num_threads: Optional[int] = None):
+        from kokoro import KPipeline
+
+        if num_threads:
+            import torch
+
+            torch.set_num_threads(num_threads)
+        self.pipeline = KPipeline(lang_code=lang_code)
+
+    def synthesize(self, text, voice, speed=1, split_pattern=r"\n+"):
+        for result in self.pipeline(
+            text, voice=voice, speed=speed, split_pattern=split_pattern
+        ):
+            if result.audio is None:
+                continue
+            yield result.graphemes, result.audio.numpy(), result.tokens
+
+
+class OnnxKokoroBackend(KokoroBackend):
+    """Run an exported Kokoro graph with ONNX Runtime on the CPU.
+
+    KPipeline is still used for G2P and voice packs (with `model=False`), so
+    phonemes, tokens and timestamps are produced by the same code path as the
+    torch backend.
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_path: str,
+        lang_code: str = "a",
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = 1,
+    ):
+        import onnxruntime as ort
+        from kokoro import KPipeline
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"ONNX model not found: {model_path}. "
+                "Export it with `python -m src.services.tts_backends`."
+            )
+
+        vocab_path = vocab_path_for(model_path)
+        with open(vocab_path, encoding="utf-8") as f:
+            self.vocab = json.load(f)
+
+        options = ort.SessionOptions()
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.pipeline = KPipeline(lang_code=lang_code, model=False)
+        logging.info(
+            f"ONNX Kokoro backend loaded from {model_path} "
+            f"(intra_op={intra_op_threads}, inter_op={inter_op_threads})"
+        )
+
+    def _infer(self, phonemes: str, pack, speed: float):
+        input_ids = [self.vocab[p] for p in phonemes if p in self.vocab]
+        input_ids = np.array([[0, *input_ids, 0]], dtype=np.int64)
+        ref_s = pack[len(phonemes) - 1].numpy().astype(np.float32)
+        audio, pred_dur = self.session.run(
+            None,
+            {
+                "input_ids": input_ids,
+                "ref_s": ref_s,
+                "speed": np.array([speed], dtype=np.float32),
+            },
+        )
+        return audio.reshape(-1), pred_dur.reshape(-1)
+
+    def synthesize(self, text, voice, speed=1, split_pattern=r"\n+"):
+        pack = self.pipeline.load_voice(voice)
+        for result in self.pipeline(
+            text, voice=voice, speed=speed, split_pattern=split_pattern
+        ):
+            if not result.phonemes:
+                continue
+            audio, pred_dur = self._infer(result.phonemes, pack, speed)
+            if result.tokens:
+                self.pipeline.join_timestamps(result.tokens, pred_dur)
+            yield result.graphemes, audio, result.tokens
+
+
+def vocab_path_for(model_path: str) -> str:
+    """Vocabulary file stored next to an exported ONNX model"""
+    return os.path.splitext(model_path)[0] + ".vocab.json"
+
+
+def create_backend(
+    backend: Optional[str] = None, lang_code: str = "a"
+) -> KokoroBackend:
+    """Build a Kokoro backend by name, defaulting to the TTS_BACKEND env var"""
+    backend = (backend or os.getenv("TTS_BACKEND", "torch")).lower()
+    intra_op = os.getenv("TTS_INTRA_OP_THREADS")
+    inter_op = os.getenv("TTS_INTER_OP_THREADS", "1")
+
+    if backend == "torch":
+        return TorchKokoroBackend(
+            lang_code=lang_code, num_threads=int(intra_op) if intra_op else None
+        )
+    if backend == "onnx":
+        return OnnxKokoroBackend(
+            model_path=os.getenv("KOKORO_ONNX_MODEL", "models/kokoro.onnx"),
+            lang_code=lang_code,
+            intra_op_threads=int(intra_op) if intra_op else None,
+            inter_op_threads=int(inter_op) if inter_op else None,
+        )
+    raise ValueError(f"Unsupported TTS backend: {backend}. Use 'torch' or 'onnx'.")
+
+
+def export_onnx_model(output_path: str, quantize: bool = False, opset: int = 17):
+    """Export Kokoro to ONNX, optionally with int8 dynamic quantization"""
+    import torch
+    from kokoro import KModel
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    model = KModel(disable_complex=True).eval()
+
+    class _KokoroGraph(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, ref_s, speed):
+            return self.model.forward_with_tokens(input_ids, ref_s, speed)
+
+    fp32_path = output_path
+    if quantize:
+        fp32_path = os.path.splitext(output_path)[0] + ".fp32.onnx"
+
+    input_ids = torch.randint(1, 100, (1, 64), dtype=torch.long)
+    ref_s = torch.randn(1, 256)
+    speed = torch.tensor([1.0])
+    torch.onnx.export(
+        _KokoroGraph(model),
+        (input_ids, ref_s, speed),
+        fp32_path,
+        input_names=["input_ids", "ref_s", "speed"],
+        output_names=["audio", "pred_dur"],
+        dynamic_axes={
+            "input_ids": {1: "tokens"},
+            "audio": {0: "samples"},
+            "pred_dur": {0: "tokens"},
+        },
+        opset_version=opset,
+    )
+    logging.info(f"Exported Kokoro ONNX graph to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+        logging.info(f"Quantized Kokoro ONNX graph to int8: {output_path}")
+
+    with open(vocab_path_for(output_path), "w", encoding="utf-8") as f:
+        json.dump(model.vocab, f, ensure_ascii=False)
+
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export Kokoro to ONNX")
+    parser.add_argument("--output", default="models/kokoro.onnx")
+    parser.add_argument("--quantize", action="store_true", help="int8 weights")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    from src.utils.log_config import setup_logging
+
+    setup_logging()
+    export_onnx_model(args.output, quantize=args.quantize, opset=args.opset)
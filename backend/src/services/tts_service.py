@@ -1,103 +1,106 @@
-from kokoro import KPipeline
-import soundfile as sf
+import contextlib
 import os
-import wave
+import threading
 import numpy as np
-from typing import Optional, Dict, List, Tuple
-from src.services.ass_file_service import SRTTOASSConverter
+from typing import Optional, Dict, List, Union
+from src.services.ass_file_service import ASSSubtitleWriter
+from src.services.audio_encoder_service import StreamingAudioEncoder, output_path_for
+from src.services.tts_backends import KokoroBackend, create_backend
 import logging
+import time
+from src.utils import scratch
+from src.utils.tracing import set_attributes, traced
+
+# Kokoro pipeline language code and narration language for every voice preset
+VOICE_LANGUAGES = {
+    "en-us": ("a", "English"),
+    "en-uk": ("b", "English"),
+    "es": ("e", "Spanish"),
+    "fr": ("f", "French"),
+    "hi": ("h", "Hindi"),
+    "it": ("i", "Italian"),
+    "pt-br": ("p", "Brazilian Portuguese"),
+    "ja": ("j", "Japanese"),
+    "zh": ("z", "Mandarin Chinese"),
+}
+
+
+def subtitles_path_for(voice: str) -> str:
+    """Per-voice subtitle file, so several narrations can be generated at once
+
+    Lives on scratch tmpfs when there is room (see scratch.place).
+    """
+    return scratch.place(f"output/subtitles/subtitles_{voice}.ass")
 
 
 class TTSService:
-    def __init__(self, lang_code: str = "a"):
-        """Initialize the TTS service with Kokoro"""
-        self.pipeline = KPipeline(lang_code=lang_code)
+    def __init__(
+        self, lang_code: str = "a", backend: Union[str, KokoroBackend, None] = None
+    ):
+        """Initialize the TTS service with a Kokoro backend ("torch" or "onnx")"""
+        if isinstance(backend, KokoroBackend):
+            self.backend = backend
+        else:
+            self.backend = create_backend(backend, lang_code=lang_code)
+        # Backends keep per-call state; voices sharing a language take turns
+        self.lock = threading.Lock()
         self.voice_presets = {
             "en-us": "af_heart",  # American English
-            "en-uk": "bf_heart",  # British English
-            "es": "es_heart",  # Spanish
-            "fr": "fr_heart",  # French
-            "hi": "hi_heart",  # Hindi
-            "it": "it_heart",  # Italian
-            "pt-br": "pt_heart",  # Brazilian Portuguese
-            "ja": "ja_heart",  # Japanese
-            "zh": "zh_heart",  # Mandarin Chinese
+            "en-uk": "bf_emma",  # British English
+            "es": "ef_dora",  # Spanish
+            "fr": "ff_siwis",  # French
+            "hi": "hf_alpha",  # Hindi
+            "it": "if_sara",  # Italian
+            "pt-br": "pf_dora",  # Brazilian Portuguese
+            "ja": "jf_alpha",  # Japanese
+            "zh": "zf_xiaobei",  # Mandarin Chinese
         }
 
-    def _format_timestamp(self, seconds: float) -> str:
-        """Convert seconds to SRT timestamp format HH:MM:SS,mmm"""
-        try:
-            hours = int(seconds // 3600)
-            minutes = int((seconds % 3600) // 60)
-            seconds_part = seconds % 60
-            milliseconds = int((seconds_part - int(seconds_part)) * 1000)
-
-            return (
-                f"{hours:02d}:{minutes:02d}:{int(seconds_part):02d},{milliseconds:03d}"
-            )
-        except Exception as e:
-            logging.error(f"Error formatting timestamp: {e}")
-            return "00:00:00,000"
-
-    def write_sentence_srt(
-        self, word_timestamps: List[Dict], output_file: str, max_words: int = 8
-    ):
-        """Generate subtitle file with synchronized timestamps"""
-        try:
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-
-            subtitles = []  # Store subtitle blocks
-            subtitle_words = []  # Temporary list for words in current subtitle
-            start_time = None  # Track start time of current subtitle
-
-            for entry in word_timestamps:
-                word = entry["word"]
-                word_start = entry["start"]
-                word_end = entry["end"]
-
-                # Start a new subtitle block if needed
-                if start_time is None:
-                    start_time = word_start
-
-                # Create a new subtitle if we have enough words or hit punctuation
-                if len(subtitle_words) >= max_words or word.endswith((".", "!", "?")):
-                    if subtitle_words:  # Only proceed if we have words to add
-                        end_time = subtitle_words[-1][1]  # Use last word's end time
-                        subtitle_text = " ".join(w[0] for w in subtitle_words)
-                        subtitles.append((start_time, end_time, subtitle_text))
-
-                        # Reset for next subtitle
-                        subtitle_words = []
-                        start_time = (
-                            None if word.endswith((".", "!", "?")) else word_start
+    def _collect_segments(self, generator, write_audio, word_timestamps, sample_rate):
+        """Consume synthesized segments, passing each audio chunk to `write_audio`"""
+        current_offset = 0.0  # Track running time offset between segments
+        for graphemes, audio_np, tokens in generator:
+            # graphemes: text segment, audio_np: numpy samples,
+            # tokens: list of tokens with timing info
+
+            # Extract word timing information
+            if tokens:  # Only process if tokens are available (English voices)
+                for t in tokens:
+                    if t.text.strip():  # Skip empty tokens
+                        word_timestamps.append(
+                            {
+                                "word": t.text,
+                                "start": t.start_ts + current_offset,
+                                "end": t.end_ts + current_offset,
+                            }
                         )
 
-                # Add current word to subtitle
-                subtitle_words.append((word, word_end))
+            write_audio(audio_np)
 
-            # Add any remaining words as final subtitle
-            if subtitle_words:
-                end_time = subtitle_words[-1][1]
-                subtitle_text = " ".join(w[0] for w in subtitle_words)
-                subtitles.append((start_time, end_time, subtitle_text))
+            # Update time offset for next segment
+            segment_duration = len(audio_np) / sample_rate  # in seconds
+            current_offset += segment_duration
 
-            # Write subtitles to SRT file
-            with open(output_file, "w", encoding="utf-8") as f:
-                for i, (start, end, text) in enumerate(subtitles, start=1):
-                    print(f"Writing subtitle {i}: {text} [{start} --> {end}]")
-                    f.write(
-                        f"{i}\n{self._format_timestamp(start)} --> {self._format_timestamp(end)}\n{text}\n\n"
-                    )
-
-            return output_file
-        except Exception as e:
-            logging.error(f"Error writing SRT file: {e}")
-            return None
+        return current_offset
 
+    @traced("tts.generate")
     def generate(
-        self, text: str, voice: str = "en-us", output_path: Optional[str] = None
-    ) -> Tuple[str, str]:
-        """Generate audio from text using the specified voice and create synchronized subtitles"""
+        self,
+        text: str,
+        voice: str = "en-us",
+        output_path: Optional[str] = None,
+        karaoke: bool = False,
+        audio_format: Optional[str] = None,
+        subtitles_path: Optional[str] = None,
+    ) -> Optional[str]:
+        """Generate audio from text using the specified voice and create synchronized subtitles
+
+        Subtitles are written to `subtitles_path` (output/subtitles/subtitles_{voice}.ass)
+        directly from the word timestamps, with `\\k` word highlighting when
+        `karaoke` is set.
+        `audio_format` "aac" or "opus" (default TTS_AUDIO_FORMAT, "aac") encodes
+        the delivery audio while synthesizing; "wav" writes raw 24 kHz audio.
+        """
         try:
             logging.info(f"Generating audio for text: {text[:30]}...")
             if not text:
@@ -108,57 +111,65 @@ class TTSService:
                     f"Unsupported voice: {voice}. Available voices: {list(self.voice_presets.keys())}"
                 )
 
+            audio_format = audio_format or os.getenv("TTS_AUDIO_FORMAT", "aac")
             if output_path is None:
-                output_path = f"output/audio/output_{voice}.wav"
+                output_path = scratch.place(
+                    output_path_for(audio_format, f"output/audio/output_{voice}.wav"),
+                    expected_mb=float(os.getenv("SCRATCH_AUDIO_MB", "32")),
+                )
 
             # Ensure output directories exist
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            subtitles_dir = "output/subtitles"
-            os.makedirs(subtitles_dir, exist_ok=True)
+            subtitles_path = subtitles_path or subtitles_path_for(voice)
+            os.makedirs(os.path.dirname(subtitles_path), exist_ok=True)
 
-            subtitles_path = os.path.join(subtitles_dir, "subtitles.srt")
+            # Never leave a previous run's subtitles behind for this voice
+            if os.path.exists(subtitles_path):
+                os.remove(subtitles_path)
 
-            generator = self.pipeline(
+            generator = self.backend.synthesize(
                 text, voice=self.voice_presets[voice], speed=1, split_pattern=r"\n+"
             )
 
             # Prepare audio data
             word_timestamps = []
-            current_offset = 0.0  # Track running time offset between segments
             all_audio = []
 
-            for i, result in enumerate(generator):
-                graphemes = result.graphemes  # text segment
-                audio = result.audio  # audio tensor
-                tokens = result.tokens  # List of tokens with timing info
-
-                # Extract word timing information
-                if tokens:  # Only process if tokens are available (English voices)
-                    for t in tokens:
-                        if t.text.strip():  # Skip empty tokens
-                            word_timestamps.append(
-                                {
-                                    "word": t.text,
-                                    "start": t.start_ts + current_offset,
-                                    "end": t.end_ts + current_offset,
-                                }
-                            )
-
-                # Convert audio tensor to numpy array
-                audio_np = audio.numpy()
-                all_audio.append(audio_np)
-
-                # Update time offset for next segment
-                segment_duration = len(audio_np) / 24000  # in seconds
-                current_offset += segment_duration
-
-            # Concatenate all audio segments and write to file
-            final_audio = np.concatenate(all_audio)
-            sf.write(output_path, final_audio, 24000)
+            sample_rate = self.backend.sample_rate
+            encoder = None
+            if audio_format != "wav":
+                encoder = StreamingAudioEncoder(output_path, audio_format, sample_rate)
+
+            synth_start = time.perf_counter()
+            with encoder or contextlib.nullcontext():
+                audio_seconds = self._collect_segments(
+                    generator,
+                    encoder.write if encoder else all_audio.append,
+                    word_timestamps,
+                    sample_rate,
+                )
+
+            if audio_format == "wav":
+                import soundfile as sf
+
+                # Concatenate all audio segments and write to file
+                final_audio = np.concatenate(all_audio)
+                sf.write(output_path, final_audio, sample_rate)
+
+            synth_seconds = time.perf_counter() - synth_start
+            set_attributes(
+                voice=voice,
+                backend=self.backend.name,
+                audio_format=audio_format,
+                audio_seconds=audio_seconds,
+                rtf=synth_seconds / audio_seconds if audio_seconds else None,
+                output_bytes=os.path.getsize(output_path),
+                words=len(word_timestamps),
+            )
 
             # Generate subtitles if we have timestamps
             if word_timestamps:
-                self.write_sentence_srt(word_timestamps, subtitles_path)
+                ASSSubtitleWriter(karaoke=karaoke).write(word_timestamps, subtitles_path)
 
             return output_path
 
@@ -167,18 +178,49 @@ class TTSService:
             return None
 
 
-def generate_audio(text: str, voice: str = "en-us"):
-    """Generate audio and subtitles from text using Kokoro TTS"""
-    try:
-        service = TTSService()
+_services: Dict[str, TTSService] = {}
+_services_lock = threading.Lock()
+
 
-        audio_file_path = service.generate(text=text)
-        if audio_file_path:
-            ass_converter = SRTTOASSConverter(
-                input_file="output/subtitles/subtitles.srt",
-                output_file="output/subtitles/subtitles.ass",
+def get_tts_service(lang_code: str) -> TTSService:
+    """Load the Kokoro pipeline for a language once per process"""
+    with _services_lock:
+        if lang_code not in _services:
+            _services[lang_code] = TTSService(lang_code=lang_code)
+        return _services[lang_code]
+
+
+def warm_up_voices(voices: List[str]):
+    """Load pipelines and voice packs ahead of the first job"""
+    for voice in voices:
+        service = get_tts_service(VOICE_LANGUAGES[voice][0])
+        with service.lock:
+            preset = service.voice_presets[voice]
+            for _ in service.backend.synthesize("Hello.", voice=preset):
+                pass
+        logging.info(f"Warmed up TTS voice {voice} ({service.backend.name})")
+
+
+def generate_audio(
+    text: str,
+    voice: str = "en-us",
+    karaoke: bool = False,
+    audio_format: Optional[str] = None,
+):
+    """Generate audio and subtitles from text using Kokoro TTS
+
+    Subtitles are written to subtitles_path_for(voice).
+    """
+    try:
+        service = get_tts_service(VOICE_LANGUAGES[voice][0])
+
+        with service.lock:
+            audio_file_path = service.generate(
+                text=text,
+                voice=voice,
+                karaoke=karaoke,
+                audio_format=audio_format,
             )
-            ass_converter.generate_ass_file()
 
         return audio_file_path
     except Exception as e:
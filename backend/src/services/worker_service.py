@@ -0,0 +1,126 @@
+import logging
+import os
+import signal
+import threading
+from typing import Callable, List, Optional
+
+from src.services.scheduler_service import queue_key
+from src.utils.job_journal import Job, JobJournal
+from src.utils.metrics import QUEUE_DEPTH, WORKERS_TOTAL
+from src.utils.tracing import span
+
+
+def warm_up(voices: List[str]):
+    """Load the TTS pipelines and open the API sessions before the first job"""
+    from src.CloudStorage import cloudinary_config
+    from src.GoogleSheet.google_sheet import GoogleSheet
+    from src.llmConfig.config import LLMConfig
+    from src.services.tts_service import warm_up_voices
+
+    steps = [
+        ("tts", lambda: warm_up_voices(voices)),
+        ("gemini", LLMConfig),
+        ("sheets", GoogleSheet),
+        ("cloudinary", cloudinary_config),
+    ]
+    for name, step in steps:
+        try:
+            with span(f"warmup.{name}"):
+                step()
+        except Exception as e:
+            logging.warning(f"Warm-up of {name} failed, it will load on first use: {e}")
+
+
+class WorkerDaemon:
+    """Long-running process that takes jobs from the journal queue.
+
+    SIGTERM/SIGINT stop taking new jobs and let the running ones finish; a
+    second signal exits immediately and the interrupted jobs are requeued on
+    the next start.
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[Job], None],
+        journal: Optional[JobJournal] = None,
+        workers: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        exit_when_idle: bool = False,
+    ):
+        self.run_job = run_job
+        self.journal = journal or JobJournal()
+        # Jobs share output/ paths and manim's media/ cache, so one at a time
+        # is the safe default
+        self.workers = workers or int(os.getenv("DAEMON_WORKERS", "1"))
+        self.poll_interval = poll_interval or float(
+            os.getenv("DAEMON_POLL_INTERVAL", "2")
+        )
+        self.exit_when_idle = exit_when_idle
+        # SCHEDULER_POLICY=sjf|deadline reorders the queue, fifo by default
+        self.queue_key = queue_key()
+        self.stopping = threading.Event()
+        self.busy = 0
+        self.busy_lock = threading.Lock()
+
+    def stop(self, signum=None, frame=None):
+        if self.stopping.is_set():
+            logging.warning("Second stop signal, exiting without draining.")
+            os._exit(1)
+        logging.info("Draining: finishing running jobs, not taking new ones.")
+        self.stopping.set()
+
+    def _idle(self) -> bool:
+        with self.busy_lock:
+            return self.busy == 0 and self.journal.queue_depth() == 0
+
+    def _work(self):
+        while not self.stopping.is_set():
+            try:
+                QUEUE_DEPTH.set(self.journal.queue_depth())
+                job = self.journal.claim_next(key=self.queue_key)
+            except Exception:
+                logging.exception("Failed to claim the next job")
+                self.stopping.wait(self.poll_interval)
+                continue
+            if job is None:
+                if self.exit_when_idle and self._idle():
+                    self.stopping.set()
+                    break
+                self.stopping.wait(self.poll_interval)
+                continue
+
+            with self.busy_lock:
+                self.busy += 1
+            try:
+                logging.info(f"Worker {threading.current_thread().name} took job {job.id}")
+                self.run_job(job)
+            except Exception:
+                logging.exception(f"Job {job.id} crashed the worker loop")
+                job.fail("Worker crashed while running the job.")
+            finally:
+                with self.busy_lock:
+                    self.busy -= 1
+
+    def serve(self, voices: Optional[List[str]] = None):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.journal.requeue_interrupted()
+        if voices:
+            warm_up(voices)
+
+        WORKERS_TOTAL.set(self.workers)
+        threads = [
+            threading.Thread(target=self._work, name=f"worker-{i}")
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        logging.info(f"Worker daemon started with {self.workers} worker(s).")
+
+        # Join with a timeout so the main thread keeps handling signals
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+        WORKERS_TOTAL.set(0)
+        logging.info("Worker daemon stopped.")
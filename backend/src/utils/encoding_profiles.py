@@ -0,0 +1,101 @@
+import os
+from typing import List, Optional
+
+
+class EncodingProfile:
+    """x264/AAC settings for one speed/size trade-off of the final encode"""
+
+    def __init__(
+        self,
+        name: str,
+        preset: str,
+        crf: int,
+        audio_bitrate: str,
+        gop_seconds: float = 2.0,
+        codec: str = "libx264",
+        pix_fmt: str = "yuv420p",
+        maxrate: Optional[str] = None,
+        threads: Optional[int] = None,
+        extra: Optional[List[str]] = None,
+    ):
+        self.name = name
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.maxrate = maxrate
+        self.pix_fmt = pix_fmt
+        self.gop_seconds = gop_seconds
+        self.threads = threads
+        self.audio_bitrate = audio_bitrate
+        self.extra = extra or []
+
+    def video_args(self, fps: Optional[float] = None, vfr: bool = False) -> List[str]:
+        """Video encoder options; the GOP is in frames, so it needs the fps
+
+        With `vfr` (static frames dropped) a frame-counted GOP would stretch
+        over the gaps, so keyframes are also forced every gop_seconds.
+        """
+        args = [
+            "-c:v",
+            self.codec,
+            "-preset",
+            self.preset,
+            "-crf",
+            str(self.crf),
+            "-pix_fmt",
+            self.pix_fmt,
+        ]
+        if self.maxrate:
+            # Capped CRF: constant quality, but no bitrate spikes on busy scenes
+            args += ["-maxrate", self.maxrate, "-bufsize", self.maxrate]
+        if fps:
+            args += ["-g", str(max(1, round(fps * self.gop_seconds)))]
+        if vfr:
+            args += [
+                "-fps_mode",
+                "vfr",
+                "-force_key_frames",
+                f"expr:gte(t,n_forced*{self.gop_seconds:g})",
+            ]
+        if self.threads:
+            # ffmpeg skips the job's own -threads cap when one is given
+            args += ["-threads", str(self.threads)]
+        return args + self.extra
+
+    def audio_args(self) -> List[str]:
+        return ["-c:a", "aac", "-b:a", self.audio_bitrate]
+
+    def container_args(self) -> List[str]:
+        """Move the moov atom to the front so playback starts while downloading"""
+        return ["-movflags", "+faststart"]
+
+    def __repr__(self):
+        return f"EncodingProfile({self.name!r}, {self.codec} {self.preset} crf={self.crf})"
+
+
+PROFILES = {
+    # Previews and debugging: as fast as x264 goes, visibly soft
+    "draft": EncodingProfile("draft", preset="ultrafast", crf=30, audio_bitrate="96k"),
+    # Quick turnaround with near-delivery quality
+    "fast": EncodingProfile("fast", preset="veryfast", crf=23, audio_bitrate="128k"),
+    # Shorts upload: high profile, closed 1s GOPs, capped peaks
+    "delivery": EncodingProfile(
+        "delivery",
+        preset="slow",
+        crf=20,
+        audio_bitrate="192k",
+        gop_seconds=1.0,
+        maxrate="12M",
+        extra=["-profile:v", "high", "-bf", "2", "-flags", "+cgop"],
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> EncodingProfile:
+    """Profile by name, ENCODING_PROFILE (default "delivery") when not given"""
+    name = name or os.getenv("ENCODING_PROFILE", "delivery")
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown encoding profile {name!r}, expected one of {sorted(PROFILES)}"
+        )
+    return PROFILES[name]
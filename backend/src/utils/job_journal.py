@@ -0,0 +1,369 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.utils.tracing import mark_job_failed
+
+# Pipeline stages in the order a job goes through them
+STAGES = (
+    "idea",
+    "code",
+    "narration",
+    "render",
+    "upload",
+    "metadata",
+    "sheet",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    error TEXT,
+    pid INTEGER,
+    owner TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    stage TEXT NOT NULL,
+    output TEXT NOT NULL,
+    artifacts TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+CREATE TABLE IF NOT EXISTS render_timings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    features TEXT NOT NULL,
+    predicted REAL NOT NULL,
+    seconds REAL NOT NULL,
+    created_at TEXT NOT NULL
+);
+"""
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _fingerprint(path: str) -> Optional[Dict]:
+    """Identify an artifact by path, size and mtime so stale files are detected"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"path": path, "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _process_owner(pid: int) -> Optional[str]:
+    """Boot ID and start time of a process, None where /proc is unavailable
+
+    PIDs repeat after a reboot or container restart (a daemon is often PID 1
+    every time), so the PID alone does not identify the process that ran a job.
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+        with open(f"/proc/{pid}/stat") as f:
+            # starttime is field 22; the command name before it may hold spaces
+            start_time = f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+    return f"{boot_id}:{start_time}"
+
+
+def _pid_alive(pid: Optional[int], owner: Optional[str] = None) -> bool:
+    if not pid:
+        return False
+    if owner:
+        return _process_owner(pid) == owner
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobJournal:
+    """SQLite journal of pipeline jobs and the outputs of each completed stage.
+
+    A stage is only reused on resume if every artifact it recorded still
+    exists with the same size and mtime.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("JOB_DB_PATH", "output/jobs.sqlite3")
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+            # Journals created before jobs recorded their owner
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _execute(self, query: str, params: Iterable = ()):
+        with self.lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return conn.execute(query, tuple(params)).fetchall()
+            finally:
+                conn.close()
+
+    def create_job(self, params: Optional[Dict] = None) -> "Job":
+        job_id = uuid.uuid4().hex[:12]
+        now = _now()
+        self._execute(
+            "INSERT INTO jobs "
+            "(id, status, params, pid, owner, created_at, updated_at) "
+            "VALUES (?, 'running', ?, ?, ?, ?, ?)",
+            (
+                job_id,
+                json.dumps(params or {}),
+                os.getpid(),
+                _process_owner(os.getpid()),
+                now,
+                now,
+            ),
+        )
+        logging.info(f"Created job {job_id}")
+        return Job(self, job_id)
+
+    def enqueue(self, params: Optional[Dict] = None) -> "Job":
+        """Add a job to the queue; a worker daemon claims it with claim_next()"""
+        job_id = uuid.uuid4().hex[:12]
+        now = _now()
+        self._execute(
+            "INSERT INTO jobs (id, status, params, created_at, updated_at) "
+            "VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, json.dumps(params or {}), now, now),
+        )
+        logging.info(f"Queued job {job_id}")
+        return Job(self, job_id)
+
+    def claim_next(
+        self, key: Optional[Callable[[Dict], Any]] = None
+    ) -> Optional["Job"]:
+        """Atomically move the next queued job to 'running' for this process.
+
+        Jobs are taken oldest first, or by the smallest `key(job)` where job
+        has id, params, created_at and the output of its code stage (or None).
+        """
+        with self.lock:
+            conn = self._connect()
+            try:
+                # IMMEDIATE takes the write lock up front, so two daemons
+                # sharing the database never claim the same job
+                conn.execute("BEGIN IMMEDIATE")
+                rows = conn.execute(
+                    "SELECT jobs.id, jobs.params, jobs.created_at, "
+                    "stages.output AS code FROM jobs LEFT JOIN stages "
+                    "ON stages.job_id = jobs.id AND stages.stage = 'code' "
+                    "WHERE jobs.status = 'queued' ORDER BY jobs.created_at, jobs.rowid"
+                ).fetchall()
+                row = rows[0] if rows else None
+                if rows and key:
+                    row = min(
+                        rows,
+                        key=lambda r: key(
+                            {
+                                "id": r["id"],
+                                "params": json.loads(r["params"]),
+                                "created_at": r["created_at"],
+                                "code": json.loads(r["code"]) if r["code"] else None,
+                            }
+                        ),
+                    )
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', pid = ?, owner = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (os.getpid(), _process_owner(os.getpid()), _now(), row["id"]),
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+        return Job(self, row["id"]) if row else None
+
+    def add_render_timing(self, features: Dict, predicted: float, seconds: float):
+        self._execute(
+            "INSERT INTO render_timings (features, predicted, seconds, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (json.dumps(features), predicted, seconds, _now()),
+        )
+
+    def render_timings(self, limit: int = 100) -> List[Dict]:
+        """Most recent successful renders: features, predicted and actual seconds"""
+        rows = self._execute(
+            "SELECT features, predicted, seconds FROM render_timings "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            {
+                "features": json.loads(row["features"]),
+                "predicted": row["predicted"],
+                "seconds": row["seconds"],
+            }
+            for row in rows
+        ]
+
+    def queue_depth(self) -> int:
+        rows = self._execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'")
+        return rows[0][0]
+
+    def requeue_interrupted(self) -> List[str]:
+        """Put 'running' jobs whose process died back on the queue"""
+        job_ids = [job["id"] for job in self.unfinished_jobs(include_failed=False)]
+        for job_id in job_ids:
+            self.set_status(job_id, "queued")
+        if job_ids:
+            logging.info(f"Requeued interrupted jobs: {job_ids}")
+        return job_ids
+
+    def open_job(self, job_id: str) -> "Job":
+        """Claim an existing job for this process so it can be resumed"""
+        if not self.get_job(job_id):
+            raise ValueError(f"Unknown job: {job_id}")
+        self._execute(
+            "UPDATE jobs SET status = 'running', error = NULL, pid = ?, owner = ?, "
+            "updated_at = ? WHERE id = ?",
+            (os.getpid(), _process_owner(os.getpid()), _now(), job_id),
+        )
+        return Job(self, job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["params"] = json.loads(job["params"])
+        job["stages"] = {
+            row["stage"]: json.loads(row["output"])
+            for row in self._execute(
+                "SELECT stage, output FROM stages WHERE job_id = ?", (job_id,)
+            )
+        }
+        return job
+
+    def list_jobs(self, statuses: Optional[Iterable[str]] = None) -> List[Dict]:
+        query = (
+            "SELECT id, status, error, pid, owner, created_at, updated_at FROM jobs"
+        )
+        params = []
+        if statuses:
+            statuses = list(statuses)
+            query += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+            params = statuses
+        return [dict(row) for row in self._execute(query + " ORDER BY created_at", params)]
+
+    def unfinished_jobs(self, include_failed: bool = True) -> List[Dict]:
+        """Failed jobs plus 'running' jobs whose process is gone (crashed or killed)"""
+        statuses = ["running", "failed"] if include_failed else ["running"]
+        return [
+            job
+            for job in self.list_jobs(statuses)
+            if job["status"] == "failed" or not _pid_alive(job["pid"], job["owner"])
+        ]
+
+    def stage_output(self, job_id: str, stage: str) -> Optional[Dict]:
+        rows = self._execute(
+            "SELECT output, artifacts FROM stages WHERE job_id = ? AND stage = ?",
+            (job_id, stage),
+        )
+        if not rows:
+            return None
+        for artifact in json.loads(rows[0]["artifacts"]):
+            if _fingerprint(artifact["path"]) != artifact:
+                logging.info(
+                    f"Job {job_id} stage {stage} artifact changed or missing: "
+                    f"{artifact['path']}"
+                )
+                return None
+        return json.loads(rows[0]["output"])
+
+    def complete_stage(
+        self, job_id: str, stage: str, output, artifacts: Iterable[str] = ()
+    ):
+        fingerprints = [_fingerprint(path) for path in artifacts if path]
+        self._execute(
+            "INSERT OR REPLACE INTO stages (job_id, stage, output, artifacts, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                job_id,
+                stage,
+                json.dumps(output),
+                json.dumps([f for f in fingerprints if f]),
+                _now(),
+            ),
+        )
+        # Later stages were built from the previous output of this one
+        later = STAGES[STAGES.index(stage) + 1 :]
+        self._execute(
+            f"DELETE FROM stages WHERE job_id = ? AND stage IN ({', '.join('?' * len(later))})",
+            (job_id, *later),
+        )
+        self._execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (_now(), job_id))
+        logging.info(f"Job {job_id} completed stage: {stage}")
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, error, _now(), job_id),
+        )
+
+
+class Job:
+    """A single journaled job, handed through the pipeline stages"""
+
+    def __init__(self, journal: JobJournal, job_id: str):
+        self.journal = journal
+        self.id = job_id
+
+    @property
+    def params(self) -> Dict:
+        return self.journal.get_job(self.id)["params"]
+
+    def stage(self, name: str):
+        """Output of a completed stage, or None if it has to run (again)"""
+        output = self.journal.stage_output(self.id, name)
+        if output is not None:
+            logging.info(f"Job {self.id} reusing completed stage: {name}")
+        return output
+
+    def record(self, name: str, output, artifacts: Iterable[str] = ()):
+        self.journal.complete_stage(self.id, name, output, artifacts)
+
+    def fail(self, error: str):
+        self.journal.set_status(self.id, "failed", error)
+        # manim_jobs_total counts the job span's status
+        mark_job_failed(error)
+
+    def complete(self):
+        self.journal.set_status(self.id, "completed")
+
+    @property
+    def completed(self) -> bool:
+        return self.journal.get_job(self.id)["status"] == "completed"
@@ -1,12 +1,6 @@
 import pathlib
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("logs/load_manim.log"), logging.StreamHandler()],
-)
-
 
 def load_manim_examples():
     """
@@ -0,0 +1,20 @@
+import logging
+import os
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def setup_logging(log_file: Optional[str] = None, level: Optional[str] = None):
+    """Configure the root logger once, from the entry point.
+
+    Modules only call `logging.*`; LOG_LEVEL and LOG_FILE pick the level and
+    an optional log file (its directory is created on demand).
+    """
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    log_file = log_file or os.getenv("LOG_FILE")
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        handlers.append(logging.FileHandler(log_file))
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT, handlers=handlers)
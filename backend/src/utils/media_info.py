@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import threading
+import wave
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Dict, List, Optional
+
+from src.utils import process_runner
+from src.utils.tracing import span
+
+CACHE_SIZE = 256
+
+
+class MediaInfo:
+    """Duration, streams and the main video/audio parameters of a media file"""
+
+    def __init__(
+        self, path: str, duration: float, streams: List[Dict], format_name=None
+    ):
+        self.path = path
+        self.duration = duration
+        self.streams = streams
+        self.format_name = format_name
+        video = next((s for s in streams if s.get("codec_type") == "video"), {})
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+        self.video_codec = video.get("codec_name")
+        self.width = video.get("width")
+        self.height = video.get("height")
+        self.fps = _rate(video.get("avg_frame_rate") or video.get("r_frame_rate"))
+        frames = str(video.get("nb_frames", ""))
+        self.frames = int(frames) if frames.isdigit() else None
+        self.audio_codec = audio.get("codec_name")
+        sample_rate = audio.get("sample_rate")
+        self.sample_rate = int(sample_rate) if sample_rate else None
+        self.channels = audio.get("channels")
+        # Per-track lengths; they differ when narration outlasts the render
+        self.video_duration = _seconds(video.get("duration"))
+        self.audio_duration = _seconds(audio.get("duration")) or (
+            duration if self.has_audio and not self.has_video else None
+        )
+
+    @property
+    def has_video(self) -> bool:
+        return self.video_codec is not None
+
+    @property
+    def has_audio(self) -> bool:
+        return self.audio_codec is not None
+
+    def __repr__(self):
+        return (
+            f"MediaInfo({self.path!r}, duration={self.duration:.3f}, "
+            f"video={self.video_codec} {self.width}x{self.height}@{self.fps}, "
+            f"audio={self.audio_codec})"
+        )
+
+
+def _seconds(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate(value: Optional[str]) -> Optional[float]:
+    try:
+        rate = Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return float(rate) if rate else None
+
+
+def _wav_info(path: str) -> Optional[MediaInfo]:
+    """Read a PCM WAV header directly; None for WAVs the wave module rejects"""
+    try:
+        with wave.open(path, "rb") as f:
+            rate, frames, channels = f.getframerate(), f.getnframes(), f.getnchannels()
+            sample_width = f.getsampwidth()
+    except (wave.Error, EOFError):
+        return None
+    stream = {
+        "codec_type": "audio",
+        "codec_name": f"pcm_s{sample_width * 8}le",
+        "sample_rate": str(rate),
+        "channels": channels,
+    }
+    return MediaInfo(path, frames / rate, [stream], "wav")
+
+
+def _ffprobe_info(path: str) -> MediaInfo:
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_format",
+        "-show_streams",
+        "-of",
+        "json",
+        path,
+    ]
+    with span("ffprobe", path=path):
+        result = process_runner.run(command, timeout=60)
+    data = json.loads(result.stdout or "{}")
+    fmt = data.get("format", {})
+    streams = data.get("streams", [])
+    duration = fmt.get("duration") or next(
+        (s["duration"] for s in streams if s.get("duration")), None
+    )
+    if duration is None:
+        raise Exception(f"Could not determine duration of {path}")
+    return MediaInfo(path, float(duration), streams, fmt.get("format_name"))
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def probe(path) -> MediaInfo:
+    """Media info of `path`, probed once per (path, mtime, size).
+
+    WAV files are read from their header; everything else goes through a
+    single ffprobe call for format and all streams.
+    """
+    path = str(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Media file not found: {path}")
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return _cache[key]
+        _stats["misses"] += 1
+
+    info = None
+    if path.lower().endswith(".wav"):
+        info = _wav_info(path)
+    if info is None:
+        info = _ffprobe_info(path)
+    logging.debug(f"Probed {info}")
+
+    with _cache_lock:
+        _cache[key] = info
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return info
+
+
+def duration(path) -> float:
+    return probe(path).duration
+
+
+_keyframes = OrderedDict()
+
+
+def keyframe_times(path) -> List[float]:
+    """Timestamps of the video keyframes, read from packet flags (no decoding)"""
+    path = str(path)
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        if key in _keyframes:
+            return _keyframes[key]
+
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,flags",
+        "-of",
+        "csv=p=0",
+        path,
+    ]
+    with span("ffprobe.keyframes", path=path):
+        result = process_runner.run(command, timeout=120)
+    times = []
+    for line in result.stdout.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            times.append(float(pts_time))
+    times.sort()
+
+    with _cache_lock:
+        _keyframes[key] = times
+        while len(_keyframes) > CACHE_SIZE:
+            _keyframes.popitem(last=False)
+    return times
+
+
+def cache_stats() -> Dict[str, int]:
+    with _cache_lock:
+        return dict(_stats, size=len(_cache))
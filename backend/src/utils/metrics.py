@@ -0,0 +1,244 @@
+import logging
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from src.utils.tracing import add_listener
+
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: Tuple, extra: Optional[Dict] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if value is None or math.isnan(value):
+            return
+        key = _label_key(labels)
+        with self.lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + (value <= bound) for c, bound in zip(counts, self.buckets)]
+            self.values[key] = (counts, total + value, count + 1)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(key, {'le': bound})} {bucket_count}"
+                    )
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name, help_text) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    "manim_stage_duration_seconds", "Duration of traced pipeline stages"
+)
+JOBS = REGISTRY.counter("manim_jobs_total", "Finished jobs by outcome")
+RENDER_ATTEMPTS = REGISTRY.counter(
+    "manim_render_attempts_total", "Render attempts in the fix loop by outcome"
+)
+FIX_ATTEMPTS = REGISTRY.counter(
+    "manim_fix_code_total", "fix_manim_code calls by outcome"
+)
+LLM_TOKENS = REGISTRY.counter("manim_llm_tokens_total", "Gemini tokens by call and kind")
+TTS_RTF = REGISTRY.histogram(
+    "manim_tts_real_time_factor",
+    "TTS synthesis time divided by audio duration",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4),
+)
+FFMPEG_FPS = REGISTRY.histogram(
+    "manim_ffmpeg_encode_fps",
+    "Frames per second reported by ffmpeg encodes",
+    buckets=(5, 10, 20, 30, 60, 120, 240, 480, 960),
+)
+UPLOAD_BYTES = REGISTRY.counter("manim_upload_bytes_total", "Bytes uploaded to storage")
+QUEUE_DEPTH = REGISTRY.gauge("manim_job_queue_depth", "Jobs waiting to be processed")
+WORKERS_BUSY = REGISTRY.gauge("manim_workers_busy", "Workers currently running a job")
+WORKERS_TOTAL = REGISTRY.gauge("manim_workers_total", "Configured workers")
+GLYPH_CACHE_BYTES = REGISTRY.gauge("manim_glyph_cache_bytes", "Size of the glyph cache")
+GLYPH_CACHE_HIT_RATE = REGISTRY.gauge(
+    "manim_glyph_cache_hit_rate", "Share of Tex/Text glyphs served from the cache"
+)
+
+
+def _record_span(span):
+    """Turn finished trace spans into metrics"""
+    STAGE_DURATION.observe(span.duration, stage=span.name, status=span.status)
+    attrs = span.attrs
+    if span.name == "job":
+        JOBS.inc(status=span.status)
+    for kind in ("prompt", "output"):
+        if attrs.get(f"{kind}_tokens"):
+            LLM_TOKENS.inc(attrs[f"{kind}_tokens"], call=span.name, kind=kind)
+    if span.name == "tts.generate" and attrs.get("rtf") is not None:
+        TTS_RTF.observe(attrs["rtf"], backend=attrs.get("backend", ""))
+    if span.name == "subprocess.ffmpeg" and attrs.get("fps"):
+        FFMPEG_FPS.observe(attrs["fps"])
+    if span.name == "upload" and span.status == "ok" and attrs.get("bytes"):
+        UPLOAD_BYTES.inc(attrs["bytes"])
+
+
+_trace_listener_installed = False
+
+
+def install_trace_metrics():
+    global _trace_listener_installed
+    if not _trace_listener_installed:
+        add_listener(_record_span)
+        _trace_listener_installed = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics in Prometheus text format from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Metrics served on http://{host}:{port}/metrics")
+    return server
+
+
+def dump_to_file(path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp_path, path)
+
+
+def start_file_dumper(path: str, interval: float = 15) -> threading.Event:
+    """Rewrite `path` with the current metrics every `interval` seconds"""
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval):
+            try:
+                dump_to_file(path)
+            except Exception as e:
+                logging.warning(f"Failed to dump metrics to {path}: {e}")
+
+    threading.Thread(target=_loop, daemon=True).start()
+    return stop
+
+
+def start_metrics(port: Optional[int] = None, file_path: Optional[str] = None):
+    """Enable metrics for a long-running entry point (METRICS_PORT / METRICS_FILE)"""
+    install_trace_metrics()
+    port = port or (int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None)
+    file_path = file_path or os.getenv("METRICS_FILE")
+    if port:
+        start_http_server(port)
+    if file_path:
+        start_file_dumper(file_path, float(os.getenv("METRICS_DUMP_INTERVAL", "15")))
+    return file_path
@@ -0,0 +1,446 @@
+import contextvars
+import itertools
+import logging
+import os
+import queue
+import re
+import resource
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Pattern, Sequence, Set
+
+# Thread pools of the numeric libraries manim, numpy and torch pull in
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+KILL_GRACE_SECONDS = 5
+_cgroup_counter = itertools.count()
+
+_limits = contextvars.ContextVar("process_limits", default=None)
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+class ResourceLimits:
+    """CPU set, thread count, memory cap and niceness for child processes.
+
+    memory_mb is enforced with a cgroup v2 memory.max when SUBPROCESS_CGROUP
+    points at a writable cgroup directory, and with RLIMIT_AS otherwise.
+    """
+
+    def __init__(
+        self,
+        cpus: Optional[Set[int]] = None,
+        threads: Optional[int] = None,
+        memory_mb: Optional[int] = None,
+        nice: Optional[int] = None,
+        cgroup: Optional[str] = None,
+    ):
+        self.cpus = set(cpus) if cpus else None
+        self.threads = threads or (len(self.cpus) if self.cpus else None)
+        self.memory_mb = memory_mb
+        self.nice = nice
+        self.cgroup = cgroup
+
+    @classmethod
+    def from_env(cls, cpus: Optional[Set[int]] = None) -> "ResourceLimits":
+        return cls(
+            cpus=cpus,
+            threads=_env_int("SUBPROCESS_THREADS"),
+            memory_mb=_env_int("SUBPROCESS_MEMORY_MB"),
+            nice=_env_int("SUBPROCESS_NICE"),
+            cgroup=os.getenv("SUBPROCESS_CGROUP"),
+        )
+
+    def environment(self, base: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        env = dict(os.environ if base is None else base)
+        if self.threads:
+            for name in THREAD_ENV_VARS:
+                env[name] = str(self.threads)
+        return env
+
+    def apply_to_command(self, command: List[str]) -> List[str]:
+        """Cap ffmpeg's own thread pools, which ignore the environment"""
+        if not self.threads or os.path.basename(command[0]) != "ffmpeg":
+            return command
+        if "-threads" in command:
+            return command
+        threads = str(self.threads)
+        # Output options go right before the output file
+        return [
+            *command[:-1],
+            "-threads",
+            threads,
+            "-filter_threads",
+            threads,
+            command[-1],
+        ]
+
+    def _cgroup_dir(self) -> Optional[str]:
+        if not self.cgroup or not self.memory_mb:
+            return None
+        path = os.path.join(self.cgroup, f"proc-{os.getpid()}-{next(_cgroup_counter)}")
+        try:
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, "memory.max"), "w") as f:
+                f.write(str(self.memory_mb * 1024 * 1024))
+            return path
+        except OSError as e:
+            logging.warning(f"cgroup {path} unavailable, using RLIMIT_AS: {e}")
+            return None
+
+    def preexec(self, cgroup_dir: Optional[str] = None):
+        """Function run in the child between fork and exec.
+
+        Only plain os/resource calls, so it is safe with threads in the parent;
+        nothing is imported in the child, which could block on an import lock
+        another parent thread held at fork time.
+        """
+        cpus, nice, memory_mb = self.cpus, self.nice, self.memory_mb
+
+        def _apply():
+            if cgroup_dir:
+                with open(os.path.join(cgroup_dir, "cgroup.procs"), "w") as f:
+                    f.write(str(os.getpid()))
+            elif memory_mb:
+                limit = memory_mb * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+            if cpus:
+                os.sched_setaffinity(0, cpus)
+            if nice:
+                os.nice(nice)
+
+        return _apply
+
+
+class CpuAllocator:
+    """Hands out disjoint CPU sets so concurrent jobs do not share cores"""
+
+    def __init__(self, cpus: Optional[Set[int]] = None):
+        if cpus is None:
+            cpus = (
+                os.sched_getaffinity(0)
+                if hasattr(os, "sched_getaffinity")
+                else set(range(os.cpu_count() or 1))
+            )
+        self.free = sorted(cpus)
+        self.total = len(self.free)
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def lease(self, count: int):
+        count = max(1, min(count, self.total))
+        with self.condition:
+            while len(self.free) < count:
+                self.condition.wait()
+            cpus, self.free = set(self.free[:count]), self.free[count:]
+        try:
+            yield cpus
+        finally:
+            with self.condition:
+                self.free = sorted(set(self.free) | cpus)
+                self.condition.notify_all()
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def cpu_allocator() -> CpuAllocator:
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = CpuAllocator()
+        return _allocator
+
+
+def current_limits() -> ResourceLimits:
+    return _limits.get() or ResourceLimits.from_env()
+
+
+@contextmanager
+def job_resources(cpus: Optional[int] = None):
+    """Pin every subprocess started in this context to a leased CPU set.
+
+    JOB_CPUS sets the size of the set; without it all CPUs are shared and
+    only the SUBPROCESS_* limits apply.
+    """
+    cpus = cpus or _env_int("JOB_CPUS")
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        yield current_limits()
+        return
+    with cpu_allocator().lease(cpus) as cpu_set:
+        token = _limits.set(ResourceLimits.from_env(cpu_set))
+        logging.info(f"Job pinned to CPUs {sorted(cpu_set)}")
+        try:
+            yield _limits.get()
+        finally:
+            _limits.reset(token)
+
+
+def _kill_group(process: subprocess.Popen):
+    """SIGTERM the whole process group, SIGKILL it if it does not exit"""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=KILL_GRACE_SECONDS)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def popen(command: List[str], limits: Optional[ResourceLimits] = None, **kwargs):
+    """subprocess.Popen in its own process group under `limits`"""
+    limits = limits or current_limits()
+    command = limits.apply_to_command([str(part) for part in command])
+    cgroup_dir = limits._cgroup_dir()
+    process = subprocess.Popen(
+        command,
+        env=limits.environment(kwargs.pop("env", None)),
+        preexec_fn=limits.preexec(cgroup_dir),
+        start_new_session=True,
+        **kwargs,
+    )
+    process.cgroup_dir = cgroup_dir
+    return process
+
+
+def _remove_cgroup(process):
+    if getattr(process, "cgroup_dir", None):
+        try:
+            os.rmdir(process.cgroup_dir)
+        except OSError:
+            pass
+
+
+def run(
+    command: List[str],
+    timeout: Optional[float] = None,
+    limits: Optional[ResourceLimits] = None,
+) -> subprocess.CompletedProcess:
+    """Run a command to completion with captured text output.
+
+    Raises subprocess.TimeoutExpired after killing the whole process group,
+    and subprocess.CalledProcessError on a non-zero exit.
+    """
+    process = popen(
+        command,
+        limits,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+    )
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_group(process)
+        stdout, stderr = process.communicate()
+        raise subprocess.TimeoutExpired(process.args, timeout, stdout, stderr)
+    except BaseException:
+        _kill_group(process)
+        raise
+    finally:
+        _remove_cgroup(process)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, process.args, stdout, stderr
+        )
+    return subprocess.CompletedProcess(process.args, 0, stdout, stderr)
+
+
+# A Python traceback in the child means the render is already lost
+TRACEBACK_PATTERNS = (r"Traceback \(most recent call last\)",)
+# Lines kept after a fatal pattern so the error text reaches the fix loop
+FAIL_FAST_GRACE_SECONDS = 2
+
+MANIM_PROGRESS = re.compile(r"Animation (\d+).*?(\d+)%\|.*?\|\s*(\d+)/(\d+)")
+FFMPEG_DURATION = re.compile(r"Duration: (\d+):(\d+):([\d.]+)")
+
+
+class ManimProgressParser:
+    """Turns manim's per-animation tqdm bars into progress events"""
+
+    tool = "manim"
+
+    def feed(self, stream: str, line: str) -> Optional[Dict]:
+        match = MANIM_PROGRESS.search(line)
+        if not match:
+            return None
+        animation, percent, frame, frames = match.groups()
+        return {
+            "tool": self.tool,
+            "animation": int(animation),
+            "percent": float(percent),
+            "frame": int(frame),
+            "frames": int(frames),
+        }
+
+
+class FfmpegProgressParser:
+    """Parses `-progress pipe:1` key=value blocks; input Duration gives percent"""
+
+    tool = "ffmpeg"
+
+    def __init__(self):
+        self.duration = None
+        self.block = {}
+
+    def feed(self, stream: str, line: str) -> Optional[Dict]:
+        if stream == "stderr":
+            match = FFMPEG_DURATION.search(line)
+            if match and self.duration is None:
+                hours, minutes, seconds = match.groups()
+                self.duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            return None
+        key, _, value = line.partition("=")
+        if not _:
+            return None
+        self.block[key.strip()] = value.strip()
+        if key.strip() != "progress":
+            return None
+        block, self.block = self.block, {}
+        event = {"tool": self.tool, "done": block.get("progress") == "end"}
+        for name, cast in (("frame", int), ("fps", float), ("out_time_us", int)):
+            try:
+                event[name] = cast(block[name])
+            except (KeyError, ValueError):
+                pass
+        event["speed"] = block.get("speed", "").rstrip("x") or None
+        if self.duration and "out_time_us" in event:
+            percent = event["out_time_us"] / 1e6 / self.duration * 100
+            event["percent"] = min(percent, 100.0)
+        return event
+
+
+def progress_parser_for(command: Sequence[str]):
+    name = os.path.basename(str(command[0]))
+    if name == "ffmpeg":
+        return FfmpegProgressParser()
+    # Also wrapped manim: profilers and the glyph cache runner put it later
+    if name == "manim" or "manim" in command:
+        return ManimProgressParser()
+    return None
+
+
+def with_ffmpeg_progress(command: List[str]) -> List[str]:
+    """Ask ffmpeg for machine-readable progress on stdout instead of stats"""
+    if os.path.basename(str(command[0])) != "ffmpeg" or "-progress" in command:
+        return command
+    if str(command[-1]) in ("-", "pipe:1", "pipe:"):
+        return command
+    return [command[0], "-progress", "pipe:1", "-nostats", *command[1:]]
+
+
+def _read_lines(pipe, name: str, lines: queue.Queue):
+    """Split a pipe into lines on newlines and carriage returns (tqdm redraws)"""
+    buffer = ""
+    while True:
+        chunk = pipe.read1(65536) if hasattr(pipe, "read1") else pipe.read(65536)
+        if not chunk:
+            break
+        buffer += chunk.decode(errors="replace")
+        *complete, buffer = re.split(r"[\r\n]", buffer)
+        for line in complete:
+            if line.strip():
+                lines.put((name, line))
+    if buffer.strip():
+        lines.put((name, buffer))
+    lines.put((name, None))
+
+
+def stream(
+    command: List[str],
+    timeout: Optional[float] = None,
+    limits: Optional[ResourceLimits] = None,
+    on_line: Optional[Callable[[str, str], None]] = None,
+    on_progress: Optional[Callable[[Dict], None]] = None,
+    fail_fast: Sequence[str] = (),
+    tail_lines: int = 200,
+) -> subprocess.CompletedProcess:
+    """Run a command while reading its output line by line.
+
+    stdout/stderr are not buffered whole: only the last `tail_lines` lines of
+    each are kept for the result and errors. Progress lines of manim and
+    ffmpeg are turned into events for `on_progress`. When a line matches one
+    of the `fail_fast` patterns the process group is killed shortly after
+    (once the error text has been read) and CalledProcessError is raised.
+    """
+    command = with_ffmpeg_progress([str(part) for part in command])
+    parser = progress_parser_for(command)
+    patterns: List[Pattern] = [re.compile(pattern) for pattern in fail_fast]
+    tails = {"stdout": deque(maxlen=tail_lines), "stderr": deque(maxlen=tail_lines)}
+    lines = queue.Queue()
+
+    process = popen(command, limits, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    readers = [
+        threading.Thread(target=_read_lines, args=(pipe, name, lines), daemon=True)
+        for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr))
+    ]
+    for reader in readers:
+        reader.start()
+
+    deadline = time.monotonic() + timeout if timeout else None
+    fatal_at = None
+    open_streams = 2
+    try:
+        while open_streams:
+            now = time.monotonic()
+            if deadline and now > deadline:
+                _kill_group(process)
+                raise subprocess.TimeoutExpired(
+                    process.args,
+                    timeout,
+                    "\n".join(tails["stdout"]),
+                    "\n".join(tails["stderr"]),
+                )
+            if fatal_at and now - fatal_at > FAIL_FAST_GRACE_SECONDS:
+                logging.error("Fatal error in subprocess output, stopping it early")
+                _kill_group(process)
+                break
+            try:
+                name, line = lines.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if line is None:
+                open_streams -= 1
+                continue
+
+            if parser:
+                event = parser.feed(name, line)
+                if event:
+                    if on_progress:
+                        on_progress(event)
+                    continue
+            tails[name].append(line)
+            if on_line:
+                on_line(name, line)
+            if not fatal_at and any(p.search(line) for p in patterns):
+                fatal_at = time.monotonic()
+        returncode = process.wait()
+    except BaseException:
+        _kill_group(process)
+        raise
+    finally:
+        for reader in readers:
+            reader.join(timeout=1)
+        _remove_cgroup(process)
+
+    stdout, stderr = "\n".join(tails["stdout"]), "\n".join(tails["stderr"])
+    if fatal_at and returncode == 0:
+        returncode = -signal.SIGTERM
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, process.args, stdout, stderr)
+    return subprocess.CompletedProcess(process.args, 0, stdout, stderr)
@@ -0,0 +1,153 @@
+import contextlib
+import cProfile
+import io
+import itertools
+import logging
+import os
+import pstats
+import sys
+import threading
+from typing import List, Optional
+
+# MANIM_PROFILE: "all" or comma separated stage names ("render,narration").
+# A stage "narration.en-us" is also enabled by "narration".
+_enabled = None
+_active = threading.local()
+_counter = itertools.count()
+_null = contextlib.nullcontext()
+
+
+def _enabled_stages():
+    global _enabled
+    if _enabled is None:
+        value = os.getenv("MANIM_PROFILE", "").strip()
+        _enabled = frozenset(s.strip() for s in value.split(",") if s.strip())
+    return _enabled
+
+
+def enable(stages: str = "all"):
+    """Turn profiling on for this process and the worker processes it starts"""
+    global _enabled
+    os.environ["MANIM_PROFILE"] = stages
+    _enabled = None
+
+
+def is_enabled(stage: str) -> bool:
+    stages = _enabled_stages()
+    if not stages:
+        return False
+    return "all" in stages or stage in stages or stage.split(".")[0] in stages
+
+
+def profile_dir() -> str:
+    path = os.getenv("PROFILE_DIR", "output/profiles")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _profile_path(stage: str, suffix: str = ".prof") -> str:
+    safe_stage = "".join(c if c.isalnum() or c in "-_." else "_" for c in stage)
+    name = f"{safe_stage}-{os.getpid()}-{next(_counter)}{suffix}"
+    return os.path.join(profile_dir(), name)
+
+
+def write_summary(profile_path: str, limit: int = 25) -> Optional[str]:
+    """Write the top functions by cumulative time next to a .prof file"""
+    try:
+        stream = io.StringIO()
+        stats = pstats.Stats(profile_path, stream=stream)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+        stats.sort_stats("tottime").print_stats(limit)
+        summary_path = os.path.splitext(profile_path)[0] + ".txt"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(stream.getvalue())
+        return summary_path
+    except Exception as e:
+        logging.warning(f"Failed to summarize profile {profile_path}: {e}")
+        return None
+
+
+@contextlib.contextmanager
+def _profile(stage: str):
+    profiler = cProfile.Profile()
+    _active.running = True
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _active.running = False
+        path = _profile_path(stage)
+        profiler.dump_stats(path)
+        write_summary(path)
+        logging.info(f"Profile for {stage} written to {path}")
+
+
+def profile_stage(stage: str):
+    """cProfile a block when MANIM_PROFILE enables `stage`; a no-op otherwise.
+
+    Nested stages inside an already profiled one are left to the outer profile.
+    """
+    if not _enabled_stages() or getattr(_active, "running", False):
+        return _null
+    if not is_enabled(stage):
+        return _null
+    return _profile(stage)
+
+
+def profiled_command(stage: str, command: List[str]):
+    """Wrap a Python worker command so it profiles itself.
+
+    Returns (command, profile_path); profile_path is None when disabled.
+    MANIM_PROFILER=py-spy samples the worker instead of using cProfile.
+    """
+    if not is_enabled(stage):
+        return command, None
+    if os.getenv("MANIM_PROFILER", "cprofile") == "py-spy":
+        path = _profile_path(stage, ".speedscope.json")
+        return [
+            "py-spy",
+            "record",
+            "--format",
+            "speedscope",
+            "-o",
+            path,
+            "--subprocesses",
+            "--",
+            *command,
+        ], path
+
+    path = _profile_path(stage)
+    module = os.path.basename(command[0])
+    return [sys.executable, "-m", "cProfile", "-o", path, "-m", module, *command[1:]], path
+
+
+def import_time_report(module: str = "app", limit: int = 20):
+    """Import `module` in a fresh interpreter under -X importtime.
+
+    Returns (total_seconds, [(cumulative_s, self_s, name), ...]) with the
+    slowest imports first.
+    """
+    import subprocess
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        name = name[1:].rstrip()
+        # Nested imports are indented in the name column; top-level ones sum up
+        if not name.startswith(" "):
+            total += int(cumulative_us) / 1e6
+        rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.strip()))
+    rows.sort(key=lambda row: row[0], reverse=True)
+    return total, rows[:limit]
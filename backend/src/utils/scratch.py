@@ -0,0 +1,104 @@
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+_placed: Dict[str, str] = {}
+_lock = threading.Lock()
+_ram_root = None
+
+
+def ram_root() -> Optional[Path]:
+    """tmpfs directory for intermediates, None when scratch stays on disk.
+
+    SCRATCH_BACKEND is "auto" (tmpfs when SCRATCH_RAM_DIR is writable),
+    "ram" (same, but warn when it is not) or "disk".
+    """
+    global _ram_root
+    backend = os.getenv("SCRATCH_BACKEND", "auto")
+    if backend == "disk":
+        return None
+    if _ram_root is None:
+        root = Path(os.getenv("SCRATCH_RAM_DIR", "/dev/shm/manim_generator"))
+        try:
+            root.mkdir(parents=True, exist_ok=True)
+            usable = os.access(root, os.W_OK)
+        except OSError:
+            usable = False
+        if not usable:
+            if backend == "ram":
+                logging.warning(f"Scratch dir {root} is not writable, using disk")
+            return None
+        _ram_root = root.resolve()
+    return _ram_root
+
+
+def usage_mb(root: Path) -> float:
+    total = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def _ram_path(root: Path, disk_path: str) -> Path:
+    return root / os.path.normpath(disk_path).lstrip(os.sep)
+
+
+def place(disk_path, expected_mb: float = 0.0) -> str:
+    """Where an intermediate that would live at `disk_path` should go.
+
+    The tmpfs copy of the path is used while the scratch usage plus
+    `expected_mb` stays under SCRATCH_RAM_LIMIT_MB (default 1024) and the
+    tmpfs has that much free; otherwise `disk_path` itself. A path keeps the
+    place it was first given, and an existing file is found where it is, so
+    readers that recompute a path (subtitles_path_for) agree with writers.
+    """
+    disk_path = str(disk_path)
+    root = ram_root()
+    if root is None:
+        return disk_path
+    with _lock:
+        if disk_path in _placed:
+            return _placed[disk_path]
+        ram_path = _ram_path(root, disk_path)
+        if ram_path.exists():
+            placed = str(ram_path)
+        elif os.path.exists(disk_path):
+            placed = disk_path
+        else:
+            limit_mb = float(os.getenv("SCRATCH_RAM_LIMIT_MB", "1024"))
+            free_mb = shutil.disk_usage(root).free / (1024 * 1024)
+            fits = usage_mb(root) + expected_mb <= limit_mb and expected_mb < free_mb
+            placed = str(ram_path) if fits else disk_path
+            if not fits:
+                logging.info(f"Scratch tmpfs is full, {disk_path} stays on disk")
+        _placed[disk_path] = placed
+        return placed
+
+
+def on_ram(path) -> bool:
+    root = ram_root()
+    return root is not None and os.path.abspath(path).startswith(str(root) + os.sep)
+
+
+def release(paths: Iterable[str]):
+    """Delete the given intermediates that live on tmpfs, freeing its memory"""
+    for path in paths:
+        if path and on_ram(path):
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                logging.warning(f"Failed to release scratch file {path}: {e}")
+        with _lock:
+            for disk_path, placed in list(_placed.items()):
+                if placed == path:
+                    del _placed[disk_path]
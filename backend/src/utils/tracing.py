@@ -0,0 +1,150 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Optional
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_children_lock = threading.Lock()
+_listeners: List[Callable] = []
+
+
+class Span:
+    """A timed pipeline stage; spans nest through a context variable"""
+
+    def __init__(self, name: str, attrs: Optional[dict] = None, parent=None):
+        self.name = name
+        self.attrs = dict(attrs or {})
+        self.parent = parent
+        self.children = []
+        self.status = "ok"
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "attrs": self.attrs,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_attributes(**attrs):
+    """Attach attributes (byte sizes, token counts, ...) to the active span"""
+    span_ = _current_span.get()
+    if span_ is not None:
+        span_.set(**attrs)
+
+
+def mark_job_failed(error: str):
+    """Mark the enclosing job span failed for a job that ends without raising"""
+    span_ = _current_span.get()
+    while span_ is not None and span_.name != "job":
+        span_ = span_.parent
+    if span_ is not None:
+        span_.status = "error"
+        span_.set(error=str(error)[:500])
+
+
+def add_listener(listener: Callable[[Span], None]):
+    """Call `listener(span)` whenever a span finishes"""
+    _listeners.append(listener)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block as a child of the active span"""
+    parent = _current_span.get()
+    span_ = Span(name, attrs, parent)
+    if parent is not None:
+        with _children_lock:
+            parent.children.append(span_)
+    token = _current_span.set(span_)
+    try:
+        yield span_
+    except BaseException as e:
+        span_.status = "error"
+        span_.set(error=f"{type(e).__name__}: {e}"[:500])
+        raise
+    finally:
+        span_.finish()
+        _current_span.reset(token)
+        for listener in _listeners:
+            try:
+                listener(span_)
+            except Exception as e:
+                logging.warning(f"Span listener failed: {e}")
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of `span`"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def with_context(func):
+    """Bind `func` to the current context so worker threads nest their spans"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def trace_job(job_id: str, **attrs):
+    """Root span of a job; its span tree is written as JSON when it finishes"""
+    root = None
+    try:
+        with span("job", job_id=job_id, **attrs) as root:
+            yield root
+    finally:
+        if root is not None:
+            write_trace(root)
+
+
+def write_trace(root: Span) -> Optional[str]:
+    trace_dir = os.getenv("TRACE_DIR", "output/traces")
+    try:
+        os.makedirs(trace_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(root.started_at).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(trace_dir, f"{root.attrs.get('job_id')}-{stamp}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(root.to_dict(), f, indent=2, default=str)
+        logging.info(f"Trace written to {path}")
+        return path
+    except Exception as e:
+        logging.error(f"Failed to write trace: {e}")
+        return None
@@ -0,0 +1,87 @@
+import http.client
+import json
+import threading
+import time
+import types
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src.services.api_service import _ApiHandler, parse_range
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=900-5000", (900, 999)),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize(
+    "header", ["bytes=-", "bytes=1000-", "bytes=50-10", "items=0-1", "bytes=0-1,5-6"]
+)
+def test_parse_range_rejects_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+@pytest.fixture
+def api_server():
+    job = {"id": "job1", "status": "running", "stages": {}}
+    lookups = []
+
+    def get_job(job_id):
+        lookups.append(job_id)
+        return job
+
+    api = types.SimpleNamespace(
+        journal=types.SimpleNamespace(get_job=get_job),
+        lookups=lookups,
+        requests=threading.BoundedSemaphore(4),
+        streams=threading.BoundedSemaphore(4),
+        poll_interval=0.01,
+        submitted=[],
+    )
+    api.submit = lambda *args: api.submitted.append(args)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ApiHandler)
+    server.api = api
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(server, method, path, body=None):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    connection.request(method, path, body=body)
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response, data
+
+
+def test_head_events_returns_headers_only(api_server):
+    response, data = _request(api_server, "HEAD", "/jobs/job1/events")
+    time.sleep(0.1)
+
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "text/event-stream"
+    assert data == b""
+    # Only the existence check; the event loop would poll the job every 10ms
+    assert api_server.api.lookups == ["job1"]
+
+
+def test_submit_rejects_non_string_idea(api_server):
+    response, data = _request(api_server, "POST", "/jobs", json.dumps({"idea": 42}))
+
+    assert response.status == 400
+    assert json.loads(data) == {"error": "idea must be a string"}
+    assert api_server.api.submitted == []
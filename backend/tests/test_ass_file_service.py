@@ -0,0 +1,46 @@
+from src.services.ass_file_service import ASSSubtitleWriter, ass_timestamp, build_cues
+
+WORDS = [
+    {"word": "Hello", "start": 0.0, "end": 0.4},
+    {"word": "world.", "start": 0.5, "end": 1.0},
+    {"word": "Next", "start": 1.2, "end": 1.5},
+    {"word": "cue", "start": 1.5, "end": 1.9},
+    {"word": "here", "start": 2.0, "end": 2.3},
+]
+
+
+def test_cues_end_at_sentences_and_max_words():
+    cues = build_cues(WORDS, max_words=2)
+
+    assert [[w["word"] for w in cue["words"]] for cue in cues] == [
+        ["Hello", "world."],
+        ["Next", "cue"],
+        ["here"],
+    ]
+    assert (cues[0]["start"], cues[0]["end"]) == (0.0, 1.0)
+    assert (cues[2]["start"], cues[2]["end"]) == (2.0, 2.3)
+
+
+def test_ass_timestamp():
+    assert ass_timestamp(0) == "0:00:00.00"
+    assert ass_timestamp(3661.256) == "1:01:01.26"
+    assert ass_timestamp(-1) == "0:00:00.00"
+
+
+def test_karaoke_tags_fold_gaps_into_the_next_word():
+    cue = build_cues(WORDS)[0]
+    text = ASSSubtitleWriter(karaoke=True, color_mode="none").format_cue(cue)
+
+    assert text == "{\\k40}Hello {\\k60}world."
+
+
+def test_write_uses_one_dialogue_per_cue(tmp_path):
+    output = tmp_path / "subtitles" / "subtitles_en-us.ass"
+    ASSSubtitleWriter(color_mode="line").write(WORDS, str(output))
+
+    dialogues = [
+        line for line in output.read_text().splitlines() if line.startswith("Dialogue:")
+    ]
+    assert len(dialogues) == 2
+    assert dialogues[0].startswith("Dialogue: 0,0:00:00.00,0:00:01.00,Default,")
+    assert dialogues[0].endswith("}Hello world.")
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from src.services import glyph_cache_service
+from src.services.glyph_cache_service import GlyphCache
+
+
+@pytest.fixture
+def stub_manim(monkeypatch, tmp_path):
+    """Just enough of manim's Tex/Text SVG API, compiling into ./media"""
+    monkeypatch.chdir(tmp_path)
+    compiled = []
+
+    def generate_tex_file(expression, environment=None, tex_template=None):
+        name = hashlib.sha256(expression.encode()).hexdigest()[:16]
+        tex_file = Path("media/Tex") / f"{name}.tex"
+        tex_file.parent.mkdir(parents=True, exist_ok=True)
+        tex_file.write_text(expression)
+        return tex_file
+
+    def tex_to_svg_file(expression, environment=None, tex_template=None):
+        svg_file = generate_tex_file(expression).with_suffix(".svg")
+        if not svg_file.exists():
+            compiled.append(expression)
+            svg_file.write_text(f"<svg>{expression}</svg>")
+        return svg_file
+
+    class Text:
+        def __init__(self, text):
+            self.text = text
+
+        def _text2hash(self, color):
+            return hashlib.sha256(f"{self.text}{color}".encode()).hexdigest()[:16]
+
+        def _text2svg(self, color):
+            svg_file = Path("media/texts") / f"{self._text2hash(color)}.svg"
+            svg_file.parent.mkdir(parents=True, exist_ok=True)
+            if not svg_file.exists():
+                compiled.append(self.text)
+                svg_file.write_text(f"<svg>{self.text}</svg>")
+            return str(svg_file)
+
+    class MarkupText(Text):
+        def _text2svg(self, color):
+            return Text._text2svg(self, color)
+
+    dirs = {"text_dir": Path("media/texts"), "tex_dir": Path("media/Tex")}
+    config = types.SimpleNamespace(get_dir=lambda name: dirs[name])
+    modules = {
+        "manim": types.ModuleType("manim"),
+        "manim.utils": types.ModuleType("manim.utils"),
+        "manim.utils.tex_file_writing": types.ModuleType("tex_file_writing"),
+        "manim.mobject": types.ModuleType("manim.mobject"),
+        "manim.mobject.text": types.ModuleType("manim.mobject.text"),
+        "manim.mobject.text.tex_mobject": types.ModuleType("tex_mobject"),
+        "manim.mobject.text.text_mobject": types.ModuleType("text_mobject"),
+    }
+    modules["manim"].config = config
+    modules["manim.utils"].tex_file_writing = modules["manim.utils.tex_file_writing"]
+    modules["manim.utils.tex_file_writing"].generate_tex_file = generate_tex_file
+    modules["manim.utils.tex_file_writing"].tex_to_svg_file = tex_to_svg_file
+    text_package = modules["manim.mobject.text"]
+    text_package.tex_mobject = modules["manim.mobject.text.tex_mobject"]
+    text_package.text_mobject = modules["manim.mobject.text.text_mobject"]
+    text_package.tex_mobject.tex_to_svg_file = tex_to_svg_file
+    text_package.text_mobject.Text = Text
+    text_package.text_mobject.MarkupText = MarkupText
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    return types.SimpleNamespace(compiled=compiled, modules=modules, Text=Text)
+
+
+def test_glyphs_compiled_once_are_served_to_later_renders(stub_manim, tmp_path):
+    cache = GlyphCache(root=tmp_path / "cache")
+    patched = glyph_cache_service.install(cache)
+    assert patched == ["tex_to_svg_file", "Text._text2svg", "MarkupText._text2svg"]
+    tex_mobject = stub_manim.modules["manim.mobject.text.tex_mobject"]
+
+    tex_mobject.tex_to_svg_file(r"\begin{bmatrix} a \end{bmatrix}")
+    stub_manim.Text("hello")._text2svg("WHITE")
+    assert cache.misses == {"Tex": 1, "texts": 1}
+
+    # A later job starts without media/
+    for path in sorted(Path("media").rglob("*"), reverse=True):
+        path.rmdir() if path.is_dir() else path.unlink()
+    svg = tex_mobject.tex_to_svg_file(r"\begin{bmatrix} a \end{bmatrix}")
+    stub_manim.Text("hello")._text2svg("WHITE")
+
+    assert cache.hits == {"Tex": 1, "texts": 1}
+    assert len(stub_manim.compiled) == 2
+    assert svg.read_text() == r"<svg>\begin{bmatrix} a \end{bmatrix}</svg>"
+    cache.record()
+    assert cache.evict()["hit_rate"] == 0.5
+
+
+def test_mismatched_signatures_are_left_unpatched(stub_manim, tmp_path):
+    tex_file_writing = stub_manim.modules["manim.utils.tex_file_writing"]
+    original = tex_file_writing.tex_to_svg_file
+
+    def tex_to_svg_file(expression, environment=None, tex_template=None, extra=1):
+        return original(expression)
+
+    tex_file_writing.tex_to_svg_file = tex_to_svg_file
+    stub_manim.modules["manim.mobject.text.tex_mobject"].tex_to_svg_file = (
+        tex_to_svg_file
+    )
+
+    patched = glyph_cache_service.install(GlyphCache(root=tmp_path / "cache"))
+
+    assert "tex_to_svg_file" not in patched
+    assert tex_file_writing.tex_to_svg_file is tex_to_svg_file
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = GlyphCache(root=tmp_path, max_mb=1500 / (1024 * 1024))
+    for age, name in enumerate(["old.svg", "new.svg"]):
+        entry = tmp_path / "texts" / name
+        entry.write_text("x" * 1000)
+        os.utime(entry, (age, age))
+
+    stats = cache.evict()
+
+    assert [p.name for p in (tmp_path / "texts").iterdir()] == ["new.svg"]
+    assert stats["entries"] == 1
+
+
+def test_wrap_command_keeps_manim_visible():
+    assert glyph_cache_service.wrap_command(["manim", "-qh", "s.py", "S"])[1:4] == [
+        "-m",
+        glyph_cache_service.RUNNER_MODULE,
+        "manim",
+    ]
+    assert glyph_cache_service.wrap_command(["ffmpeg", "-i", "x"]) == [
+        "ffmpeg",
+        "-i",
+        "x",
+    ]
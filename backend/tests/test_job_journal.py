@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from src.utils.job_journal import JobJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return JobJournal(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_stage_is_reused_while_its_artifacts_are_unchanged(journal, tmp_path):
+    audio = tmp_path / "output_en-us.m4a"
+    audio.write_bytes(b"audio")
+    job = journal.create_job({"idea": "pi"})
+
+    job.record("narration", {"audio": {"en-us": str(audio)}}, [str(audio)])
+
+    assert job.stage("narration") == {"audio": {"en-us": str(audio)}}
+
+
+@pytest.mark.parametrize("change", ["rewrite", "touch", "remove"])
+def test_changed_artifact_invalidates_the_stage(journal, tmp_path, change):
+    audio = tmp_path / "output_en-us.m4a"
+    audio.write_bytes(b"audio")
+    job = journal.create_job()
+    job.record("narration", {"audio": str(audio)}, [str(audio)])
+
+    if change == "rewrite":
+        audio.write_bytes(b"other audio")
+    elif change == "touch":
+        stat = audio.stat()
+        os.utime(audio, (stat.st_atime, stat.st_mtime + 10))
+    else:
+        audio.unlink()
+
+    assert job.stage("narration") is None
+
+
+def test_recording_a_stage_drops_the_later_ones(journal):
+    job = journal.create_job()
+    job.record("code", {"script": "one"})
+    job.record("narration", {"audio": {}})
+    job.record("render", {"video": "portrait_output.mp4"})
+
+    job.record("code", {"script": "two"})
+
+    assert set(journal.get_job(job.id)["stages"]) == {"code"}
+    assert job.stage("code") == {"script": "two"}
+
+
+def test_requeue_interrupted_only_takes_jobs_of_dead_processes(journal):
+    journal.enqueue({"idea": "first"})
+    journal.enqueue({"idea": "second"})
+    alive = journal.claim_next()
+    dead = journal.claim_next()
+    journal._execute("UPDATE jobs SET pid = ? WHERE id = ?", (2**22 + 1, dead.id))
+    failed = journal.create_job()
+    failed.fail("boom")
+
+    assert journal.requeue_interrupted() == [dead.id]
+    assert journal.get_job(dead.id)["status"] == "queued"
+    assert journal.get_job(alive.id)["status"] == "running"
+    assert journal.get_job(failed.id)["status"] == "failed"
+    assert journal.claim_next().id == dead.id
+
+
+def test_reused_pid_does_not_keep_a_job_running(journal):
+    # After a container restart the new daemon often gets the old PID back
+    job = journal.create_job()
+    journal._execute(
+        "UPDATE jobs SET owner = ? WHERE id = ?", ("previous-boot:1234", job.id)
+    )
+
+    assert journal.get_job(job.id)["pid"] == os.getpid()
+    assert journal.requeue_interrupted() == [job.id]
+
+
+def test_jobs_without_owner_fall_back_to_the_pid(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    journal = JobJournal(db_path)
+    job = journal.create_job()
+    journal._execute("UPDATE jobs SET owner = NULL WHERE id = ?", (job.id,))
+
+    assert JobJournal(db_path).requeue_interrupted() == []
@@ -0,0 +1,88 @@
+import pytest
+
+from src.services.manim_service import (
+    ManimVideoProcessor,
+    output_paths,
+    requested_outputs,
+)
+from src.utils import media_info
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setenv("PORTRAIT_SEGMENT_MIN_SECONDS", "10")
+    monkeypatch.setattr(
+        media_info, "keyframe_times", lambda video: [0.0, 4.0, 8.2, 16.0, 19.5, 28.0]
+    )
+    return ManimVideoProcessor()
+
+
+def test_single_segment_by_default(processor, monkeypatch):
+    monkeypatch.delenv("PORTRAIT_SEGMENTS", raising=False)
+
+    assert processor._portrait_segments("scene.mp4", 40.0) == [(0.0, 40.0)]
+
+
+def test_cuts_fall_on_the_nearest_keyframes(processor, monkeypatch):
+    monkeypatch.setenv("PORTRAIT_SEGMENTS", "3")
+
+    # Targets 13.3s and 26.7s; keyframes within 5s of either end are skipped
+    assert processor._portrait_segments("scene.mp4", 40.0) == [
+        (0.0, 16.0),
+        (16.0, 28.0),
+        (28.0, 40.0),
+    ]
+
+
+def test_segments_respect_the_minimum_length(processor, monkeypatch):
+    monkeypatch.setenv("PORTRAIT_SEGMENTS", "8")
+
+    assert len(processor._portrait_segments("scene.mp4", 25.0)) == 2
+
+
+def test_cuts_are_not_repeated(processor, monkeypatch):
+    monkeypatch.setenv("PORTRAIT_SEGMENTS", "4")
+    monkeypatch.setattr(media_info, "keyframe_times", lambda video: [0.0, 20.0])
+
+    assert processor._portrait_segments("scene.mp4", 40.0) == [
+        (0.0, 20.0),
+        (20.0, 40.0),
+    ]
+
+
+def test_probe_failure_falls_back_to_one_pass(processor, monkeypatch):
+    monkeypatch.setenv("PORTRAIT_SEGMENTS", "4")
+
+    def fail(video):
+        raise RuntimeError("ffprobe missing")
+
+    monkeypatch.setattr(media_info, "keyframe_times", fail)
+
+    assert processor._portrait_segments("scene.mp4", 40.0) == [(0.0, 40.0)]
+
+
+def test_requested_outputs(monkeypatch):
+    monkeypatch.setenv("VIDEO_OUTPUTS", "portrait, preview")
+
+    assert requested_outputs() == ["portrait", "preview"]
+    assert requested_outputs(["landscape", "portrait", "landscape", ""]) == [
+        "landscape",
+        "portrait",
+    ]
+    with pytest.raises(ValueError):
+        requested_outputs(["square"])
+
+
+def test_output_paths_sit_beside_the_primary_video():
+    assert output_paths("output/portrait_output_ab12.mp4", ["portrait", "preview"]) == {
+        "portrait": "output/portrait_output_ab12.mp4",
+        "preview": "output/preview_output_ab12.mp4",
+    }
+    assert output_paths(
+        {"es": "output/landscape_output_es.mp4"}, ["landscape", "portrait"]
+    ) == {
+        "es": {
+            "landscape": "output/landscape_output_es.mp4",
+            "portrait": "output/portrait_output_es.mp4",
+        }
+    }
@@ -0,0 +1,61 @@
+import sys
+
+from src.utils.process_runner import (
+    FfmpegProgressParser,
+    ManimProgressParser,
+    progress_parser_for,
+)
+
+
+def test_manim_progress_from_tqdm_bar():
+    parser = ManimProgressParser()
+    line = "Animation 3: Write(Text('pi')):  45%|####5     | 27/60 [00:01<00:01, 20.1it/s]"
+
+    assert parser.feed("stderr", line) == {
+        "tool": "manim",
+        "animation": 3,
+        "percent": 45.0,
+        "frame": 27,
+        "frames": 60,
+    }
+    assert parser.feed("stderr", "INFO     Rendered PiScene") is None
+
+
+def test_ffmpeg_progress_blocks():
+    parser = FfmpegProgressParser()
+    assert parser.feed("stderr", "  Duration: 00:00:20.00, start: 0.000000") is None
+
+    events = [
+        parser.feed("stdout", line)
+        for line in [
+            "frame=150",
+            "fps=75.0",
+            "out_time_us=5000000",
+            "speed=2.5x",
+            "progress=continue",
+            "frame=600",
+            "out_time_us=20000000",
+            "progress=end",
+        ]
+    ]
+
+    assert events[:4] == [None] * 4
+    assert events[4] == {
+        "tool": "ffmpeg",
+        "done": False,
+        "frame": 150,
+        "fps": 75.0,
+        "out_time_us": 5000000,
+        "speed": "2.5",
+        "percent": 25.0,
+    }
+    assert events[7]["done"] and events[7]["percent"] == 100.0
+    assert events[7]["speed"] is None
+
+
+def test_parser_picks_the_tool():
+    assert isinstance(progress_parser_for(["ffmpeg", "-i", "in.mp4"]), FfmpegProgressParser)
+    assert isinstance(progress_parser_for(["manim", "scene.py"]), ManimProgressParser)
+    wrapped = [sys.executable, "-m", "src.services.glyph_cache_service", "manim"]
+    assert isinstance(progress_parser_for(wrapped), ManimProgressParser)
+    assert progress_parser_for(["ffprobe", "in.mp4"]) is None
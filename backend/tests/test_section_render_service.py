@@ -0,0 +1,51 @@
+from src.services.section_render_service import plan_scene, split_animations
+
+SCENE = """
+from manim import *
+
+class PiScene(Scene):
+    def construct(self):
+        title = Text("Pi")
+        self.play(Write(title), run_time=2)
+        self.wait(3)
+        self.next_section()
+        self.play(FadeOut(title))
+        self.wait()
+"""
+
+
+def test_plan_scene_reads_durations_and_sections():
+    plan = plan_scene(SCENE)
+
+    assert plan.durations == [2, 3, 1.0, 1.0]
+    assert plan.sections == [2]
+    assert plan.exact and plan.safe
+
+
+def test_plan_scene_flags_loops_and_randomness():
+    code = SCENE.replace(
+        "        self.wait()\n",
+        "        for _ in range(3):\n            self.wait(random.random())\n",
+    )
+    plan = plan_scene(code)
+
+    assert not plan.exact
+    assert not plan.safe
+    assert plan_scene("def construct(:") is None
+
+
+def test_split_balances_animated_seconds():
+    durations = [4.0, 1.0, 1.0, 1.0, 1.0, 4.0]
+
+    assert split_animations(6, 2, durations) == [(0, 2), (3, None)]
+    assert split_animations(6, 3) == [(0, 1), (2, 3), (4, None)]
+
+
+def test_split_prefers_section_boundaries():
+    assert split_animations(8, 2, boundaries=[3]) == [(0, 2), (3, None)]
+
+
+def test_split_keeps_min_animations_per_range():
+    assert split_animations(3, 4) == [(0, None)]
+    assert split_animations(5, 4) == [(0, 1), (2, None)]
+    assert split_animations(6, 2, boundaries=[1]) == [(0, None)]